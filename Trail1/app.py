@@ -9,6 +9,9 @@ from bson import ObjectId
 from dotenv import load_dotenv
 from werkzeug.utils import secure_filename
 import traceback
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # Shared modules at the repo root
+from applog import setup_logging, PII
 
 # Load environment variables from .env file
 load_dotenv()
@@ -39,80 +42,86 @@ if not os.path.exists(UPLOAD_FOLDER):
     except OSError as e:
         logging.error(f"Error creating upload folder {UPLOAD_FOLDER}: {e}", exc_info=True)
 
-# Configure Logging (DEBUG level for detailed output)
-log_level = logging.DEBUG
-logging.basicConfig(level=log_level,
-                    format='%(asctime)s [%(levelname)s] %(name)s %(lineno)d: %(message)s')
-logger = logging.getLogger(__name__)
+# Configure Logging (queued and rate-limited; set LOG_LEVEL=DEBUG for detailed output, see applog.py)
+logger = setup_logging(__name__)
 
 # --- MongoDB Connection and Unique Index Setup ---
 db = None
 applications_collection = None
 is_db_connected = False
 unique_index_active = False # Tracks if the DB index is likely enforcing uniqueness
-
-if not MONGO_URI:
-    logger.critical("FATAL: MONGO_URI not found. Database operations impossible.")
-else:
-    try:
-        logger.info(f"Connecting to MongoDB: DB='{DATABASE_NAME}', Collection='{COLLECTION_NAME}'...")
-        # Increased timeouts slightly
-        client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=7000, connectTimeoutMS=10000)
-        client.admin.command('ping') # Verify connection is live
-        db = client[DATABASE_NAME]
-        applications_collection = db[COLLECTION_NAME]
-        is_db_connected = True
-        logger.info("MongoDB connection successful.")
-
-        # --- ### Attempt to Ensure Unique Email Index ### ---
-        index_name = "email_enforce_unique_idx" # Use a clear, potentially new name
-        logger.info(f"Ensuring unique index '{index_name}' exists on 'email' field...")
+_db_pid = None # Process that opened 'client'; a forked worker must open its own
+
+def init_db():
+    """Connects to MongoDB for this process, ensures the unique email index and sets the status flags."""
+    global client, db, applications_collection, is_db_connected, unique_index_active, _db_pid
+    db, applications_collection = None, None
+    is_db_connected, unique_index_active = False, False
+    _db_pid = os.getpid()
+    if not MONGO_URI:
+        logger.critical("FATAL: MONGO_URI not found. Database operations impossible.")
+    else:
         try:
-            applications_collection.create_index(
-                [("email", pymongo.ASCENDING)],
-                name=index_name,
-                unique=True
-            )
-            # Verify index status AFTER creation attempt
-            index_info = applications_collection.index_information()
-            if index_name in index_info and index_info[index_name].get('unique'):
-                unique_index_active = True
-                logger.info(f"SUCCESS: Database unique index '{index_name}' confirmed active.")
-            else:
-                logger.critical(f"CRITICAL: Failed to confirm unique index '{index_name}' status after creation attempt. Index Info: {index_info}")
-
-        except pymongo.errors.OperationFailure as e:
-            # Specific handling for common index creation errors
-            if "duplicate key error collection" in str(e) and "index build" in str(e):
-                 logger.critical(f"CRITICAL FAILURE: Cannot create unique index '{index_name}' - DUPLICATE EMAILS EXIST in '{COLLECTION_NAME}'.")
-                 logger.critical("!!! MANUALLY REMOVE DUPLICATE EMAILS FROM DATABASE !!!")
-            elif "already exists with different options" in str(e) or e.code == 85:
-                 logger.warning(f"Index '{index_name}' or similar might exist with different options. Checking if *any* unique index on 'email' is active...")
-                 try:
-                     index_info = applications_collection.index_information()
-                     found_unique = False
-                     for name, info in index_info.items():
-                         if info.get('key') == [('email', 1)] and info.get('unique'):
-                             logger.info(f"CONFIRMED: Existing unique index '{name}' found and active.")
-                             unique_index_active = True
-                             found_unique = True
-                             break
-                     if not found_unique:
-                          logger.critical("CRITICAL: Could not confirm *any* active unique index on 'email' field.")
-                 except Exception as verify_e:
-                      logger.error(f"Error verifying existing index: {verify_e}", exc_info=True)
-            else:
-                logger.critical(f"CRITICAL FAILURE creating unique index '{index_name}': {e}", exc_info=True)
+            logger.info(f"Connecting to MongoDB: DB='{DATABASE_NAME}', Collection='{COLLECTION_NAME}'...")
+            # Increased timeouts slightly
+            client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=7000, connectTimeoutMS=10000)
+            client.admin.command('ping') # Verify connection is live
+            db = client[DATABASE_NAME]
+            applications_collection = db[COLLECTION_NAME]
+            is_db_connected = True
+            logger.info("MongoDB connection successful.")
+
+            # --- ### Attempt to Ensure Unique Email Index ### ---
+            index_name = "email_enforce_unique_idx" # Use a clear, potentially new name
+            logger.info(f"Ensuring unique index '{index_name}' exists on 'email' field...")
+            try:
+                applications_collection.create_index(
+                    [("email", pymongo.ASCENDING)],
+                    name=index_name,
+                    unique=True
+                )
+                # Verify index status AFTER creation attempt
+                index_info = applications_collection.index_information()
+                if index_name in index_info and index_info[index_name].get('unique'):
+                    unique_index_active = True
+                    logger.info(f"SUCCESS: Database unique index '{index_name}' confirmed active.")
+                else:
+                    logger.critical(f"CRITICAL: Failed to confirm unique index '{index_name}' status after creation attempt. Index Info: {index_info}")
+
+            except pymongo.errors.OperationFailure as e:
+                # Specific handling for common index creation errors
+                if "duplicate key error collection" in str(e) and "index build" in str(e):
+                     logger.critical(f"CRITICAL FAILURE: Cannot create unique index '{index_name}' - DUPLICATE EMAILS EXIST in '{COLLECTION_NAME}'.")
+                     logger.critical("!!! MANUALLY REMOVE DUPLICATE EMAILS FROM DATABASE !!!")
+                elif "already exists with different options" in str(e) or e.code == 85:
+                     logger.warning(f"Index '{index_name}' or similar might exist with different options. Checking if *any* unique index on 'email' is active...")
+                     try:
+                         index_info = applications_collection.index_information()
+                         found_unique = False
+                         for name, info in index_info.items():
+                             if info.get('key') == [('email', 1)] and info.get('unique'):
+                                 logger.info(f"CONFIRMED: Existing unique index '{name}' found and active.")
+                                 unique_index_active = True
+                                 found_unique = True
+                                 break
+                         if not found_unique:
+                              logger.critical("CRITICAL: Could not confirm *any* active unique index on 'email' field.")
+                     except Exception as verify_e:
+                          logger.error(f"Error verifying existing index: {verify_e}", exc_info=True)
+                else:
+                    logger.critical(f"CRITICAL FAILURE creating unique index '{index_name}': {e}", exc_info=True)
+
+            if not unique_index_active:
+                 logger.warning("!!! Warning: Database unique index on 'email' is NOT confirmed active. Uniqueness relies solely on the application pre-check. !!!")
 
-        if not unique_index_active:
-             logger.warning("!!! Warning: Database unique index on 'email' is NOT confirmed active. Uniqueness relies solely on the application pre-check. !!!")
+        except pymongo.errors.ConnectionFailure as e:
+            logger.critical(f"MongoDB Connection Failure: {e}", exc_info=True)
+            is_db_connected = False
+        except Exception as e:
+            logger.critical(f"Unexpected error during MongoDB setup: {e}", exc_info=True)
+            is_db_connected = False
 
-    except pymongo.errors.ConnectionFailure as e:
-        logger.critical(f"MongoDB Connection Failure: {e}", exc_info=True)
-        is_db_connected = False
-    except Exception as e:
-        logger.critical(f"Unexpected error during MongoDB setup: {e}", exc_info=True)
-        is_db_connected = False
+init_db()
 
 # --- Helper Function ---
 def allowed_file(filename):
@@ -122,7 +131,7 @@ def allowed_file(filename):
 # --- Routes ---
 @app.route('/', methods=['GET', 'POST'])
 def job_application_form():
-    logger.debug(f"Route '/' - Method: {request.method}")
+    logger.debug("Route '/' - Method: %s", request.method)
     error = None
     # Capture original data for repopulation on ANY error
     form_data_repop = request.form.to_dict() if request.method == 'POST' else {}
@@ -142,7 +151,7 @@ def job_application_form():
         raw_email = form_data.get('email', '')
         standardized_email = raw_email.strip().lower()
         form_data['email'] = standardized_email # Use this standardized form going forward
-        logger.debug(f"Standardized email for checking: '{standardized_email}'")
+        logger.debug("Standardized email for checking: '%s'", standardized_email, extra=PII)
 
         # --- File Handling ---
         # ... (file handling logic as before) ...
@@ -203,7 +212,7 @@ def job_application_form():
 
 
         # --- ### 3. Explicit Application-Level Email Check ### ---
-        logger.debug(f"Performing explicit check for existing email: '{standardized_email}'")
+        logger.debug("Performing explicit check for existing email: '%s'", standardized_email, extra=PII)
         try:
             existing_application = applications_collection.find_one({"email": standardized_email})
 
@@ -216,7 +225,7 @@ def job_application_form():
                 return render_template('form.html', error="Email already registered.", form_data=form_data_repop)
             else:
                 # --- EMAIL NOT FOUND - PROCEED TO INSERT ATTEMPT ---
-                logger.debug(f"Email '{standardized_email}' not found by pre-check. Proceeding to database insert attempt.")
+                logger.debug("Email '%s' not found by pre-check. Proceeding to database insert attempt.", standardized_email, extra=PII)
 
         except pymongo.errors.PyMongoError as e:
             logger.exception("Database error during email pre-check query.")
@@ -230,7 +239,7 @@ def job_application_form():
 
         # --- ### 4. Attempt Database Insert ### ---
         # This block only runs if the email pre-check passed (email not found by find_one)
-        logger.info(f"Attempting database insert for email: '{standardized_email}' (Pre-check passed)...")
+        logger.info("Attempting database insert for email: '%s' (Pre-check passed)...", standardized_email, extra=PII)
         try:
             form_data.pop('_id', None) # Ensure no _id field
 
@@ -304,6 +313,13 @@ def success():
 
     return render_template('success.html', application=application_data, error=fetch_error)
 
+# --- Application Factory ---
+def create_app():
+    """Entry point for the pre-forking launcher (serve.py); reconnects if called in a forked worker."""
+    if _db_pid != os.getpid():
+        init_db()
+    return app
+
 # --- Main Execution ---
 if __name__ == '__main__':
     host = os.environ.get('FLASK_RUN_HOST', '0.0.0.0')
@@ -1,10 +1,15 @@
 # app.py
 import os
 from flask import Flask, render_template, request, jsonify
+from markupsafe import Markup
 from pymongo import MongoClient
 from pymongo.errors import ConnectionFailure
 from datetime import datetime
-import logging # Optional: for better logging
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # Shared modules at the repo root
+from applog import setup_logging, PII
+from event_bus import EventBus, event_stream_response, request_summary
+from http_cache import CollectionVersion, FragmentCache
 
 # --- Configuration ---
 MONGO_URI = os.environ.get("MONGO_URI", "mongodb://localhost:27017/")
@@ -15,23 +20,73 @@ COLLECTION_NAME = "requests"
 app = Flask(__name__)
 
 # --- Setup Logging (Optional but Recommended) ---
-logging.basicConfig(level=logging.INFO)
+# Queued, sampled and rate-limited; see applog.py and the LOG_* environment variables
+logger = setup_logging('Trail2')
 
 # --- MongoDB Connection ---
-try:
-    client = MongoClient(MONGO_URI)
-    client.admin.command('ismaster') # Check connection
-    db = client[DB_NAME]
-    requests_collection = db[COLLECTION_NAME]
-    logging.info("Successfully connected to MongoDB.")
-except ConnectionFailure:
-    logging.error("MongoDB connection failed. Check if MongoDB server is running or URI is correct.")
-    client = None
-    requests_collection = None # Set to None on failure
-except Exception as e:
-    logging.error(f"An error occurred during MongoDB setup: {e}")
-    client = None
-    requests_collection = None # Set to None on failure
+requests_version = None # Write counter shared with Trail3 (same collection); keys the list cache
+list_cache = FragmentCache() # Rendered request list per version
+events = EventBus() # Pushes new requests and status changes to open pages (GET /events)
+_db_pid = None # Process that opened the client; a forked worker must open its own
+
+def init_db():
+    """Connects to MongoDB and binds client/requests_collection for this process."""
+    global client, db, requests_collection, requests_version, _db_pid
+    requests_version = None
+    _db_pid = os.getpid()
+    try:
+        client = MongoClient(MONGO_URI)
+        client.admin.command('ismaster') # Check connection
+        db = client[DB_NAME]
+        requests_collection = db[COLLECTION_NAME]
+        requests_version = CollectionVersion(db['collection_versions'], COLLECTION_NAME)
+        logger.info("Successfully connected to MongoDB.")
+        events.attach(db) # Cross-worker fan-out when EVENT_BUS=mongo; also receives Trail3's status changes
+    except ConnectionFailure:
+        logger.error("MongoDB connection failed. Check if MongoDB server is running or URI is correct.")
+        client = None
+        requests_collection = None # Set to None on failure
+    except Exception as e:
+        logger.error(f"An error occurred during MongoDB setup: {e}")
+        client = None
+        requests_collection = None # Set to None on failure
+
+init_db()
+
+def bump_version():
+    """Marks the requests collection as changed, so the cached request list is rendered again."""
+    if requests_version is None:
+        return
+    try:
+        requests_version.bump()
+    except Exception:
+        list_cache.clear()
+        logger.exception("Could not bump the requests version (the cached list may be stale until the next write):")
+
+def empty_request_list():
+    return Markup(render_template('request_list.html', requests=[]))
+
+def render_request_list():
+    """
+    The rendered cards of every request, newest first. Cached per collection version
+    (for at most RESPONSE_CACHE_TTL seconds), so repeat page loads cost one version
+    lookup instead of a full find() and render.
+    """
+    try:
+        version = requests_version.current()[0] if requests_version is not None else None
+    except Exception as e:
+        logger.warning(f"Could not read the requests version, rendering uncached: {e}")
+        version = None
+    if version is not None:
+        html = list_cache.get('request_list', version)
+        if html is not None:
+            return html
+    all_requests = list(requests_collection.find().sort("submittedAt", -1))
+    logger.info(f"Fetched {len(all_requests)} requests from DB.")
+    html = Markup(render_template('request_list.html', requests=all_requests))
+    if version is not None:
+        list_cache.put('request_list', version, html)
+    return html
 
 # --- Routes ---
 @app.route('/')
@@ -43,15 +98,13 @@ def index():
     # CORRECT CHECK: Compare with None explicitly
     if requests_collection is None:
          # Handle case where DB connection failed during startup
-        return render_template('index.html', requests=[], error="Database connection failed.")
+        return render_template('index.html', request_list=empty_request_list(), error="Database connection failed.")
 
     try:
-        all_requests = list(requests_collection.find().sort("submittedAt", -1))
-        logging.info(f"Fetched {len(all_requests)} requests from DB.")
-        return render_template('index.html', requests=all_requests)
+        return render_template('index.html', request_list=render_request_list())
     except Exception as e:
-        logging.error(f"Error fetching requests from MongoDB: {e}")
-        return render_template('index.html', requests=[], error="Could not fetch requests.")
+        logger.error(f"Error fetching requests from MongoDB: {e}")
+        return render_template('index.html', request_list=empty_request_list(), error="Could not fetch requests.")
 
 
 @app.route('/submit_request', methods=['POST'])
@@ -69,13 +122,13 @@ def submit_request():
         return jsonify({"success": False, "message": "Request must be JSON."}), 400
 
     data = request.get_json()
-    logging.info(f"Received submission data: {data}")
+    logger.info("Received submission data: %s", data, extra=PII)
 
     required_fields = ['name', 'id', 'email', 'project', 'manager', 'location', 'from', 'to', 'reason']
     missing_fields = [field for field in required_fields if field not in data or not data[field]]
 
     if missing_fields:
-        logging.warning(f"Submission failed: Missing fields - {missing_fields}")
+        logger.warning(f"Submission failed: Missing fields - {missing_fields}")
         return jsonify({
             "success": False,
             "message": f"Missing required fields: {', '.join(missing_fields)}"
@@ -98,11 +151,13 @@ def submit_request():
         }
 
         insert_result = requests_collection.insert_one(request_document)
-        logging.info(f"Successfully inserted request with ID: {insert_result.inserted_id}")
+        logger.info(f"Successfully inserted request with ID: {insert_result.inserted_id}")
+        bump_version()
 
         response_data = request_document.copy()
         response_data['_id'] = str(insert_result.inserted_id)
         response_data['submittedAt'] = request_document['submittedAt'].isoformat() + "Z"
+        events.publish('request.created', request_summary(response_data))
 
         return jsonify({
             "success": True,
@@ -111,9 +166,30 @@ def submit_request():
             }), 201
 
     except Exception as e:
-        logging.error(f"Error inserting request into MongoDB: {e}")
+        logger.error(f"Error inserting request into MongoDB: {e}")
         return jsonify({"success": False, "message": "An internal error occurred."}), 500
 
+@app.route('/events')
+def request_events():
+    """
+    Server-sent events: 'request.created' (the new request's dashboard fields, no email)
+    and 'request.status' ({"updates": [{"_id", "status"}, ...]}, published by the Trail3
+    dashboard when EVENT_BUS=mongo). Resumes after Last-Event-ID.
+    """
+    return event_stream_response(events)
+
+@app.route('/cache_stats')
+def cache_stats():
+    """Hit/miss counters of the request list cache (this worker process only)."""
+    return jsonify(list_cache.stats())
+
+# --- Application Factory ---
+def create_app():
+    """Entry point for the pre-forking launcher (serve.py); reconnects if called in a forked worker."""
+    if _db_pid != os.getpid():
+        init_db()
+    return app
+
 # --- Run the App ---
 if __name__ == '__main__':
     app.run(debug=True) # Removed host/port for simplicity, add back if needed
\ No newline at end of file
@@ -0,0 +1,67 @@
+# bench_index.py
+# GET / with and without the rendered request-list cache, at increasing numbers of
+# WFH requests. Uncached, every page load runs find() over the whole collection and
+# the Jinja loop; cached, it costs one version lookup until the next write or until
+# RESPONSE_CACHE_TTL expires the entry.
+# Each request goes through the Flask test client against a scratch database.
+#
+# Usage (needs a local mongod):
+#   MONGO_URI=mongodb://localhost:27017/ python bench_index.py
+#   BENCH_REQUESTS=1000,10000 BENCH_ITERATIONS=50 python bench_index.py
+
+import os
+import time
+import statistics
+from datetime import datetime, timedelta
+
+# --- Configuration ---
+MONGO_URI = os.getenv('MONGO_URI', 'mongodb://localhost:27017/')
+REQUESTS = [int(n) for n in os.getenv('BENCH_REQUESTS', '100,1000,10000').split(',')]
+ITERATIONS = int(os.getenv('BENCH_ITERATIONS', 20))
+DATABASE_NAME = 'wfh_requests_index_bench'
+
+os.environ['MONGO_URI'] = MONGO_URI
+import app as wfh_app # Connects using the settings above
+from http_cache import CollectionVersion
+
+db = wfh_app.client[DATABASE_NAME]
+collection = db[wfh_app.COLLECTION_NAME]
+wfh_app.requests_collection = collection
+versioned = CollectionVersion(db['collection_versions'], wfh_app.COLLECTION_NAME)
+
+
+def seed(count):
+    collection.drop()
+    start = datetime(2025, 1, 1)
+    collection.insert_many([{
+        'reqId': f'req_{i}', 'name': f'Employee {i}', 'employeeId': f'EMP{i:04d}', 'email': f'emp{i}@example.com',
+        'project': 'Apollo', 'manager': 'Manager 0', 'location': 'Home', 'fromDate': '2025-06-09',
+        'toDate': '2025-06-10', 'reason': 'Plumber visit', 'status': 'Pending',
+        'submittedAt': start + timedelta(minutes=i),
+    } for i in range(count)])
+    versioned.bump()
+
+
+def timed(client):
+    samples = []
+    for _ in range(ITERATIONS):
+        began = time.perf_counter()
+        client.get('/')
+        samples.append((time.perf_counter() - began) * 1000)
+    return statistics.median(samples)
+
+
+if __name__ == '__main__':
+    client = wfh_app.app.test_client()
+    print(f"{'requests':>9}  {'uncached':>10}  {'cached':>10}  {'speedup':>8}  {'bytes':>10}")
+    for count in REQUESTS:
+        seed(count)
+        wfh_app.requests_version = None # Every load queries and renders
+        uncached = timed(client)
+        wfh_app.requests_version = versioned
+        wfh_app.list_cache.clear()
+        cached = timed(client) # The first load fills the cache
+        size = len(client.get('/').data)
+        print(f"{count:>9}  {uncached:>8.1f}ms  {cached:>8.1f}ms  {uncached / cached:>7.1f}x  {size:>10}")
+    print(f"list cache: {wfh_app.list_cache.stats()}")
+    wfh_app.client.drop_database(DATABASE_NAME)
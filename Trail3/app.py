@@ -1,12 +1,18 @@
 # app.py
 import os
-from flask import Flask, render_template, request, jsonify, abort
+from flask import Flask, render_template, request, jsonify, abort, url_for
 from pymongo import MongoClient
-from pymongo.errors import ConnectionFailure
+from pymongo.errors import ConnectionFailure, OperationFailure
 from bson import ObjectId # Import ObjectId
 from bson.errors import InvalidId # Import InvalidId for error handling
 from datetime import datetime
-import logging
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # Shared modules at the repo root
+from applog import setup_logging, PII
+from http_cache import CollectionVersion, ResponseCache, conditional_get
+from event_bus import EventBus, event_stream_response, request_summary
+from request_bulk import BulkRequestError, UPDATED, parse_updates, apply_updates
+from request_queries import RequestQueryError, REQUEST_STATUSES, ensure_indexes, find_page
 
 # --- Configuration ---
 # Use environment variable for connection string in production!
@@ -18,23 +24,54 @@ COLLECTION_NAME = "requests"
 app = Flask(__name__)
 
 # --- Setup Logging ---
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+# Queued, sampled and rate-limited; see applog.py and the LOG_* environment variables
+logger = setup_logging('Trail3')
 
 # --- MongoDB Connection ---
 requests_collection = None # Initialize to None
-try:
-    # Connect with a timeout
-    client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000)
-    # The ismaster command is cheap and does not require auth.
-    client.admin.command('ismaster') # Verify connection
-    db = client[DB_NAME]
-    requests_collection = db[COLLECTION_NAME]
-    logging.info(f"Successfully connected to MongoDB: {MONGO_URI}")
-except ConnectionFailure as e:
-    logging.error(f"MongoDB connection failed ({MONGO_URI}): {e}")
-except Exception as e:
-    logging.error(f"An error occurred during MongoDB setup: {e}")
-# Keep requests_collection as None if connection failed
+requests_version = None # Write counter behind the ETag / Last-Modified of /view_requests
+view_cache = ResponseCache()
+events = EventBus() # Pushes new requests and status changes to open dashboards (GET /events)
+_db_pid = None # Process that opened the client; a forked worker must open its own
+
+def init_db():
+    """Connects to MongoDB and binds requests_collection for this process."""
+    global client, db, requests_collection, requests_version, _db_pid
+    requests_collection = None
+    requests_version = None
+    _db_pid = os.getpid()
+    try:
+        # Connect with a timeout
+        client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000)
+        # The ismaster command is cheap and does not require auth.
+        client.admin.command('ismaster') # Verify connection
+        db = client[DB_NAME]
+        requests_collection = db[COLLECTION_NAME]
+        requests_version = CollectionVersion(db['collection_versions'], COLLECTION_NAME)
+        logger.info(f"Successfully connected to MongoDB: {MONGO_URI}")
+        events.attach(db) # Cross-worker fan-out when EVENT_BUS=mongo
+        # Compound indexes behind the /view_requests filters and keyset pagination
+        try:
+            ensure_indexes(requests_collection)
+        except OperationFailure as e:
+            logger.warning(f"Could not create dashboard indexes (the page still works, only slower): {e}")
+    except ConnectionFailure as e:
+        logger.error(f"MongoDB connection failed ({MONGO_URI}): {e}")
+    except Exception as e:
+        logger.error(f"An error occurred during MongoDB setup: {e}")
+    # Keep requests_collection as None if connection failed
+
+init_db()
+
+def bump_version():
+    """ Marks the requests collection as changed, so cached /view_requests pages are not reused. """
+    if requests_version is None: # Not versioned (conditional GET is off too)
+        return
+    try:
+        requests_version.bump()
+    except Exception:
+        view_cache.clear()
+        logger.exception("Could not bump the requests version (cached pages may be stale until the next write):")
 
 # --- Routes ---
 
@@ -49,21 +86,21 @@ def index():
 def submit_request():
     """ Handles the user form submission. """
     if requests_collection is None:
-        logging.error("Submit request failed: Database not available.")
+        logger.error("Submit request failed: Database not available.")
         return jsonify({"success": False, "message": "Database not available."}), 503 # Service Unavailable
 
     if not request.is_json:
         return jsonify({"success": False, "message": "Request must be JSON."}), 400
 
     data = request.get_json()
-    logging.info(f"Received submission data via /submit_request: {data}")
+    logger.info("Received submission data via /submit_request: %s", data, extra=PII)
 
     # Server-side validation
     required_fields = ['name', 'id', 'email', 'project', 'manager', 'location', 'from', 'to', 'reason']
     missing_fields = [field for field in required_fields if not data.get(field)]
 
     if missing_fields:
-        logging.warning(f"Submission failed: Missing fields - {missing_fields}")
+        logger.warning(f"Submission failed: Missing fields - {missing_fields}")
         return jsonify({"success": False, "message": f"Missing required fields: {', '.join(missing_fields)}"}), 400
 
     # Add specific validation checks here if needed (e.g., ID format, email format, date logic)
@@ -86,12 +123,14 @@ def submit_request():
         }
 
         insert_result = requests_collection.insert_one(request_document)
-        logging.info(f"Successfully inserted request with _id: {insert_result.inserted_id}")
+        logger.info(f"Successfully inserted request with _id: {insert_result.inserted_id}")
+        bump_version()
 
         # Prepare response data (use the actual inserted document structure)
         response_data = request_document.copy()
         response_data['_id'] = str(insert_result.inserted_id) # Return the unique MongoDB ID
         response_data['submittedAt'] = request_document['submittedAt'].isoformat() + "Z" # ISO format for JS
+        events.publish('request.created', request_summary(response_data))
 
         return jsonify({
             "success": True,
@@ -100,34 +139,46 @@ def submit_request():
             }), 201 # HTTP status 201 Created
 
     except Exception as e:
-        logging.exception("Error inserting request into MongoDB:") # Log the full error
+        logger.exception("Error inserting request into MongoDB:") # Log the full error
         return jsonify({"success": False, "message": "An internal server error occurred during submission."}), 500
 
 
 @app.route('/view_requests')
+@conditional_get(lambda: requests_version, view_cache)
 def view_requests():
-    """ Serves the admin/view page with requests from the database. """
+    """
+    Serves the admin/view page, newest requests first, one page at a time (ETag / 304 while nothing changed).
+    Optional query parameters: status, manager, project, location (exact match),
+    limit (page size, default 50) and cursor (from the page's "Next" link).
+    """
+    page = dict(requests=[], filters={}, statuses=REQUEST_STATUSES, next_url=None, first_url=None)
     if requests_collection is None:
-        logging.error("View requests failed: Database not available.")
-        return render_template('view_submissions.html', requests=[], error="Database connection failed. Cannot load requests.")
+        logger.error("View requests failed: Database not available.")
+        return render_template('view_submissions.html', error="Database connection failed. Cannot load requests.", **page), 503
 
     try:
-        # Fetch all requests, sort by submission time descending
-        # You could filter here, e.g., find({"status": "Pending"})
-        all_requests = list(requests_collection.find().sort("submittedAt", -1))
-        logging.info(f"Fetched {len(all_requests)} requests for viewing.")
+        page['requests'], page['filters'], next_cursor = find_page(requests_collection, request.args)
+        logger.info(f"Fetched {len(page['requests'])} requests for viewing.")
+        if next_cursor:
+            page['next_url'] = url_for('view_requests', **dict(request.args.to_dict(), cursor=next_cursor))
+        if request.args.get('cursor'):
+            page['first_url'] = url_for('view_requests', **{k: v for k, v in request.args.items() if k != 'cursor'})
         # Pass the list of request documents to the template
-        return render_template('view_submissions.html', requests=all_requests)
+        return render_template('view_submissions.html', **page)
+    except RequestQueryError as e:
+        logger.warning(f"Invalid view_requests parameters: {e}")
+        return render_template('view_submissions.html', error=str(e), **page), 400
     except Exception as e:
-        logging.exception("Error fetching requests from MongoDB for viewing:")
-        return render_template('view_submissions.html', requests=[], error="Could not fetch requests due to a server error.")
+        logger.exception("Error fetching requests from MongoDB for viewing:")
+        # Not 200, so conditional_get neither validates nor caches the error page
+        return render_template('view_submissions.html', error="Could not fetch requests due to a server error.", **page), 500
 
 
 @app.route('/update_status/<request_id>', methods=['POST'])
 def update_status(request_id):
     """ Handles updating the status (Approve/Reject) of a specific request via its _id. """
     if requests_collection is None:
-        logging.error(f"Update status failed for {request_id}: Database not available.")
+        logger.error(f"Update status failed for {request_id}: Database not available.")
         return jsonify({"success": False, "message": "Database not available."}), 503
 
     if not request.is_json:
@@ -135,21 +186,21 @@ def update_status(request_id):
 
     data = request.get_json()
     new_status = data.get('status')
-    logging.info(f"Received status update request for ID {request_id}: new status = {new_status}")
+    logger.info(f"Received status update request for ID {request_id}: new status = {new_status}")
 
     # Validate the new status
     if new_status not in ['Approved', 'Rejected']:
-        logging.warning(f"Invalid status received for {request_id}: {new_status}")
+        logger.warning(f"Invalid status received for {request_id}: {new_status}")
         return jsonify({"success": False, "message": "Invalid status provided."}), 400
 
     try:
         # Convert the string ID from the URL to a MongoDB ObjectId
         object_id = ObjectId(request_id)
     except InvalidId:
-        logging.warning(f"Invalid ObjectId format received: {request_id}")
+        logger.warning(f"Invalid ObjectId format received: {request_id}")
         return jsonify({"success": False, "message": "Invalid request ID format."}), 400
     except Exception as e:
-         logging.exception(f"Error converting request ID {request_id} to ObjectId:")
+         logger.exception(f"Error converting request ID {request_id} to ObjectId:")
          return jsonify({"success": False, "message": "Error processing request ID."}), 500
 
     try:
@@ -160,20 +211,73 @@ def update_status(request_id):
         )
 
         if update_result.matched_count == 0:
-            logging.warning(f"No request found with ID {request_id} to update.")
+            logger.warning(f"No request found with ID {request_id} to update.")
             return jsonify({"success": False, "message": "Request not found."}), 404
         elif update_result.modified_count == 0:
-             logging.warning(f"Request {request_id} found, but status was already {new_status}.")
+             logger.warning(f"Request {request_id} found, but status was already {new_status}.")
              # Consider this success as the desired state is achieved
              return jsonify({"success": True, "message": f"Request status is already {new_status}."})
         else:
-            logging.info(f"Successfully updated status for request {request_id} to {new_status}.")
+            logger.info(f"Successfully updated status for request {request_id} to {new_status}.")
+            bump_version()
+            events.publish('request.status', {"updates": [{"_id": request_id, "status": new_status}]})
             return jsonify({"success": True, "message": "Status updated successfully!"})
 
     except Exception as e:
-        logging.exception(f"Error updating status for request {request_id}:")
+        logger.exception(f"Error updating status for request {request_id}:")
         return jsonify({"success": False, "message": "An internal server error occurred during status update."}), 500
 
+@app.route('/update_status/bulk', methods=['POST'])
+def update_status_bulk():
+    """
+    Approves/rejects many requests in one call (clearing a backlog).
+    Body: {"ids": [...], "status": "Approved"} or [{"id": ..., "status": ...}, ...].
+    Returns one result per id, in request order, with outcome 'updated', 'unchanged'
+    (already in that state), 'not_found', 'conflict' (changed meanwhile) or 'invalid'.
+    """
+    if requests_collection is None:
+        logger.error("Bulk status update failed: Database not available.")
+        return jsonify({"success": False, "message": "Database not available."}), 503
+
+    if not request.is_json:
+        return jsonify({"success": False, "message": "Request must be JSON."}), 400
+
+    try:
+        items = parse_updates(request.get_json())
+    except BulkRequestError as e:
+        return jsonify({"success": False, "message": str(e)}), e.status_code
+    logger.info(f"Received bulk status update for {len(items)} requests")
+
+    try:
+        results = apply_updates(requests_collection, items)
+    except Exception as e:
+        logger.exception("Error applying bulk status update:")
+        return jsonify({"success": False, "message": "An internal server error occurred during status update."}), 500
+
+    updated = sum(1 for result in results if result['outcome'] == UPDATED)
+    if updated:
+        bump_version()
+        events.publish('request.status', {"updates": [{"_id": result['id'], "status": result['status']}
+                                                      for result in results if result['outcome'] == UPDATED]})
+    logger.info(f"Bulk status update: {updated} of {len(items)} requests updated.")
+    return jsonify({"success": True, "message": f"{updated} request(s) updated.", "updated": updated, "results": results})
+
+@app.route('/events')
+def request_events():
+    """
+    Server-sent events for the dashboard: 'request.created' (the new request's dashboard
+    fields, no email) and 'request.status' ({"updates": [{"_id", "status"}, ...]}).
+    Resumes after Last-Event-ID.
+    """
+    return event_stream_response(events)
+
+# --- Application Factory ---
+def create_app():
+    """ Entry point for the pre-forking launcher (serve.py); reconnects if called in a forked worker. """
+    if _db_pid != os.getpid():
+        init_db()
+    return app
+
 # --- Run the App ---
 if __name__ == '__main__':
     # Set debug=False for production deployments
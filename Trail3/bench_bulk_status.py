@@ -0,0 +1,60 @@
+# bench_bulk_status.py
+# A manager clearing a backlog: approving N pending WFH requests with one
+# POST /update_status/<id> per request against a single POST /update_status/bulk.
+# Both paths go through the Flask test client against a scratch database, and the
+# requests are reset to Pending before each run.
+#
+# Usage (needs a local mongod):
+#   MONGO_URI=mongodb://localhost:27017/ python bench_bulk_status.py
+#   BENCH_BACKLOG=1000 python bench_bulk_status.py
+
+import os
+import time
+from datetime import datetime, timedelta
+
+# --- Configuration ---
+MONGO_URI = os.getenv('MONGO_URI', 'mongodb://localhost:27017/')
+BACKLOG = [int(n) for n in os.getenv('BENCH_BACKLOG', '50,200,1000').split(',')]
+DATABASE_NAME = 'wfh_requests_bulk_bench'
+
+os.environ['MONGO_URI'] = MONGO_URI
+import app as wfh_app # Connects using the settings above
+
+collection = wfh_app.client[DATABASE_NAME][wfh_app.COLLECTION_NAME]
+wfh_app.requests_collection = collection
+
+
+def seed(count):
+    collection.drop()
+    start = datetime(2025, 6, 2)
+    ids = collection.insert_many([{
+        'reqId': f'req_{i}', 'name': f'Employee {i}', 'employeeId': f'EMP{i:04d}', 'email': f'emp{i}@example.com',
+        'project': 'Apollo', 'manager': 'Manager 0', 'location': 'Home', 'fromDate': '2025-06-09',
+        'toDate': '2025-06-10', 'reason': 'Plumber visit', 'status': 'Pending',
+        'submittedAt': start + timedelta(minutes=i),
+    } for i in range(count)]).inserted_ids
+    return [str(object_id) for object_id in ids]
+
+
+def reset():
+    collection.update_many({}, {'$set': {'status': 'Pending'}, '$unset': {'lastUpdatedAt': ''}})
+
+
+if __name__ == '__main__':
+    client = wfh_app.app.test_client()
+    print(f"{'backlog':>8}  {'path':<28}{'seconds':>10}{'requests/s':>12}{'updated':>10}")
+    for count in BACKLOG:
+        ids = seed(count)
+
+        began = time.perf_counter()
+        updated = sum(1 for request_id in ids
+                      if client.post(f'/update_status/{request_id}', json={'status': 'Approved'}).status_code == 200)
+        elapsed = time.perf_counter() - began
+        print(f"{count:>8}  {'POST /update_status/<id> x N':<28}{elapsed:>10.3f}{count / elapsed:>12.0f}{updated:>10}")
+
+        reset()
+        began = time.perf_counter()
+        updated = client.post('/update_status/bulk', json={'ids': ids, 'status': 'Approved'}).get_json()['updated']
+        elapsed = time.perf_counter() - began
+        print(f"{count:>8}  {'POST /update_status/bulk':<28}{elapsed:>10.3f}{count / elapsed:>12.0f}{updated:>10}")
+    wfh_app.client.drop_database(DATABASE_NAME)
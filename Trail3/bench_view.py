@@ -0,0 +1,103 @@
+# bench_view.py
+# Rendering benchmark for /view_requests at 100k WFH requests: the old page (every
+# request ever filed, in one template render) against keyset pages, with and
+# without filters, at increasing depth. Each request goes through the Flask test
+# client, so the time covers the query, the template and the response. Conditional
+# GET and the response cache are switched off, so every request hits MongoDB.
+#
+# Usage (needs a local mongod; the scratch database is reused between runs):
+#   MONGO_URI=mongodb://localhost:27017/ python bench_view.py
+#   BENCH_REQUESTS=20000 BENCH_RESEED=1 python bench_view.py
+
+import os
+import re
+import time
+import random
+import statistics
+from urllib.parse import quote_plus
+from datetime import datetime, timedelta
+
+# --- Configuration ---
+MONGO_URI = os.getenv('MONGO_URI', 'mongodb://localhost:27017/')
+REQUESTS = int(os.getenv('BENCH_REQUESTS', 100_000))
+RESEED = os.getenv('BENCH_RESEED', '0').lower() in ['1', 'true', 'yes']
+ITERATIONS = int(os.getenv('BENCH_ITERATIONS', 10))
+MANAGERS = [f'Manager {i}' for i in range(50)]
+PROJECTS = [f'Project {i}' for i in range(20)]
+LOCATIONS = ['Home', 'Hyderabad', 'Bengaluru', 'Chennai', 'Pune']
+PAGE_DEPTHS = [1, 10, 100]
+INSERT_BATCH = 10_000
+DATABASE_NAME = 'wfh_requests_bench'
+
+os.environ['MONGO_URI'] = MONGO_URI
+import app as wfh_app # Connects using the settings above
+from flask import render_template
+
+collection = wfh_app.client[DATABASE_NAME][wfh_app.COLLECTION_NAME]
+wfh_app.requests_collection = collection
+wfh_app.requests_version = None # No ETags or response cache: measure the page itself
+NEXT_LINK = re.compile(r'<a href="([^"]+)">Older')
+
+
+def seed():
+    if not RESEED and collection.estimated_document_count() >= REQUESTS:
+        print(f"Reusing {collection.estimated_document_count()} requests.")
+        return
+    collection.drop()
+    rng = random.Random(7)
+    start = datetime(2022, 1, 1)
+    for offset in range(0, REQUESTS, INSERT_BATCH):
+        batch = []
+        for i in range(offset, min(offset + INSERT_BATCH, REQUESTS)):
+            from_date = start + timedelta(days=i // 100)
+            batch.append({
+                'reqId': f'req_{i}', 'name': f'Employee {i % 3000}', 'employeeId': f'EMP{i % 3000:04d}',
+                'email': f'emp{i % 3000}@example.com', 'project': rng.choice(PROJECTS),
+                'manager': rng.choice(MANAGERS), 'location': rng.choice(LOCATIONS),
+                'fromDate': from_date.strftime('%Y-%m-%d'), 'toDate': (from_date + timedelta(days=1)).strftime('%Y-%m-%d'),
+                'reason': 'Plumber visit', 'submittedAt': start + timedelta(minutes=i * 10),
+                # Old requests are decided; the recent ones are still pending
+                'status': 'Pending' if i >= REQUESTS - 2000 else rng.choice(['Approved', 'Approved', 'Rejected']),
+            })
+        collection.insert_many(batch, ordered=False)
+    print(f"Seeded {REQUESTS} requests.")
+
+
+def timed(fn, iterations=ITERATIONS):
+    samples = []
+    for _ in range(iterations):
+        began = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - began) * 1000)
+    return statistics.median(samples)
+
+
+def page_url(client, url, depth):
+    """Follows 'Older' links depth - 1 times; returns the URL of that page."""
+    for _ in range(depth - 1):
+        url = NEXT_LINK.search(client.get(url).get_data(as_text=True)).group(1).replace('&amp;', '&')
+    return url
+
+
+def old_page():
+    """What /view_requests did before pagination."""
+    with wfh_app.app.test_request_context('/view_requests'):
+        all_requests = list(collection.find().sort('submittedAt', -1))
+        return render_template('view_submissions.html', requests=all_requests, filters={}, statuses=[])
+
+
+if __name__ == '__main__':
+    seed()
+    wfh_app.ensure_indexes(collection)
+    client = wfh_app.app.test_client()
+    manager = MANAGERS[0]
+    print(f"\n{'page':<52}{'median':>10}{'bytes':>12}")
+    print(f"{'all requests (before)':<52}{timed(old_page, 3):>8.1f}ms{len(old_page()):>12}")
+    for label, url in [('newest 50', '/view_requests'),
+                       ('Pending', '/view_requests?status=Pending'),
+                       (f"{manager}, Pending", f'/view_requests?status=Pending&manager={quote_plus(manager)}'),
+                       ('Project 3, Approved', '/view_requests?status=Approved&project=Project+3')]:
+        for depth in PAGE_DEPTHS if label == 'newest 50' else [1]:
+            target = page_url(client, url, depth)
+            ms = timed(lambda: client.get(target))
+            print(f"{label + (f', page {depth}' if depth > 1 else ''):<52}{ms:>8.1f}ms{len(client.get(target).data):>12}")
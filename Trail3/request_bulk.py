@@ -0,0 +1,109 @@
+# request_bulk.py
+# Bulk approve/reject for POST /update_status/bulk.
+#
+# The ids are parsed and validated in one pass, their current statuses are read
+# with one find($in), and every change is sent in one unordered bulk_write. Each
+# update carries the status that was read as a precondition, so a request decided
+# by someone else in the meantime is not overwritten. Those few are re-read to
+# report them. A batch of N ids therefore costs two or three round trips instead
+# of N.
+
+from datetime import datetime
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import UpdateOne
+
+MAX_BULK_UPDATES = 1000
+STATUSES = ('Approved', 'Rejected')
+
+# Per-id outcomes
+UPDATED, UNCHANGED, NOT_FOUND, CONFLICT, INVALID = 'updated', 'unchanged', 'not_found', 'conflict', 'invalid'
+
+
+class BulkRequestError(ValueError):
+    """The body is not a usable list of updates; answered with 400 (or 413 when too long)."""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def parse_updates(body):
+    """
+    Accepts {"ids": [...], "status": "Approved"} or a list of {"id": ..., "status": ...}
+    (also wrapped as {"updates": [...]}). Returns [(id_string, status)] in request order.
+    """
+    if isinstance(body, dict) and 'ids' in body:
+        if not isinstance(body['ids'], list):
+            raise BulkRequestError("'ids' must be a list.")
+        items = [(request_id, body.get('status')) for request_id in body['ids']]
+    else:
+        if isinstance(body, dict):
+            body = body.get('updates')
+        if not isinstance(body, list):
+            raise BulkRequestError("Expected {\"ids\": [...], \"status\": ...} or a list of {\"id\", \"status\"}.")
+        items = [(item.get('id'), item.get('status')) if isinstance(item, dict) else (None, None) for item in body]
+    if not items:
+        raise BulkRequestError("No updates given.")
+    if len(items) > MAX_BULK_UPDATES:
+        raise BulkRequestError(f"At most {MAX_BULK_UPDATES} updates per request.", 413)
+    return items
+
+
+def apply_updates(collection, items, now=None):
+    """Applies the status changes. Returns one {"id", "status", "outcome"[, "message"]} per item."""
+    now = now or datetime.utcnow()
+    now = now.replace(microsecond=now.microsecond // 1000 * 1000) # As stored (ms), to recognise our own writes
+    results = []
+    targets = {} # ObjectId -> index in results; first occurrence wins
+    for request_id, status in items:
+        result = {"id": request_id, "status": status}
+        results.append(result)
+        if status not in STATUSES:
+            result.update(outcome=INVALID, message="Invalid status provided.")
+            continue
+        try:
+            object_id = ObjectId(request_id)
+        except (InvalidId, TypeError):
+            result.update(outcome=INVALID, message="Invalid request ID format.")
+            continue
+        if object_id in targets:
+            result.update(outcome=INVALID, message="Duplicate request ID in this batch.")
+            continue
+        targets[object_id] = len(results) - 1
+
+    # --- One read: which exist, and in which state ---
+    current = {doc['_id']: doc.get('status') for doc in
+               collection.find({'_id': {'$in': list(targets)}}, {'status': 1})} if targets else {}
+    operations, pending = [], []
+    for object_id, i in targets.items():
+        if object_id not in current:
+            results[i]['outcome'] = NOT_FOUND
+        elif current[object_id] == results[i]['status']:
+            results[i]['outcome'] = UNCHANGED
+        else:
+            operations.append(UpdateOne({'_id': object_id, 'status': current[object_id]},
+                                        {'$set': {'status': results[i]['status'], 'lastUpdatedAt': now}}))
+            pending.append(object_id)
+
+    # --- One write: all changes, unordered, each guarded by the status read above ---
+    if operations:
+        write = collection.bulk_write(operations, ordered=False)
+        if write.modified_count == len(operations):
+            for object_id in pending:
+                results[targets[object_id]]['outcome'] = UPDATED
+        else:
+            # Some were changed (or deleted) concurrently: look at those ids again
+            after = {doc['_id']: doc for doc in collection.find({'_id': {'$in': pending}}, {'status': 1, 'lastUpdatedAt': 1})}
+            for object_id in pending:
+                result = results[targets[object_id]]
+                doc = after.get(object_id)
+                if doc is None:
+                    result['outcome'] = NOT_FOUND
+                elif doc.get('status') == result['status'] and doc.get('lastUpdatedAt') == now:
+                    result['outcome'] = UPDATED
+                elif doc.get('status') == result['status']:
+                    result['outcome'] = UNCHANGED # Someone else already made the same decision
+                else:
+                    result.update(outcome=CONFLICT, message=f"Status was changed to {doc.get('status')} meanwhile.")
+    return results
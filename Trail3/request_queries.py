@@ -0,0 +1,109 @@
+# request_queries.py
+# Filters, keyset pagination and indexes for the /view_requests dashboard.
+#
+# Pages are keyset-paginated on (submittedAt, _id), newest first. The cursor is an
+# opaque token holding the last card's sort key, so every page is an index range
+# scan of PAGE_SIZE entries, however much history exists. Each filter combination
+# is served by one of the compound indexes in REQUEST_INDEXES: equality keys first,
+# then the sort key. A manager's "Pending" view uses (manager, status, submittedAt).
+# Without a status, a manager/project/location filter still narrows the scan to
+# that index prefix, but sorts those requests before returning the page.
+
+import json
+import base64
+import binascii
+from datetime import datetime
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import DESCENDING
+from pymongo.operations import IndexModel
+
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+REQUEST_STATUSES = ('Pending', 'Approved', 'Rejected')
+FILTERS = ('status', 'manager', 'project', 'location')
+
+# name -> leading equality keys; each index ends with (submittedAt, _id).
+REQUEST_INDEXES = {
+    'requests_submitted': [],
+    'requests_status_submitted': ['status'],
+    'requests_manager_status_submitted': ['manager', 'status'],
+    'requests_project_status_submitted': ['project', 'status'],
+    'requests_location_status_submitted': ['location', 'status'],
+}
+
+
+class RequestQueryError(ValueError):
+    """Invalid dashboard parameters; answered with 400."""
+
+
+def ensure_indexes(collection):
+    """Creates the dashboard indexes (no-op for ones that already exist). Returns their names."""
+    models = [IndexModel([(key, 1) for key in keys] + [('submittedAt', DESCENDING), ('_id', DESCENDING)], name=name)
+              for name, keys in REQUEST_INDEXES.items()]
+    return collection.create_indexes(models)
+
+
+# --- Cursor encoding ---
+def encode_cursor(document):
+    raw = json.dumps([document['submittedAt'].isoformat(), str(document['_id'])], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    """Returns (submittedAt, _id) from a token made by encode_cursor()."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        submitted_at, object_id = json.loads(raw)
+        return datetime.fromisoformat(submitted_at), ObjectId(object_id)
+    except (binascii.Error, ValueError, TypeError, InvalidId):
+        raise RequestQueryError("Invalid page cursor.")
+
+
+# --- Query building ---
+def parse_filters(args):
+    """The non-empty filters from the request arguments, validated."""
+    filters = {}
+    for name in FILTERS:
+        value = (args.get(name) or '').strip()
+        if value:
+            filters[name] = value
+    if 'status' in filters and filters['status'] not in REQUEST_STATUSES:
+        raise RequestQueryError(f"Unknown status: {filters['status']}.")
+    return filters
+
+
+def parse_page_size(value):
+    if value in (None, ''):
+        return PAGE_SIZE
+    try:
+        limit = int(value)
+    except ValueError:
+        raise RequestQueryError("'limit' must be an integer.")
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise RequestQueryError(f"'limit' must be between 1 and {MAX_PAGE_SIZE}.")
+    return limit
+
+
+def find_page(collection, args):
+    """
+    One dashboard page, newest first. Returns (requests, filters, next_cursor);
+    next_cursor is None on the last page.
+    """
+    filters = parse_filters(args)
+    limit = parse_page_size(args.get('limit'))
+    query = dict(filters)
+    if args.get('cursor'):
+        submitted_at, object_id = decode_cursor(args['cursor'])
+        # The plain bound gives the planner tight index bounds; the $or breaks ties on _id.
+        query['submittedAt'] = {'$lte': submitted_at}
+        query['$or'] = [{'submittedAt': {'$lt': submitted_at}},
+                        {'submittedAt': submitted_at, '_id': {'$lt': object_id}}]
+    cursor = collection.find(query).sort([('submittedAt', DESCENDING), ('_id', DESCENDING)])
+    # Fetch one extra card to learn whether another page exists without a count.
+    requests = list(cursor.limit(limit + 1))
+    next_cursor = None
+    if len(requests) > limit:
+        requests = requests[:limit]
+        next_cursor = encode_cursor(requests[-1])
+    return requests, filters, next_cursor
@@ -1,115 +1,276 @@
-import requests
+# test.py
+# Load generator and latency benchmark for the WFH request app.
+#
+# Worker threads drive a weighted mix of the three user flows:
+#   submit  POST /submit_request with a generated request
+#   view    GET /view_requests (first page, sometimes filtered to Pending); the
+#           ids of the Pending cards on the page are collected
+#   update  POST /update_status/<id> for a collected Pending request (Approve or
+#           Reject); falls back to a view when no id is known yet
+# By default the app runs in-process (Flask test client, no network) against the
+# MongoDB from MONGO_URI; --mongomock uses an in-memory stand-in instead (pip
+# install mongomock), and --url drives a running server over HTTP.
+#
+# The report is JSON, so runs can be kept and compared: configuration, wall time,
+# throughput, and per operation the count, error rate (HTTP status >= 400 or an
+# exception) and p50/p95/p99/max latency in milliseconds.
+#
+# Usage:
+#   python test.py --mongomock --duration 10 --concurrency 8
+#   python test.py --requests 5000 --mix submit=1,view=3,update=1 -o run.json
+#   python test.py --url http://127.0.0.1:5002 --duration 30 --concurrency 32
+
+import re
+import sys
 import json
-from bs4 import BeautifulSoup # Import BeautifulSoup
+import time
+import random
+import argparse
+import platform
+import threading
+from collections import deque
+from datetime import datetime, timezone
 
 # --- Configuration ---
-FLASK_APP_URL = "http://127.0.0.1:5000" # Make sure this matches your app's host/port
-VIEW_REQUESTS_URL = f"{FLASK_APP_URL}/view_requests"
-UPDATE_STATUS_URL_TEMPLATE = f"{FLASK_APP_URL}/update_status/{{request_id}}" # Template for the update URL
-
-# Set the desired new status for the FIRST request found
-NEW_STATUS = "Approved" # Or "Rejected"
-# --- End Configuration ---
-
-def get_first_request_id():
-    """Fetches the view page and extracts the _id of the first request."""
-    print(f"Fetching requests page: {VIEW_REQUESTS_URL}")
-    try:
-        response = requests.get(VIEW_REQUESTS_URL, timeout=10) # Add timeout
-        response.raise_for_status() # Raise error for bad status codes (4xx, 5xx)
-
-        # Parse the HTML content
-        soup = BeautifulSoup(response.text, 'lxml') # Use lxml parser
-
-        # Find the container for submission items
-        submission_list = soup.find('div', id='submissionList')
-        if not submission_list:
-             print("Error: Could not find submission list container ('#submissionList') on the page.")
-             return None
-
-        # Find the first submission item div within the list
-        # It should have the class 'submission-item' and a 'data-request-id' attribute
-        first_item = submission_list.find('div', class_='submission-item', attrs={'data-request-id': True})
-
-        if first_item and 'data-request-id' in first_item.attrs:
-            request_id = first_item['data-request-id']
-            print(f"Found request ID: {request_id}")
-            return request_id
-        else:
-            print("No submission items with 'data-request-id' found on the page.")
-            # Check if the 'no-data' message is present
-            no_data_div = submission_list.find('div', class_='no-data')
-            if no_data_div:
-                print("Reason: 'No Requests Found' message is displayed.")
-            return None
-
-    except requests.exceptions.ConnectionError as e:
-        print(f"\nError: Could not connect to the server at {FLASK_APP_URL}.")
-        print("Please ensure your Flask application is running.")
-        return None
-    except requests.exceptions.Timeout:
-         print(f"\nError: Request to {VIEW_REQUESTS_URL} timed out.")
-         return None
-    except requests.exceptions.HTTPError as e:
-         print(f"\nError: Failed to fetch view page. Status Code: {response.status_code} ({response.reason})")
-         return None
-    except Exception as e:
-        print(f"\nAn unexpected error occurred while fetching/parsing the view page: {e}")
-        return None
+DEFAULT_MIX = 'submit=20,view=60,update=20'
+OPERATIONS = ('submit', 'view', 'update')
+SEED_REQUESTS = 200 # Pending requests inserted before the run, so views and updates have data
+PENDING_ID_PATTERN = re.compile(r'<span class="status Pending" id="status-([0-9a-f]{24})"') # Cards still awaiting a decision
+PROJECTS = ['Apollo', 'Gemini', 'Mercury', 'Voyager']
+MANAGERS = ['Asha Rao', 'Vikram Das', 'Meera Iyer']
+LOCATIONS = ['Home', 'Hyderabad', 'Pune']
+
+
+# --- Targets: in-process test client, or HTTP ---
+class InProcessTarget:
+    """Calls the Flask app directly; one test client per thread."""
+
+    def __init__(self, use_mongomock):
+        if use_mongomock:
+            import mongomock
+        import app as wfh_app
+        if use_mongomock:
+            # mongomock cannot run the connection check in init_db(); bind the collection directly.
+            # It also lacks the pipeline update behind ETags, so conditional GET is off.
+            wfh_app.client = mongomock.MongoClient()
+            wfh_app.db = wfh_app.client[wfh_app.DB_NAME]
+            wfh_app.requests_collection = wfh_app.db[wfh_app.COLLECTION_NAME]
+            wfh_app.requests_version = None
+            wfh_app.ensure_indexes(wfh_app.requests_collection)
+        if wfh_app.requests_collection is None:
+            raise SystemExit("Database not available; start mongod, set MONGO_URI, or use --mongomock.")
+        self.app = wfh_app
+        self._local = threading.local()
+
+    def _client(self):
+        if not hasattr(self._local, 'client'):
+            self._local.client = self.app.app.test_client()
+        return self._local.client
+
+    def get(self, path):
+        response = self._client().get(path)
+        return response.status_code, response.get_data(as_text=True)
+
+    def post(self, path, payload):
+        response = self._client().post(path, json=payload)
+        return response.status_code, response.get_json(silent=True)
+
 
+class HttpTarget:
+    """Drives a running server; one requests.Session (connection pool) per thread."""
 
-def send_status_update(request_id, status):
-    """Sends the POST request to update the status for the given request ID."""
-    update_url = UPDATE_STATUS_URL_TEMPLATE.format(request_id=request_id)
-    payload = {"status": status}
-    headers = {"Content-Type": "application/json"}
+    def __init__(self, base_url):
+        import requests
+        self.requests = requests
+        self.base_url = base_url.rstrip('/')
+        self._local = threading.local()
 
-    print(f"\nAttempting to send POST request to: {update_url}")
-    print(f"With JSON payload: {json.dumps(payload)}")
+    def _session(self):
+        if not hasattr(self._local, 'session'):
+            self._local.session = self.requests.Session()
+        return self._local.session
 
-    try:
-        response = requests.post(update_url, headers=headers, json=payload, timeout=10)
-        response.raise_for_status() # Check for 4xx/5xx errors
+    def get(self, path):
+        response = self._session().get(self.base_url + path, timeout=30)
+        return response.status_code, response.text
 
-        print("\nRequest Successful!")
-        print(f"Status Code: {response.status_code}")
+    def post(self, path, payload):
+        response = self._session().post(self.base_url + path, json=payload, timeout=30)
         try:
-            print("Response JSON:")
-            print(json.dumps(response.json(), indent=2))
-        except json.JSONDecodeError:
-            print("Response Body (non-JSON):")
-            print(response.text)
-        return True # Indicate success
-
-    except requests.exceptions.ConnectionError:
-        print(f"\nError: Could not connect to the server at {FLASK_APP_URL} to update status.")
-        return False
-    except requests.exceptions.Timeout:
-         print(f"\nError: Update request to {update_url} timed out.")
-         return False
-    except requests.exceptions.HTTPError as e:
-        print(f"\nError: HTTP Error Occurred during status update.")
-        print(f"Status Code: {response.status_code} ({response.reason})")
+            return response.status_code, response.json()
+        except ValueError:
+            return response.status_code, None
+
+
+# --- The three flows ---
+def new_request(rng):
+    employee = rng.randrange(10_000)
+    day = rng.randrange(1, 28)
+    return {
+        'name': f'Employee {employee}', 'id': f'EMP{employee:04d}', 'email': f'emp{employee}@example.com',
+        'project': rng.choice(PROJECTS), 'manager': rng.choice(MANAGERS), 'location': rng.choice(LOCATIONS),
+        'from': f'2025-07-{day:02d}', 'to': f'2025-07-{day + 1:02d}', 'reason': 'Load test',
+    }
+
+
+class LoadTest:
+    def __init__(self, target, mix, concurrency, duration=None, total=None, seed=0):
+        self.target = target
+        self.operations = [name for name, weight in mix.items() if weight > 0]
+        self.weights = [mix[name] for name in self.operations]
+        self.concurrency = concurrency
+        self.duration = duration
+        self.total = total
+        self.seed = seed
+        self.pending_ids = deque(maxlen=10_000) # Pending requests seen on a page, for 'update'
+        self.samples = {name: [] for name in OPERATIONS} # (milliseconds, ok)
+        self._issued = 0
+        self._lock = threading.Lock()
+
+    def _next_ticket(self):
+        with self._lock:
+            if self.total is not None and self._issued >= self.total:
+                return False
+            self._issued += 1
+            return True
+
+    def _record(self, name, began, ok):
+        elapsed = (time.perf_counter() - began) * 1000
+        with self._lock:
+            self.samples[name].append((elapsed, ok))
+
+    def submit(self, rng):
+        began = time.perf_counter()
+        status, _ = self.target.post('/submit_request', new_request(rng))
+        self._record('submit', began, status < 400)
+
+    def view(self, rng):
+        path = '/view_requests?status=Pending' if rng.random() < 0.5 else '/view_requests'
+        began = time.perf_counter()
+        status, page = self.target.get(path)
+        self._record('view', began, status < 400)
+        if status < 400:
+            self.pending_ids.extend(PENDING_ID_PATTERN.findall(page))
+
+    def update(self, rng):
         try:
-            print("Server Response:")
-            print(json.dumps(response.json(), indent=2))
-        except json.JSONDecodeError:
-            print("Server Response (non-JSON):")
-            print(response.text)
-        return False
-    except requests.exceptions.RequestException as e:
-        print(f"\nError: An error occurred during the update request: {e}")
-        return False
-    except Exception as e:
-         print(f"\nAn unexpected error occurred during status update: {e}")
-         return False
+            request_id = self.pending_ids.popleft()
+        except IndexError:
+            return self.view(rng) # Nothing to decide yet
+        began = time.perf_counter()
+        status, _ = self.target.post(f'/update_status/{request_id}', {'status': rng.choice(['Approved', 'Rejected'])})
+        self._record('update', began, status < 400)
+
+    def _worker(self, index, deadline):
+        rng = random.Random(self.seed * 1000 + index)
+        flows = {name: getattr(self, name) for name in OPERATIONS}
+        while (deadline is None or time.monotonic() < deadline) and self._next_ticket():
+            name = rng.choices(self.operations, self.weights)[0]
+            try:
+                flows[name](rng)
+            except Exception:
+                with self._lock:
+                    self.samples[name].append((0.0, False))
+
+    def run(self):
+        deadline = time.monotonic() + self.duration if self.duration else None
+        threads = [threading.Thread(target=self._worker, args=(i, deadline)) for i in range(self.concurrency)]
+        began = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - began
+
+
+# --- Report ---
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * p // 100)) # ceil(n * p / 100)
+    return round(sorted_values[int(rank) - 1], 3)
+
+
+def summarize(samples, elapsed):
+    latencies = sorted(ms for ms, ok in samples if ok)
+    errors = sum(1 for _, ok in samples if not ok)
+    return {
+        'requests': len(samples),
+        'errors': errors,
+        'error_rate': round(errors / len(samples), 4) if samples else 0.0,
+        'throughput_rps': round(len(samples) / elapsed, 1) if elapsed else 0.0,
+        'latency_ms': {'p50': percentile(latencies, 50), 'p95': percentile(latencies, 95),
+                       'p99': percentile(latencies, 99),
+                       'max': round(latencies[-1], 3) if latencies else None},
+    }
+
+
+def report(test, options, elapsed):
+    every = [sample for name in OPERATIONS for sample in test.samples[name]]
+    return {
+        'started_at': options.started_at,
+        'config': {'target': options.url or ('mongomock' if options.mongomock else 'in-process'),
+                   'concurrency': options.concurrency, 'duration_s': options.duration,
+                   'requests': options.requests, 'mix': dict(zip(test.operations, test.weights)),
+                   'seed_requests': options.seed_requests},
+        'environment': {'python': platform.python_version(), 'platform': platform.platform()},
+        'elapsed_s': round(elapsed, 3),
+        'total': summarize(every, elapsed),
+        'operations': {name: summarize(test.samples[name], elapsed) for name in OPERATIONS if test.samples[name]},
+    }
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        if name.strip() not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"Unknown operation '{name}'; use {', '.join(OPERATIONS)}.")
+        try:
+            mix[name.strip()] = float(weight)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"Weight of '{name}' must be a number.")
+    if not any(weight > 0 for weight in mix.values()):
+        raise argparse.ArgumentTypeError("At least one operation needs a positive weight.")
+    return mix
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent load test for the WFH request app; prints a JSON report.")
+    parser.add_argument('--url', help="Base URL of a running server (default: run the app in-process)")
+    parser.add_argument('--mongomock', action='store_true', help="In-process against an in-memory MongoDB stand-in")
+    parser.add_argument('-c', '--concurrency', type=int, default=8, help="Worker threads")
+    parser.add_argument('-d', '--duration', type=float, help="Seconds to run (default 10 unless --requests is given)")
+    parser.add_argument('-n', '--requests', type=int, help="Stop after this many operations")
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help=f"Relative weights, e.g. {DEFAULT_MIX}")
+    parser.add_argument('--seed-requests', type=int, default=SEED_REQUESTS, help="Pending requests created first")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed for the request mix")
+    parser.add_argument('-o', '--output', help="Also write the JSON report to this file")
+    options = parser.parse_args(argv)
+    if options.duration is None and options.requests is None:
+        options.duration = 10.0
+    return options
+
 
 # --- Main Execution ---
-if __name__ == "__main__":
-    extracted_request_id = get_first_request_id()
+def main(argv=None):
+    options = parse_args(argv)
+    options.started_at = datetime.now(timezone.utc).isoformat()
+    target = HttpTarget(options.url) if options.url else InProcessTarget(options.mongomock)
+    for i in range(options.seed_requests):
+        target.post('/submit_request', new_request(random.Random(i)))
+    test = LoadTest(target, options.mix, options.concurrency, options.duration, options.requests, options.seed)
+    elapsed = test.run()
+    result = report(test, options, elapsed)
+    text = json.dumps(result, indent=2)
+    print(text)
+    if options.output:
+        with open(options.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    return 1 if result['total']['errors'] else 0
 
-    if extracted_request_id:
-        print(f"\nProceeding to update status for request ID: {extracted_request_id} to '{NEW_STATUS}'")
-        send_status_update(extracted_request_id, NEW_STATUS)
-    else:
-        print("\nCould not extract a request ID. Status update aborted.")
\ No newline at end of file
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,23 @@
 import os
-from flask import Flask, render_template, request, jsonify
+import click
+from flask import Flask, render_template, request, jsonify, url_for
 from pymongo import MongoClient
-from pymongo.errors import ConnectionFailure, OperationFailure
+from pymongo.errors import ConnectionFailure, OperationFailure, BulkWriteError
 from dotenv import load_dotenv
 from bson import ObjectId # To handle MongoDB ObjectIds
+from bson.errors import InvalidId
 from datetime import datetime, timezone # To handle dates correctly
-import re # For potential regex validation
+from leave_queries import LeaveQueryError, ensure_indexes, find_page, open_stream
+from leave_intervals import ApprovedLeaveIndex, ensure_overlap_index
+from leave_json import encode_leaves, iter_json # Schema-specific JSON encoder for leave documents
+from leave_validation import validate_leave
+from leave_bulk import MAX_BULK_ITEMS, approved_overlapping, resolve_overlaps
+import leave_rollups
+import leave_changes
+from leave_approvals import DECISIONS, set_status, LeaveNotFound, ApprovalConflict, EmployeeBusy
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # Shared modules at the repo root
+from http_cache import CollectionVersion, ResponseCache, conditional_get
 
 # Load environment variables from .env file
 load_dotenv()
@@ -16,6 +28,11 @@ app = Flask(__name__)
 # --- MongoDB Connection ---
 MONGO_URI = os.getenv("MONGO_URI")
 DATABASE_NAME = os.getenv("DATABASE_NAME", "leave_management")
+# In-memory overlap index over Approved leaves (see leave_intervals.py)
+LEAVE_INDEX_ENABLED = os.getenv("LEAVE_INDEX", "1").lower() in ['1', 'true', 'yes']
+LEAVE_INDEX_REFRESH = float(os.getenv("LEAVE_INDEX_REFRESH", 60)) # Seconds; 0 disables background reloads
+LEAVE_INDEX_MAX_STALE = float(os.getenv("LEAVE_INDEX_MAX_STALE", 5)) # Seconds an overlap miss is trusted without MongoDB
+STREAM_BATCH_SIZE = int(os.getenv("LEAVES_STREAM_BATCH_SIZE", 1000)) # Documents per cursor batch / response chunk
 
 if not MONGO_URI:
     print("❌ ERROR: MONGO_URI environment variable not set.")
@@ -25,55 +42,61 @@ if not MONGO_URI:
 client = None
 db = None
 leaves_collection = None
+rollups_collection = None
+tombstones_collection = None
+locks_collection = None
+leaves_version = None # Write counter behind the ETag / Last-Modified of GET /api/leaves
+leaves_response_cache = ResponseCache()
+leave_index = ApprovedLeaveIndex(LEAVE_INDEX_REFRESH, LEAVE_INDEX_MAX_STALE)
+_db_pid = None # Process that opened 'client'; a forked worker must open its own
+
+def init_db():
+    """Connects to MongoDB and binds the module-level client/db/collection for this process."""
+    global client, db, leaves_collection, rollups_collection, tombstones_collection, locks_collection
+    global leaves_version, leave_index, _db_pid
+    client, db, leaves_collection, rollups_collection, tombstones_collection, locks_collection = None, None, None, None, None, None
+    leaves_version = None
+    leave_index = ApprovedLeaveIndex(LEAVE_INDEX_REFRESH, LEAVE_INDEX_MAX_STALE)
+    _db_pid = os.getpid()
+    try:
+        print(f"⏳ Attempting to connect to MongoDB...")
+        client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000)
+        client.admin.command('ping') # Check connection
+        print("✅ MongoDB connection successful!")
+        db = client[DATABASE_NAME]
+        leaves_collection = db["applications"] # Collection name
+        rollups_collection = db["leave_rollups"] # Pre-aggregated stats (see leave_rollups.py)
+        tombstones_collection = db["leave_tombstones"] # Deleted leaves, for delta sync (see leave_changes.py)
+        locks_collection = db["employee_locks"] # Per-employee approval locks (see leave_approvals.py)
+        leaves_version = CollectionVersion(db["collection_versions"], leaves_collection.name)
+        print(f"   Using database: '{DATABASE_NAME}'")
+        print(f"   Using collection: '{leaves_collection.name}'")
+        # Compound indexes behind the /api/leaves filters and keyset pagination
+        try:
+            ensure_indexes(leaves_collection)
+            ensure_overlap_index(leaves_collection)
+            leave_rollups.ensure_indexes(rollups_collection)
+            leave_changes.ensure_indexes(leaves_collection, tombstones_collection)
+        except OperationFailure as ofe:
+            print(f"⚠️ Could not create listing indexes (listing still works, only slower): {ofe}")
+        try:
+            backfilled = leave_changes.backfill(leaves_collection)
+            if backfilled:
+                print(f"   Set lastModified on {backfilled} older leaves")
+        except OperationFailure as ofe:
+            print(f"⚠️ Could not backfill lastModified (older leaves are missing from /api/leaves/changes): {ofe}")
+        if LEAVE_INDEX_ENABLED:
+            try:
+                count = leave_index.build(leaves_collection)
+                print(f"   Loaded {count} approved leaves into the overlap index")
+            except Exception as e:
+                print(f"⚠️ Could not load the overlap index (overlap checks will query MongoDB): {e}")
+    except ConnectionFailure as ce:
+        print(f"❌ MongoDB Connection Failure: {ce}")
+    except Exception as e:
+        print(f"❌ An error occurred during MongoDB setup: {e}")
 
-try:
-    print(f"⏳ Attempting to connect to MongoDB...")
-    client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000)
-    client.admin.command('ping') # Check connection
-    print("✅ MongoDB connection successful!")
-    db = client[DATABASE_NAME]
-    leaves_collection = db["applications"] # Collection name
-    print(f"   Using database: '{DATABASE_NAME}'")
-    print(f"   Using collection: '{leaves_collection.name}'")
-    # Optional: Create indexes for faster querying
-    # leaves_collection.create_index([("empId", 1)])
-    # leaves_collection.create_index([("submittedAt", -1)])
-except ConnectionFailure as ce:
-    print(f"❌ MongoDB Connection Failure: {ce}")
-except Exception as e:
-    print(f"❌ An error occurred during MongoDB setup: {e}")
-
-# --- Helper Function to Serialize MongoDB Docs ---
-def serialize_doc(doc):
-    """Converts MongoDB document to JSON-serializable dict."""
-    if doc is None: return None
-    serialized = {}
-    for key, value in doc.items():
-        if isinstance(value, ObjectId):
-            serialized['id'] = str(value) # Use 'id' for frontend consistency
-        elif isinstance(value, datetime):
-            # Ensure timezone is UTC before formatting
-            if value.tzinfo is None:
-                 value = value.replace(tzinfo=timezone.utc)
-            else:
-                 value = value.astimezone(timezone.utc)
-            serialized[key] = value.strftime('%Y-%m-%dT%H:%M:%S.%fZ') # ISO format Z indicates UTC
-        else:
-            # Keep _id as string 'id' if it wasn't an ObjectId somehow
-            if key == '_id':
-                 serialized['id'] = str(value)
-            else:
-                 serialized[key] = value
-
-    # Ensure 'id' field exists if '_id' was present
-    if '_id' in doc and 'id' not in serialized:
-         serialized['id'] = str(doc['_id'])
-
-    # Remove original '_id' if it exists and we added 'id'
-    if '_id' in serialized:
-        del serialized['_id']
-
-    return serialized
+init_db()
 
 # --- Flask Routes ---
 
@@ -83,19 +106,143 @@ def index():
     return render_template('index.html')
 
 @app.route('/api/leaves', methods=['GET'])
+@conditional_get(lambda: leaves_version, leaves_response_cache)
 def get_leaves():
-    """API: Fetch all leave applications."""
+    """
+    API: Fetch leave applications, newest first.
+    Optional query parameters:
+      limit   page size (1-500); without it every matching leave is returned
+      cursor  value of the previous page's X-Next-Cursor header
+      order   'desc' (default) or 'asc' by submittedAt
+      empId, status (comma-separated list allowed), leaveType
+      from, to  YYYY-MM-DD; leaves overlapping this range
+      fields  comma-separated subset of the leave fields
+      stream  'json' or 'ndjson': stream every matching leave in chunks instead of
+              building the whole response in memory (not combinable with limit/cursor)
+    The body is a JSON array (one document per line for ndjson). When more pages
+    exist, the X-Next-Cursor and Link headers point to the next one.
+    Responses carry an ETag and Last-Modified; a matching conditional request gets 304.
+    """
     if leaves_collection is None:
         return jsonify({"error": "Database not available"}), 503 # Service Unavailable
+    if request.args.get('stream'):
+        return stream_leaves()
     try:
-        # Sort by submission date descending (newest first)
-        leaves_cursor = leaves_collection.find().sort("submittedAt", -1)
-        leaves_list = [serialize_doc(leave) for leave in leaves_cursor]
-        return jsonify(leaves_list)
+        leaves, next_cursor = find_page(leaves_collection, request.args)
+        response = app.response_class(encode_leaves(leaves), mimetype='application/json')
+        if next_cursor:
+            response.headers['X-Next-Cursor'] = next_cursor
+            next_args = request.args.to_dict()
+            next_args['cursor'] = next_cursor
+            response.headers['Link'] = f'<{url_for("get_leaves", **next_args)}>; rel="next"'
+        return response
+    except LeaveQueryError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         print(f"❌ Error fetching leaves: {e}")
         return jsonify({"error": "Failed to fetch leave data"}), 500
 
+def stream_leaves():
+    """Streamed variant of get_leaves(): memory stays at one cursor batch regardless of result size."""
+    fmt = request.args.get('stream')
+    try:
+        cursor = open_stream(leaves_collection, request.args, STREAM_BATCH_SIZE)
+    except LeaveQueryError as e:
+        return jsonify({"error": str(e)}), 400
+
+    def on_close(sent, completed):
+        if not completed:
+            print(f"⚠️ Leave stream stopped after {sent} documents (client disconnected or error)")
+
+    mimetype = 'application/x-ndjson' if fmt == 'ndjson' else 'application/json'
+    return app.response_class(iter_json(cursor, STREAM_BATCH_SIZE, fmt, on_close), mimetype=mimetype)
+
+def bump_leaves_version():
+    try:
+        leaves_version.bump()
+    except Exception as e:
+        leaves_response_cache.clear()
+        print(f"⚠️ Could not bump the leaves version (cached listings may be stale until the next write): {e}")
+
+def record_writes(leaves):
+    """Bookkeeping after leaves were saved: bumps the listing version and updates the stats rollups."""
+    if not leaves:
+        return
+    bump_leaves_version()
+    # A failed rollup update only leaves drift for the nightly rebuild
+    try:
+        leave_rollups.record_leaves(rollups_collection, leaves)
+    except Exception as e:
+        print(f"⚠️ Could not update leave rollups (run 'flask rebuild-rollups' to reconcile): {e}")
+
+@app.route('/api/leaves/changes', methods=['GET'])
+def get_changes():
+    """
+    API: Delta sync. Leaves submitted or modified, and ids of leaves deleted, since a change token:
+      since   the 'next' token of the previous response; omit it for a first full sync
+      limit   maximum entries per response (1-500, default 500)
+      fields  comma-separated subset of the leave fields
+    Returns {"changes": [...], "deleted": [{"id", "lastModified"}], "next": token, "hasMore": bool}.
+    Poll again with 'next' (at once while hasMore). Changes show up after CHANGES_SETTLE_MS;
+    a token older than the tombstone retention gets 410 and the client must reload the full list.
+    """
+    if leaves_collection is None:
+        return jsonify({"error": "Database not available"}), 503
+    try:
+        result = leave_changes.find_changes(leaves_collection, tombstones_collection, request.args)
+        return app.response_class(leave_changes.encode_changes(*result), mimetype='application/json')
+    except leave_changes.ChangeTokenExpired as e:
+        return jsonify({"error": str(e)}), 410 # Gone
+    except LeaveQueryError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print(f"❌ Error fetching leave changes: {e}")
+        return jsonify({"error": "Failed to fetch leave changes"}), 500
+
+@app.route('/api/leaves/stats', methods=['GET'])
+def get_stats():
+    """
+    API: Leave statistics from the rollups, e.g.
+    /api/leaves/stats?from=2025-01&to=2025-12&status=Approved&groupBy=month,leaveType
+    Returns [{month, leaveType, ..., leaves, days}]; 'days' are calendar days within each month.
+    """
+    if rollups_collection is None:
+        return jsonify({"error": "Database not available"}), 503
+    try:
+        return jsonify(leave_rollups.query_stats(rollups_collection, request.args))
+    except LeaveQueryError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print(f"❌ Error fetching leave stats: {e}")
+        return jsonify({"error": "Failed to fetch leave statistics"}), 500
+
+@app.route('/api/leaves/conflicts', methods=['GET'])
+def get_conflicts():
+    """
+    API: Approved leaves of one employee that overlap a date range, e.g.
+    /api/leaves/conflicts?empId=ABC0123&from=2025-05-01&to=2025-05-03 ('to' defaults to 'from').
+    """
+    if leaves_collection is None:
+        return jsonify({"error": "Database not available"}), 503
+    emp_id = request.args.get('empId', '').strip()
+    from_str = request.args.get('from', '').strip()
+    to_str = request.args.get('to', '').strip() or from_str
+    if not emp_id or not from_str:
+        return jsonify({"error": "'empId' and 'from' are required."}), 400
+    try:
+        from_dt = datetime.strptime(from_str, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+        to_dt = datetime.strptime(to_str, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+    except ValueError:
+        return jsonify({"error": "'from' and 'to' must be dates in YYYY-MM-DD format."}), 400
+    if to_dt < from_dt:
+        return jsonify({"error": "'to' cannot be before 'from'."}), 400
+    try:
+        conflicts = leave_index.find_conflicts(leaves_collection, emp_id, from_dt, to_dt)
+        return app.response_class(encode_leaves(conflicts), mimetype='application/json')
+    except Exception as e:
+        print(f"❌ Error fetching conflicts: {e}")
+        return jsonify({"error": "Failed to fetch conflicting leaves"}), 500
+
 @app.route('/api/leaves', methods=['POST'])
 def submit_leave():
     """API: Submit a new leave application."""
@@ -108,114 +255,24 @@ def submit_leave():
     data = request.get_json()
 
     # --- Server-Side Validation ---
-    required_fields = ['name', 'empId', 'email', 'leaveType', 'fromDate', 'toDate', 'reason']
-    errors = {}
-
-    for field in required_fields:
-        # Use .get() with default empty string to avoid KeyError if field missing entirely
-        if not data.get(field, '').strip():
-            # Create user-friendly field names
-            field_name = field.replace('Type', ' type').replace('Date', ' date')
-            field_name = field_name[0].upper() + field_name[1:]
-            errors[field] = f"{field_name} is required."
-
-    # Specific format/length validations (should mirror frontend logic)
-    if 'name' not in errors and not (3 <= len(data.get('name', '')) <= 50):
-         errors['name'] = "Name must be 3-50 characters."
-    # Employee ID validation (matches original JS pattern)
-    if 'empId' not in errors and not re.match(r"^[A-Z]{3}0[0-9]{3}$", data.get('empId', '')):
-        errors['empId'] = "Employee ID format: 3 Caps, '0', 3 digits (e.g., ABC0123)."
-    # Email validation (matches original JS pattern)
-    if 'email' not in errors and not re.match(r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$", data.get('email', '')):
-        errors['email'] = "Invalid email format."
-    # Reason length (matches original JS min/maxlength)
-    if 'reason' not in errors and not (5 <= len(data.get('reason', '')) <= 100): # Max 100 from original textarea
-         errors['reason'] = "Reason must be 5-100 characters."
-
-    # Date logic validation
-    from_dt, to_dt = None, None # Initialize
-    try:
-        from_date_str = data.get('fromDate')
-        to_date_str = data.get('toDate')
-        if 'fromDate' not in errors and from_date_str:
-             from_dt = datetime.strptime(from_date_str, "%Y-%m-%d").replace(tzinfo=timezone.utc)
-        if 'toDate' not in errors and to_date_str:
-             to_dt = datetime.strptime(to_date_str, "%Y-%m-%d").replace(tzinfo=timezone.utc)
-
-        if from_dt and to_dt and to_dt < from_dt:
-             errors['toDate'] = "To Date cannot be before From Date."
-
-        # Optional: Validate against being too far in past/future (mirroring JS)
-        # today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
-        # six_months_later = (datetime.now(timezone.utc) + timedelta(days=180)).replace(hour=23, minute=59, second=59)
-        # if from_dt and (from_dt < today or from_dt > six_months_later):
-        #     errors['fromDate'] = "From Date must be today or within the next 6 months."
-
-    except (ValueError, TypeError) as date_err:
-        print(f"Date parsing error: {date_err}")
-        if 'fromDate' not in errors and not from_dt: errors['fromDate'] = "Invalid From Date."
-        if 'toDate' not in errors and not to_dt: errors['toDate'] = "Invalid To Date."
-
-    # Hour validation (only if dates are valid and the same)
-    if from_dt and to_dt and from_dt == to_dt:
-        from_h, to_h = data.get('fromHour'), data.get('toHour')
-        if from_h and to_h: # Only validate if both are provided for a single day
-            try:
-                t1 = datetime.strptime(from_h, '%H:%M').time()
-                t2 = datetime.strptime(to_h, '%H:%M').time()
-                if t1 >= t2:
-                     errors['fromHour'] = errors.get('fromHour',"From Hour must be before To Hour.") # Keep existing error if any
-                # Check min duration (30 mins)
-                dt1 = datetime.combine(datetime.min.date(), t1)
-                dt2 = datetime.combine(datetime.min.date(), t2)
-                if (dt2 - dt1).total_seconds() < 30 * 60:
-                     errors['toHour'] = errors.get('toHour',"Minimum duration is 30 minutes.")
-            except ValueError:
-                 # Don't overwrite existing 'fromHour' error if 'toHour' is invalid format
-                 if 'fromHour' not in errors: errors['fromHour'] = "Invalid time format."
-                 if 'toHour' not in errors: errors['toHour'] = "Invalid time format."
-    else:
-        # Ensure hours are nullified if dates are different
-        data['fromHour'] = None
-        data['toHour'] = None
-
-
+    new_leave, errors = validate_leave(data)
     if errors:
         # Return specific validation errors
         return jsonify({"error": "Validation failed", "details": errors}), 400
 
     # --- Passed Validation ---
     try:
-        # --- Prepare data for MongoDB ---
-        new_leave = {
-            "name": data["name"].strip(),
-            "empId": data["empId"].strip(),
-            "email": data["email"].strip().lower(),
-            "leaveType": data["leaveType"],
-            "fromDate": from_dt, # Use validated UTC datetime
-            "toDate": to_dt,     # Use validated UTC datetime
-            "fromHour": data.get("fromHour"), # Will be None if dates differ or not provided
-            "toHour": data.get("toHour"),
-            "reason": data["reason"].strip(),
-            "status": "Pending",
-            "submittedAt": datetime.now(timezone.utc)
-        }
-
         # --- Overlap Check ---
-        overlap_query = {
-            "status": "Approved",
-            "empId": new_leave["empId"],
-            "$or": [
-                # Date ranges overlap: (StartA <= EndB) and (EndA >= StartB)
-                {"fromDate": {"$lte": new_leave["toDate"]}, "toDate": {"$gte": new_leave["fromDate"]}}
-            ]
-        }
-        # Use count_documents for efficiency if just checking existence
-        if leaves_collection.count_documents(overlap_query) > 0:
+        # Answered from the in-memory index; MongoDB confirms hits and covers the index being unavailable
+        if leave_index.has_overlap(leaves_collection, new_leave["empId"], new_leave["fromDate"], new_leave["toDate"]):
              return jsonify({"error": "Leave request overlaps with an existing approved leave."}), 409
 
         # --- Insert into MongoDB ---
-        result = leaves_collection.insert_one(new_leave)
+        new_leave["lastModified"] = leave_changes.stamp() # Change token, taken right before the write
+        result = leaves_collection.insert_one(new_leave) # Sets new_leave['_id']
+        leave_changes.restamp_if_late(leaves_collection, [new_leave], new_leave["lastModified"])
+        leave_index.apply(new_leave)
+        record_writes([new_leave])
 
         # Return success response
         return jsonify({
@@ -231,6 +288,165 @@ def submit_leave():
         # Log the full error traceback here for debugging
         return jsonify({"error": "An internal server error occurred"}), 500
 
+@app.route('/api/leaves/bulk', methods=['POST'])
+def submit_leaves_bulk():
+    """
+    API: Submit many leave applications at once (HR imports of holidays, shutdowns).
+    Body: a JSON array of leaves (or {"leaves": [...]}), each shaped like POST /api/leaves.
+    Every item is validated, then checked for overlaps against Approved leaves and
+    against earlier items of the same batch; the rest are inserted together.
+    Returns per-item results in request order: status 'created' (with id), 'invalid'
+    (with details), 'conflict' (with the overlapping leave ids or batch indexes) or 'failed'.
+    """
+    if leaves_collection is None:
+        return jsonify({"error": "Database not available"}), 503
+    if not request.is_json:
+        return jsonify({"error": "Invalid request format: JSON required"}), 400
+
+    items = request.get_json()
+    if isinstance(items, dict):
+        items = items.get('leaves')
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "Expected a non-empty JSON array of leaves"}), 400
+    if len(items) > MAX_BULK_ITEMS:
+        return jsonify({"error": f"At most {MAX_BULK_ITEMS} leaves per request"}), 413
+
+    # --- Validation (one pass) ---
+    results = [None] * len(items)
+    valid = [] # (request index, document to insert)
+    submitted_at = datetime.now(timezone.utc)
+    for i, data in enumerate(items):
+        new_leave, errors = validate_leave(data, submitted_at)
+        if errors:
+            results[i] = {"index": i, "status": "invalid", "details": errors}
+        else:
+            valid.append((i, new_leave))
+
+    try:
+        # --- Overlap Check: one aggregation for every employee in the batch ---
+        approved = approved_overlapping(leaves_collection, [leave for _, leave in valid])
+        to_insert = []
+        for (i, leave), conflict in zip(valid, resolve_overlaps([leave for _, leave in valid], approved)):
+            if conflict is None:
+                to_insert.append((i, leave))
+            elif "approved" in conflict:
+                results[i] = {"index": i, "status": "conflict", "approved": conflict["approved"],
+                              "error": "Overlaps with an existing approved leave."}
+            else:
+                results[i] = {"index": i, "status": "conflict", "batchIndex": [valid[p][0] for p in conflict["batchIndex"]],
+                              "error": "Overlaps with another leave in this request."}
+
+        # --- Insert: unordered, so one failing document does not stop the rest ---
+        failed = {}
+        if to_insert:
+            stamped_at = leave_changes.stamp() # After validation and the overlap query, right before the write
+            for _, leave in to_insert:
+                leave["lastModified"] = stamped_at
+            try:
+                leaves_collection.insert_many([leave for _, leave in to_insert], ordered=False) # Sets each '_id'
+            except BulkWriteError as bwe:
+                failed = {error['index']: error.get('errmsg', 'Insert failed') for error in bwe.details.get('writeErrors', [])}
+                print(f"⚠️ Bulk insert: {len(failed)} of {len(to_insert)} documents failed")
+        inserted = []
+        for position, (i, leave) in enumerate(to_insert):
+            if position in failed:
+                results[i] = {"index": i, "status": "failed", "error": "Database error during submission"}
+            else:
+                leave_index.apply(leave)
+                inserted.append(leave)
+                results[i] = {"index": i, "status": "created", "id": str(leave["_id"])}
+        if inserted:
+            leave_changes.restamp_if_late(leaves_collection, inserted, stamped_at)
+        record_writes(inserted)
+
+    except OperationFailure as ofe:
+         print(f"❌ MongoDB Operation Failure during bulk POST: {ofe}")
+         return jsonify({"error": "Database error during submission"}), 500
+    except Exception as e:
+        print(f"❌ Error submitting leaves in bulk: {e}")
+        return jsonify({"error": "An internal server error occurred"}), 500
+
+    created = sum(1 for result in results if result["status"] == "created")
+    return jsonify({"created": created, "rejected": len(results) - created, "results": results}), 200
+
+@app.route('/api/leaves/<leave_id>/status', methods=['POST'])
+def update_leave_status(leave_id):
+    """
+    API: Approve or reject a leave. Body: {"status": "Approved" | "Rejected"}.
+    An approval is refused with 409 (and the conflicting ids) if it would overlap
+    another Approved leave of the same employee; concurrent approvals are serialised
+    per employee, so two overlapping leaves can never both be approved.
+    """
+    if leaves_collection is None:
+        return jsonify({"error": "Database not available"}), 503
+    if not request.is_json:
+        return jsonify({"error": "Invalid request format: JSON required"}), 400
+    new_status = (request.get_json() or {}).get('status')
+    if new_status not in DECISIONS:
+        return jsonify({"error": f"'status' must be one of: {', '.join(DECISIONS)}"}), 400
+    try:
+        object_id = ObjectId(leave_id)
+    except InvalidId:
+        return jsonify({"error": "Invalid leave id"}), 400
+
+    try:
+        leave, old_status = set_status(leaves_collection, locks_collection, object_id, new_status)
+    except LeaveNotFound as e:
+        return jsonify({"error": str(e)}), 404
+    except ApprovalConflict as e:
+        return jsonify({"error": str(e), "conflicts": [str(c) for c in e.conflicts]}), 409
+    except EmployeeBusy as e:
+        response = jsonify({"error": str(e)})
+        response.headers['Retry-After'] = '1'
+        return response, 503
+    except OperationFailure as ofe:
+        print(f"❌ MongoDB Operation Failure during status update: {ofe}")
+        return jsonify({"error": "Database error during status update"}), 500
+    except Exception as e:
+        print(f"❌ Error updating leave status: {e}")
+        return jsonify({"error": "An internal server error occurred"}), 500
+
+    if old_status == new_status:
+        return jsonify({"message": f"Leave is already {new_status}", "id": leave_id, "status": new_status}), 200
+    leave_index.apply(leave)
+    bump_leaves_version()
+    try:
+        leave_rollups.record_status_change(rollups_collection, leave, old_status)
+    except Exception as e:
+        print(f"⚠️ Could not update leave rollups (run 'flask rebuild-rollups' to reconcile): {e}")
+    return jsonify({"message": f"Leave {new_status.lower()}", "id": leave_id, "status": new_status}), 200
+
+@app.route('/api/leaves/<leave_id>', methods=['DELETE'])
+def delete_leave(leave_id):
+    """API: Delete a leave application; delta-sync clients see it in 'deleted'."""
+    if leaves_collection is None:
+        return jsonify({"error": "Database not available"}), 503
+    try:
+        object_id = ObjectId(leave_id)
+    except InvalidId:
+        return jsonify({"error": "Invalid leave id"}), 400
+    try:
+        leave = leaves_collection.find_one_and_delete({'_id': object_id})
+        if leave is None:
+            return jsonify({"error": "Leave not found"}), 404
+        try:
+            leave_changes.record_deletion(tombstones_collection, object_id)
+        except Exception as e:
+            print(f"⚠️ Could not record tombstone for {leave_id} (delta-sync clients will keep it): {e}")
+        leave_index.apply(dict(leave, status='Deleted')) # Drops it from the overlap index
+        bump_leaves_version()
+        try:
+            leave_rollups.record_deletion(rollups_collection, leave)
+        except Exception as e:
+            print(f"⚠️ Could not update leave rollups (run 'flask rebuild-rollups' to reconcile): {e}")
+        return jsonify({"message": "Leave deleted", "id": leave_id}), 200
+    except OperationFailure as ofe:
+        print(f"❌ MongoDB Operation Failure during DELETE: {ofe}")
+        return jsonify({"error": "Database error during deletion"}), 500
+    except Exception as e:
+        print(f"❌ Error deleting leave: {e}")
+        return jsonify({"error": "An internal server error occurred"}), 500
+
 # --- Error Handlers ---
 @app.errorhandler(404)
 def page_not_found(e):
@@ -245,6 +461,27 @@ def internal_server_error(e):
         return jsonify(error="Internal server error"), 500
     return "<h1>500 - Internal Server Error</h1>", 500
 
+# --- CLI Commands ---
+@app.cli.command('rebuild-rollups')
+@click.option('--dry-run', is_flag=True, help='Only report rollups that drifted; write nothing.')
+def rebuild_rollups_command(dry_run):
+    """Recomputes the leave stats rollups from the applications (run nightly, e.g. from cron)."""
+    if leaves_collection is None:
+        raise SystemExit("❌ Database not available")
+    report = leave_rollups.rebuild(leaves_collection, rollups_collection, dry_run=dry_run)
+    print(f"Rollups: {report['rollups']}, drifted: {len(report['changed'])}, stale: {len(report['removed'])}")
+    for key in report['changed'] + report['removed']:
+        print(f"  {key}")
+    if dry_run and (report['changed'] or report['removed']):
+        raise SystemExit(1)
+
+# --- Application Factory ---
+def create_app():
+    """Entry point for the pre-forking launcher (serve.py); reconnects if called in a forked worker."""
+    if _db_pid != os.getpid():
+        init_db()
+    return app
+
 # --- Main Execution ---
 if __name__ == '__main__':
     print(f"🚀 Starting Flask server...")
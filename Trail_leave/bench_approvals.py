@@ -0,0 +1,113 @@
+# bench_approvals.py
+# Concurrency stress test for POST /api/leaves/<id>/status. Seeds employees whose
+# Pending leaves overlap each other, then approves all of them at once from several
+# worker processes (each with its own MongoClient and overlap index, like serve.py
+# workers) and several threads per process. Afterwards it checks that no employee
+# ended up with two overlapping Approved leaves, and prints throughput and how the
+# requests were answered. Exits with status 1 if an overlap landed.
+#
+# BENCH_MODE=naive runs the same load through a plain check-then-write (what the
+# API would do without the per-employee lock), to show the race it prevents.
+#
+# Usage (Linux/macOS, needs a local mongod):
+#   MONGO_URI=mongodb://localhost:27017/ python bench_approvals.py
+#   BENCH_PROCESSES=8 BENCH_THREADS=16 BENCH_EMPLOYEES=200 python bench_approvals.py
+#   BENCH_MODE=naive python bench_approvals.py
+
+import os
+import sys
+import time
+import multiprocessing
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+# --- Configuration ---
+MONGO_URI = os.getenv('MONGO_URI', 'mongodb://localhost:27017/')
+DATABASE_NAME = os.getenv('BENCH_DATABASE', 'leave_management_approval_bench')
+MODE = os.getenv('BENCH_MODE', 'api') # 'api' or 'naive'
+PROCESSES = int(os.getenv('BENCH_PROCESSES', 4))
+THREADS = int(os.getenv('BENCH_THREADS', 8))
+EMPLOYEES = int(os.getenv('BENCH_EMPLOYEES', 100))
+LEAVES_PER_EMPLOYEE = int(os.getenv('BENCH_LEAVES', 10)) # Leave i covers days i..i+2, so neighbours overlap
+
+os.environ['MONGO_URI'] = MONGO_URI
+os.environ['DATABASE_NAME'] = DATABASE_NAME
+os.environ.setdefault('LEAVE_INDEX_REFRESH', '0')
+import app as leave_app # Connects using the settings above
+from leave_intervals import overlap_query
+
+
+def seed():
+    leave_app.leaves_collection.delete_many({})
+    leave_app.locks_collection.delete_many({})
+    start = datetime(2026, 3, 2, tzinfo=timezone.utc)
+    now = datetime.now(timezone.utc)
+    leaves = []
+    for e in range(EMPLOYEES):
+        for i in range(LEAVES_PER_EMPLOYEE):
+            leaves.append({'name': f'Employee {e}', 'empId': f'EMP{e:04d}', 'email': f'emp{e}@example.com',
+                           'leaveType': 'Casual', 'fromDate': start + timedelta(days=i),
+                           'toDate': start + timedelta(days=i + 2), 'fromHour': None, 'toHour': None,
+                           'reason': 'Stress test', 'status': 'Pending', 'submittedAt': now, 'lastModified': now})
+    ids = leave_app.leaves_collection.insert_many(leaves).inserted_ids
+    # Interleave employees so concurrent requests contend for the same locks
+    return [str(ids[e * LEAVES_PER_EMPLOYEE + i]) for i in range(LEAVES_PER_EMPLOYEE) for e in range(EMPLOYEES)]
+
+
+def approve_naive(leave_id):
+    """Check-then-write without the lock (the race under test)."""
+    collection = leave_app.leaves_collection
+    leave = collection.find_one({'_id': leave_app.ObjectId(leave_id)})
+    query = overlap_query(leave['empId'], leave['fromDate'], leave['toDate'])
+    if collection.find_one(query, {'_id': 1}):
+        return 409
+    collection.update_one({'_id': leave['_id'], 'status': 'Pending'}, {'$set': {'status': 'Approved'}})
+    return 200
+
+
+def run_worker(leave_ids):
+    """Runs in a forked process: approves its share of leave_ids on THREADS threads. Returns status counts."""
+    flask_app = leave_app.create_app() # Reconnects after the fork
+
+    def approve(leave_id):
+        if MODE == 'naive':
+            return approve_naive(leave_id)
+        with flask_app.test_client() as client:
+            return client.post(f'/api/leaves/{leave_id}/status', json={'status': 'Approved'}).status_code
+
+    with ThreadPoolExecutor(THREADS) as pool:
+        return Counter(pool.map(approve, leave_ids))
+
+
+def overlapping_approvals():
+    """Pairs of Approved leaves of the same employee that overlap."""
+    approved = {}
+    for leave in leave_app.leaves_collection.find({'status': 'Approved'}).sort('fromDate', 1):
+        approved.setdefault(leave['empId'], []).append(leave)
+    return [(a['_id'], b['_id']) for leaves in approved.values()
+            for a, b in zip(leaves, leaves[1:]) if b['fromDate'] <= a['toDate']]
+
+
+if __name__ == '__main__':
+    leave_ids = seed()
+    print(f"mode={MODE}: {len(leave_ids)} approvals for {EMPLOYEES} employees "
+          f"on {PROCESSES} processes x {THREADS} threads")
+    chunks = [leave_ids[p::PROCESSES] for p in range(PROCESSES)]
+    leave_app.client.close() # Each worker opens its own
+    began = time.perf_counter()
+    with multiprocessing.get_context('fork').Pool(PROCESSES) as pool:
+        statuses = sum(pool.map(run_worker, chunks), Counter())
+    elapsed = time.perf_counter() - began
+
+    leave_app.init_db()
+    overlaps = overlapping_approvals()
+    approved = leave_app.leaves_collection.count_documents({'status': 'Approved'})
+    print(f"{elapsed:.2f}s, {len(leave_ids) / elapsed:.0f} requests/s")
+    print(f"responses: {dict(sorted(statuses.items()))}, approved: {approved}")
+    if overlaps:
+        print(f"❌ {len(overlaps)} overlapping approvals landed, e.g. {overlaps[:3]}")
+    else:
+        print("✅ No overlapping approvals")
+    leave_app.client.drop_database(DATABASE_NAME)
+    sys.exit(1 if overlaps else 0)
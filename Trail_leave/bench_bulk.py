@@ -0,0 +1,65 @@
+# bench_bulk.py
+# Importing N leaves (a planned holiday for N employees, plus a few duplicates
+# that overlap inside the batch) through POST /api/leaves one at a time against a
+# single POST /api/leaves/bulk. Runs through the Flask test client against a
+# scratch database, which is dropped before each run.
+#
+# Usage (needs a local mongod):
+#   MONGO_URI=mongodb://localhost:27017/ python bench_bulk.py
+#   BENCH_LEAVES=1000 python bench_bulk.py
+
+import os
+import time
+
+# --- Configuration ---
+MONGO_URI = os.getenv('MONGO_URI', 'mongodb://localhost:27017/')
+DATABASE_NAME = os.getenv('BENCH_DATABASE', 'leave_management_bulk_bench')
+LEAVES = int(os.getenv('BENCH_LEAVES', 500))
+DUPLICATE_EVERY = 50 # Every 50th employee appears twice (the second one conflicts)
+
+os.environ['MONGO_URI'] = MONGO_URI
+os.environ['DATABASE_NAME'] = DATABASE_NAME
+import app as leave_app # Connects using the settings above
+from leave_bulk import MAX_BULK_ITEMS
+
+
+def holiday_import(count):
+    items = []
+    for i in range(count):
+        emp_id = f'{chr(65 + i // 1000 % 26)}BC0{i % 1000:03d}'
+        item = {'name': f'Employee {i}', 'empId': emp_id, 'email': f'emp{i}@example.com',
+                'leaveType': 'Earned', 'fromDate': '2025-12-24', 'toDate': '2025-12-26',
+                'reason': 'Planned year-end shutdown'}
+        items.append(item)
+        if i % DUPLICATE_EVERY == 0:
+            items.append(dict(item, fromDate='2025-12-26', toDate='2025-12-27'))
+    return items
+
+
+def reset():
+    leave_app.leaves_collection.delete_many({})
+    leave_app.init_db() # Fresh indexes and overlap index
+
+
+if __name__ == '__main__':
+    client = leave_app.app.test_client()
+    items = holiday_import(LEAVES)
+    print(f"{len(items)} leaves ({len(items) - LEAVES} overlapping within the import)\n")
+    print(f"{'mode':<28}{'seconds':>10}{'leaves/s':>12}{'created':>10}")
+
+    reset()
+    began = time.perf_counter()
+    created = sum(1 for item in items if client.post('/api/leaves', json=item).status_code == 201)
+    elapsed = time.perf_counter() - began
+    # The single endpoint only checks against Approved leaves, so the in-batch duplicates are created too.
+    print(f"{'POST /api/leaves x N':<28}{elapsed:>10.2f}{len(items) / elapsed:>12.0f}{created:>10}")
+
+    reset()
+    began = time.perf_counter()
+    created = 0
+    for start in range(0, len(items), MAX_BULK_ITEMS):
+        response = client.post('/api/leaves/bulk', json=items[start:start + MAX_BULK_ITEMS])
+        created += response.get_json()['created']
+    elapsed = time.perf_counter() - began
+    print(f"{'POST /api/leaves/bulk':<28}{elapsed:>10.2f}{len(items) / elapsed:>12.0f}{created:>10}")
+    leave_app.client.drop_database(DATABASE_NAME)
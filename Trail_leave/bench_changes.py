@@ -0,0 +1,72 @@
+# bench_changes.py
+# What a dashboard pays per refresh over the bench_listing.py collection: reloading
+# the full list (the old way) against polling GET /api/leaves/changes with the token
+# of the previous poll, while a few leaves change between polls. Also prints the
+# keys/documents examined by one poll, which should track the number of changes,
+# not the collection size.
+#
+# Usage (needs a local mongod and the bench_listing.py collection):
+#   MONGO_URI=mongodb://localhost:27017/ python bench_listing.py   # once, to seed
+#   MONGO_URI=mongodb://localhost:27017/ python bench_changes.py
+
+import os
+import time
+import statistics
+from pymongo import MongoClient
+from werkzeug.datastructures import MultiDict
+from bench_listing import MONGO_URI, DATABASE_NAME, timed, report
+from leave_queries import find_page
+import leave_changes
+
+# --- Configuration ---
+CHANGES_PER_POLL = [0, 10, 100]
+POLLS = int(os.getenv('BENCH_POLLS', 20))
+
+leave_changes.CHANGES_SETTLE_MS = 0 # Single writer here; see leave_changes.py for why the API waits
+
+
+def touch(collection, count):
+    """Modifies 'count' leaves the way a status update does."""
+    ids = [doc['_id'] for doc in collection.find({}, {'_id': 1}).limit(count)]
+    collection.update_many({'_id': {'$in': ids}}, {'$set': {'lastModified': leave_changes.stamp()}})
+
+
+def poll(collection, tombstones, token):
+    args = MultiDict({'since': token} if token else {})
+    changes, deleted, token, has_more = leave_changes.find_changes(collection, tombstones, args)
+    while has_more: # Drain, as a client would
+        changes, deleted, token, has_more = leave_changes.find_changes(collection, tombstones, MultiDict({'since': token}))
+    return token
+
+
+if __name__ == '__main__':
+    client = MongoClient(MONGO_URI)
+    db = client[DATABASE_NAME]
+    collection, tombstones = db['applications'], db['leave_tombstones']
+    if collection.estimated_document_count() == 0:
+        raise SystemExit("Run bench_listing.py first to seed the collection.")
+    leave_changes.ensure_indexes(collection, tombstones)
+    began = time.perf_counter()
+    print(f"Backfilled lastModified on {leave_changes.backfill(collection)} documents "
+          f"({time.perf_counter() - began:.1f}s).")
+
+    print(f"\n{'refresh':<44}{'median':>12}{'keys':>12}{'docs':>12}")
+    ms = timed(lambda: find_page(collection, MultiDict()), iterations=3)
+    report(f"full reload ({collection.estimated_document_count()} leaves)", ms, '-', '-')
+
+    token = poll(collection, tombstones, None) # First sync: everything so far
+    for count in CHANGES_PER_POLL:
+        samples = []
+        for _ in range(POLLS):
+            touch(collection, count)
+            began = time.perf_counter()
+            token = poll(collection, tombstones, token)
+            samples.append((time.perf_counter() - began) * 1000)
+        touch(collection, count) # One more round of changes, to explain the poll that picks them up
+        query = leave_changes._range_query(leave_changes.decode_token(token),
+                                           leave_changes._naive_utc(leave_changes.stamp()))
+        stats = collection.find(query).sort([('lastModified', 1), ('_id', 1)]).explain()['executionStats']
+        token = poll(collection, tombstones, token)
+        report(f"poll /changes, {count} changed", statistics.median(samples),
+               stats['totalKeysExamined'], stats['totalDocsExamined'])
+    client.close()
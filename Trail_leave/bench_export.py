@@ -0,0 +1,59 @@
+# bench_export.py
+# Scaling of the query.py export: time, rows/second and peak resident memory for
+# increasing row counts (--limit) over the bench_listing.py collection. Each run is
+# a separate subprocess so peak memory is per run. With the chunked export, time
+# should grow linearly and peak memory stay flat.
+#
+# Usage (Linux/macOS, needs a local mongod; Parquet needs pyarrow):
+#   MONGO_URI=mongodb://localhost:27017/ python bench_export.py
+#   BENCH_FORMAT=parquet BENCH_BATCH_SIZE=50000 python bench_export.py
+
+import os
+import sys
+import time
+import resource
+import tempfile
+import subprocess
+
+# --- Configuration ---
+ROW_COUNTS = [10_000, 100_000, 500_000, 1_000_000]
+FORMAT = os.getenv('BENCH_FORMAT', 'csv')
+BATCH_SIZE = os.getenv('BENCH_BATCH_SIZE', '10000')
+
+
+def run_export(rows, output):
+    """Runs one export in this process and prints 'seconds peak_rss_mb'."""
+    import query
+    began = time.perf_counter()
+    status = query.main(['-o', output, '--limit', str(rows), '--batch-size', BATCH_SIZE])
+    elapsed = time.perf_counter() - began
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_mb = peak / 1e6 if sys.platform == 'darwin' else peak / 1e3 # bytes on macOS, KiB on Linux
+    print(f"{status} {elapsed:.2f} {peak_mb:.0f}")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) == 3:
+        run_export(int(sys.argv[1]), sys.argv[2])
+        sys.exit(0)
+
+    from pymongo import MongoClient
+    from bench_listing import MONGO_URI, DATABASE_NAME, seed
+    client = MongoClient(MONGO_URI)
+    seed(client[DATABASE_NAME]['applications'])
+    client.close()
+
+    env = dict(os.environ, MONGO_URI=MONGO_URI, DATABASE_NAME=DATABASE_NAME)
+    print(f"format={FORMAT}, batch size {BATCH_SIZE}\n")
+    print(f"{'rows':>10}{'seconds':>10}{'rows/s':>12}{'file MB':>10}{'peak RSS MB':>14}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in ROW_COUNTS:
+            output = os.path.join(tmp, f'export.{FORMAT}')
+            result = subprocess.run([sys.executable, __file__, str(rows), output],
+                                    capture_output=True, text=True, env=env, check=True)
+            status, seconds, peak = result.stdout.strip().splitlines()[-1].split()
+            if status != '0':
+                print(f"{rows:>10}  export failed:\n{result.stdout}")
+                break
+            print(f"{rows:>10}{seconds:>10}{rows / float(seconds):>12.0f}"
+                  f"{os.path.getsize(output) / 1e6:>10.1f}{peak:>14}")
@@ -0,0 +1,129 @@
+# bench_listing.py
+# Benchmarks GET /api/leaves over a synthetic 'applications' collection
+# (1M leave records by default): the old full-collection listing, keyset pages
+# at increasing depth against skip/limit, and each filter with its compound
+# index. Prints the median latency and the keys/documents examined from explain().
+#
+# Usage (needs a local mongod; seeding 1M documents takes a few minutes):
+#   MONGO_URI=mongodb://localhost:27017/ python bench_listing.py
+#   BENCH_DOCS=200000 BENCH_RESEED=1 python bench_listing.py
+
+import os
+import time
+import random
+import statistics
+from datetime import datetime, timedelta, timezone
+from pymongo import MongoClient
+from werkzeug.datastructures import MultiDict
+from leave_queries import ensure_indexes, find_page, plan_listing, encode_cursor
+
+# --- Configuration ---
+MONGO_URI = os.getenv('MONGO_URI', 'mongodb://localhost:27017/')
+DATABASE_NAME = os.getenv('BENCH_DATABASE', 'leave_management_bench')
+DOCS = int(os.getenv('BENCH_DOCS', 1_000_000))
+RESEED = os.getenv('BENCH_RESEED', '0').lower() in ['1', 'true', 'yes']
+ITERATIONS = int(os.getenv('BENCH_ITERATIONS', 20))
+EMPLOYEES = 5000
+PAGE_SIZE = 50
+PAGE_DEPTHS = [1, 100, 1000, 10000]
+INSERT_BATCH = 10_000
+LEAVE_TYPES = ['Casual', 'Sick', 'Earned', 'Maternity', 'Paternity', 'Unpaid']
+
+
+def synthetic_leave(i, rng, start):
+    from_date = start + timedelta(days=rng.randrange(900))
+    return {
+        'name': f'Employee {i % EMPLOYEES}', 'empId': f'EMP{i % EMPLOYEES:04d}',
+        'email': f'emp{i % EMPLOYEES}@example.com', 'leaveType': rng.choice(LEAVE_TYPES),
+        'fromDate': from_date, 'toDate': from_date + timedelta(days=rng.randrange(5)),
+        'fromHour': None, 'toHour': None, 'reason': 'Family function at home',
+        'status': rng.choices(['Pending', 'Approved', 'Rejected'], [1, 6, 1])[0],
+        'submittedAt': start + timedelta(seconds=i * 60),
+    }
+
+
+def seed(collection):
+    if not RESEED and collection.estimated_document_count() >= DOCS:
+        print(f"Reusing {collection.estimated_document_count()} documents in '{collection.name}'.")
+        return
+    collection.drop()
+    rng = random.Random(7)
+    start = datetime(2023, 1, 1, tzinfo=timezone.utc)
+    began = time.perf_counter()
+    for offset in range(0, DOCS, INSERT_BATCH):
+        collection.insert_many([synthetic_leave(i, rng, start)
+                                for i in range(offset, min(offset + INSERT_BATCH, DOCS))], ordered=False)
+    print(f"Seeded {DOCS} leave records in {time.perf_counter() - began:.1f}s.")
+
+
+def timed(fn, iterations=ITERATIONS):
+    fn() # Warm-up
+    samples = []
+    for _ in range(iterations):
+        began = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - began) * 1000)
+    return statistics.median(samples)
+
+
+def examined(collection, query, projection, sort, limit, skip=0, hint=None):
+    cursor = collection.find(query, projection).sort(sort).skip(skip)
+    if limit:
+        cursor = cursor.limit(limit)
+    if hint:
+        cursor = cursor.hint(hint)
+    stats = cursor.explain()['executionStats']
+    return stats['totalKeysExamined'], stats['totalDocsExamined']
+
+
+def report(label, ms, keys, docs):
+    print(f"{label:<44}{ms:>10.2f}ms{keys:>12}{docs:>12}")
+
+
+if __name__ == '__main__':
+    client = MongoClient(MONGO_URI)
+    collection = client[DATABASE_NAME]['applications']
+    seed(collection)
+    began = time.perf_counter()
+    ensure_indexes(collection)
+    print(f"Listing indexes ready in {time.perf_counter() - began:.1f}s.")
+    print(f"{'':<44}{'median':>12}{'keys':>12}{'docs':>12}")
+
+    # The previous behaviour: every document, newest first (timed once, it is slow).
+    legacy_ms = timed(lambda: list(collection.find().sort('submittedAt', -1)), iterations=1)
+    report("before: full listing", legacy_ms, *examined(collection, {}, None, [('submittedAt', -1)], 0))
+
+    print(f"\nPage depth (limit={PAGE_SIZE})")
+    for depth in PAGE_DEPTHS:
+        skip = (depth - 1) * PAGE_SIZE
+        args = MultiDict({'limit': str(PAGE_SIZE)})
+        query, projection, sort, _ = plan_listing(args)
+        if skip:
+            previous = collection.find({}, {'submittedAt': 1}).sort(sort).skip(skip - 1).limit(1).next()
+            args['cursor'] = encode_cursor(previous, sort[0][1])
+        keyset_query = plan_listing(args)[0]
+
+        offset_ms = timed(lambda: list(collection.find(query, projection).sort(sort).skip(skip).limit(PAGE_SIZE)))
+        report(f"page {depth}: skip/limit", offset_ms, *examined(collection, query, projection, sort, PAGE_SIZE, skip))
+        report(f"page {depth}: keyset", timed(lambda: find_page(collection, args)),
+               *examined(collection, keyset_query, projection, sort, PAGE_SIZE + 1))
+
+    print(f"\nFiltered first page (limit={PAGE_SIZE})")
+    cases = {
+        'empId': {'empId': 'EMP0421'},
+        'status=Pending': {'status': 'Pending'},
+        'leaveType=Maternity': {'leaveType': 'Maternity'},
+        'empId + status=Approved': {'empId': 'EMP0421', 'status': 'Approved'},
+        'from/to (one week)': {'from': '2024-03-01', 'to': '2024-03-07'},
+    }
+    for label, params in cases.items():
+        args = MultiDict({'limit': str(PAGE_SIZE), **params})
+        query, projection, sort, _ = plan_listing(args)
+        scan = [('$natural', 1)]
+        scan_ms = timed(lambda: list(collection.find(query, projection).sort(sort)
+                                     .limit(PAGE_SIZE + 1).hint(scan)), iterations=3)
+        report(f"{label}: collection scan", scan_ms,
+               *examined(collection, query, projection, sort, PAGE_SIZE + 1, hint=scan))
+        report(f"{label}: indexed", timed(lambda: find_page(collection, args)),
+               *examined(collection, query, projection, sort, PAGE_SIZE + 1))
+    client.close()
@@ -0,0 +1,62 @@
+# bench_overlap.py
+# Cost of the overlap check in submit_leave(): count_documents() against MongoDB
+# (with and without the leaves_overlap index) versus the in-memory
+# ApprovedLeaveIndex from leave_intervals.py. Also reports how long the index
+# takes to load and how many leaves it holds.
+#
+# Uses the same synthetic collection as bench_listing.py (seeded if missing).
+#
+# Usage (needs a local mongod):
+#   MONGO_URI=mongodb://localhost:27017/ python bench_overlap.py
+#   BENCH_DOCS=200000 BENCH_CHECKS=20000 python bench_overlap.py
+
+import os
+import time
+import random
+from datetime import datetime, timedelta, timezone
+from pymongo import MongoClient
+from leave_intervals import ApprovedLeaveIndex, OVERLAP_INDEX, ensure_overlap_index, overlap_query
+from bench_listing import MONGO_URI, DATABASE_NAME, EMPLOYEES, seed
+
+# --- Configuration ---
+CHECKS = int(os.getenv('BENCH_CHECKS', 5000))
+
+
+def random_ranges(count):
+    rng = random.Random(11)
+    start = datetime(2023, 1, 1, tzinfo=timezone.utc)
+    ranges = []
+    for _ in range(count):
+        from_date = start + timedelta(days=rng.randrange(900))
+        ranges.append((f'EMP{rng.randrange(EMPLOYEES):04d}', from_date, from_date + timedelta(days=rng.randrange(5))))
+    return ranges
+
+
+def run(label, check, ranges):
+    began = time.perf_counter()
+    hits = sum(1 for emp_id, from_date, to_date in ranges if check(emp_id, from_date, to_date))
+    elapsed = time.perf_counter() - began
+    print(f"{label:<36}{elapsed / len(ranges) * 1e6:>12.1f}{len(ranges) / elapsed:>14.0f}{hits:>8}")
+
+
+if __name__ == '__main__':
+    client = MongoClient(MONGO_URI)
+    collection = client[DATABASE_NAME]['applications']
+    seed(collection)
+    ranges = random_ranges(CHECKS)
+
+    index = ApprovedLeaveIndex(refresh_seconds=0, max_stale_seconds=float('inf')) # Single process: misses are exact
+    began = time.perf_counter()
+    loaded = index.build(collection)
+    print(f"Loaded {loaded} approved leaves into the index in {time.perf_counter() - began:.2f}s.\n")
+
+    print(f"{'check':<36}{'us/check':>12}{'checks/s':>14}{'hits':>8}")
+    count = lambda e, f, t: collection.count_documents(overlap_query(e, f, t), limit=1) > 0
+    if OVERLAP_INDEX.document['name'] in collection.index_information():
+        collection.drop_index(OVERLAP_INDEX.document['name'])
+    run("count_documents, no leaves_overlap", count, ranges)
+    ensure_overlap_index(collection)
+    run("count_documents, leaves_overlap", count, ranges)
+    run("ApprovedLeaveIndex.overlaps", index.overlaps, ranges)
+    run("ApprovedLeaveIndex.has_overlap", lambda e, f, t: index.has_overlap(collection, e, f, t), ranges)
+    client.close()
@@ -0,0 +1,72 @@
+# bench_serializer.py
+# Throughput of the /api/leaves response encoding on synthetic leave documents
+# (100k by default, shaped like what PyMongo returns for submit_leave() inserts):
+#   jsonify(serialize_doc)   the previous path: per-key conversion, then Flask's JSON provider
+#   python / orjson / msgspec  leave_json.encode_leaves() backends (those installed)
+# Every backend's output is checked against the previous path before timing.
+# Does not need MongoDB.
+#
+# Usage:
+#   python bench_serializer.py
+#   BENCH_DOCS=500000 BENCH_ROUNDS=3 python bench_serializer.py
+
+import os
+import json
+import time
+import random
+from datetime import datetime, timedelta
+from bson import ObjectId
+from flask import Flask, jsonify
+from leave_json import BACKENDS, encode_leaves, serialize_doc
+
+# --- Configuration ---
+DOCS = int(os.getenv('BENCH_DOCS', 100_000))
+ROUNDS = int(os.getenv('BENCH_ROUNDS', 5)) # Best of
+LEAVE_TYPES = ['Casual', 'Sick', 'Earned', 'Maternity', 'Paternity', 'Unpaid']
+
+
+def synthetic_docs(count):
+    rng = random.Random(3)
+    start = datetime(2024, 1, 1)
+    docs = []
+    for i in range(count):
+        from_date = start + timedelta(days=rng.randrange(365))
+        same_day = rng.random() < 0.2
+        docs.append({
+            '_id': ObjectId(), 'name': f'Employee {i % 5000}', 'empId': f'EMP{i % 5000:04d}',
+            'email': f'emp{i % 5000}@example.com', 'leaveType': rng.choice(LEAVE_TYPES),
+            'fromDate': from_date, 'toDate': from_date if same_day else from_date + timedelta(days=rng.randrange(1, 5)),
+            'fromHour': '10:00' if same_day else None, 'toHour': '13:30' if same_day else None,
+            'reason': 'Family function at home', 'status': rng.choice(['Pending', 'Approved', 'Rejected']),
+            'submittedAt': start + timedelta(seconds=i * 37, microseconds=rng.randrange(1_000_000)),
+        })
+    return docs
+
+
+def best_of(fn):
+    best, output = None, None
+    for _ in range(ROUNDS):
+        began = time.perf_counter()
+        output = fn()
+        elapsed = time.perf_counter() - began
+        best = elapsed if best is None else min(best, elapsed)
+    return best, output
+
+
+if __name__ == '__main__':
+    app = Flask(__name__)
+    docs = synthetic_docs(DOCS)
+    print(f"{DOCS} documents, best of {ROUNDS}\n")
+    print(f"{'encoder':<26}{'ms':>10}{'docs/s':>14}{'MB/s':>10}{'speedup':>10}")
+
+    with app.app_context():
+        legacy_seconds, legacy = best_of(lambda: jsonify([serialize_doc(doc) for doc in docs]).get_data())
+    expected = json.loads(legacy)
+    print(f"{'jsonify(serialize_doc)':<26}{legacy_seconds * 1000:>10.1f}{DOCS / legacy_seconds:>14.0f}"
+          f"{len(legacy) / legacy_seconds / 1e6:>10.1f}{1:>9.1f}x")
+
+    for backend in BACKENDS:
+        seconds, output = best_of(lambda: encode_leaves(docs, backend))
+        assert json.loads(output) == expected, f"{backend} output differs from jsonify(serialize_doc)"
+        print(f"{backend:<26}{seconds * 1000:>10.1f}{DOCS / seconds:>14.0f}"
+              f"{len(output) / seconds / 1e6:>10.1f}{legacy_seconds / seconds:>9.1f}x")
@@ -0,0 +1,61 @@
+# bench_streaming.py
+# Peak memory and time of GET /api/leaves over the bench_listing.py collection
+# (1M leave records by default): the buffered listing against ?stream=json and
+# ?stream=ndjson. Each mode runs in its own subprocess through the Flask test
+# client. The body is read and discarded chunk by chunk, as a client would.
+# Peak resident memory is taken from getrusage().
+#
+# Usage (Linux/macOS, needs a local mongod; seeds the collection if missing):
+#   MONGO_URI=mongodb://localhost:27017/ python bench_streaming.py
+#   LEAVES_STREAM_BATCH_SIZE=5000 python bench_streaming.py
+
+import os
+import sys
+import time
+import resource
+import subprocess
+
+# --- Configuration ---
+MODES = {
+    'buffered': '/api/leaves',
+    'stream=json': '/api/leaves?stream=json',
+    'stream=ndjson': '/api/leaves?stream=ndjson',
+    'stream=json, one empId': '/api/leaves?stream=json&empId=EMP0421',
+}
+
+
+def run_mode(path):
+    """Requests 'path' in this process and prints 'bytes seconds peak_rss_mb'."""
+    from bench_listing import MONGO_URI, DATABASE_NAME
+    os.environ['MONGO_URI'] = MONGO_URI
+    os.environ['DATABASE_NAME'] = DATABASE_NAME
+    os.environ['LEAVE_INDEX'] = '0' # Not needed for listing; keeps its memory out of the measurement
+    import app as leave_app
+
+    client = leave_app.app.test_client()
+    began = time.perf_counter()
+    response = client.get(path, buffered=False)
+    size = sum(len(chunk) for chunk in response.response)
+    response.close()
+    elapsed = time.perf_counter() - began
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_mb = peak / 1e6 if sys.platform == 'darwin' else peak / 1e3 # bytes on macOS, KiB on Linux
+    print(f"{size} {elapsed:.2f} {peak_mb:.0f}")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) == 2:
+        run_mode(sys.argv[1])
+        sys.exit(0)
+
+    from pymongo import MongoClient
+    from bench_listing import MONGO_URI, DATABASE_NAME, seed
+    client = MongoClient(MONGO_URI)
+    seed(client[DATABASE_NAME]['applications'])
+    client.close()
+
+    print(f"{'mode':<26}{'MB sent':>10}{'seconds':>10}{'peak RSS MB':>14}")
+    for label, path in MODES.items():
+        result = subprocess.run([sys.executable, __file__, path], capture_output=True, text=True, check=True)
+        size, seconds, peak = result.stdout.strip().splitlines()[-1].split()
+        print(f"{label:<26}{int(size) / 1e6:>10.1f}{seconds:>10}{peak:>14}")
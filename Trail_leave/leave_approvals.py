@@ -0,0 +1,132 @@
+# leave_approvals.py
+# Approve / reject decisions for POST /api/leaves/<id>/status, with the rule that
+# an employee's Approved leaves never overlap enforced atomically.
+#
+# A check-then-write is not enough on its own: two approvals for the same employee
+# running at once (threads, or worker processes with separate overlap indexes) can
+# both find no Approved overlap and both write. So an approval first takes the
+# employee's lock document in 'employee_locks'. Acquiring is one find_one_and_update
+# with upsert, matching only a free or expired lock; when the lock is held, the
+# upsert collides on _id (DuplicateKeyError) and the caller retries with backoff
+# for up to APPROVAL_LOCK_WAIT seconds. Holding the lock, the overlap check queries
+# MongoDB (never the in-memory index, which can lag behind other processes), and
+# the status update only applies if the status is still the one that was read.
+#
+# The lock is a lease: one that is not released within APPROVAL_LOCK_TTL seconds
+# (crashed worker) can be taken over. Holding it takes two queries, far below the
+# TTL. Rejections cannot create overlaps and skip the lock. This works on a
+# standalone mongod; multi-document transactions would need a replica set.
+
+import os
+import time
+import uuid
+import random
+from datetime import datetime, timedelta, timezone
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from leave_intervals import overlap_query
+from leave_changes import stamp
+
+APPROVAL_LOCK_TTL = float(os.getenv('APPROVAL_LOCK_TTL', 10)) # Seconds before an unreleased lock can be taken over
+APPROVAL_LOCK_WAIT = float(os.getenv('APPROVAL_LOCK_WAIT', 5)) # Seconds to wait for a busy lock
+DECISIONS = ('Approved', 'Rejected')
+MAX_REPORTED_CONFLICTS = 10
+_RELEASED = datetime(1970, 1, 1)
+
+
+class LeaveNotFound(LookupError):
+    """No leave with that id; answered with 404."""
+
+
+class ApprovalConflict(Exception):
+    """Approving would overlap Approved leaves, or the status changed meanwhile; answered with 409."""
+
+    def __init__(self, message, conflicts=()):
+        super().__init__(message)
+        self.conflicts = list(conflicts)
+
+
+class EmployeeBusy(Exception):
+    """The employee's lock stayed taken for APPROVAL_LOCK_WAIT seconds; answered with 503."""
+
+
+class EmployeeLock:
+    """Per-employee lease in the 'employee_locks' collection, used as a context manager."""
+
+    def __init__(self, locks, emp_id, ttl=APPROVAL_LOCK_TTL, wait=APPROVAL_LOCK_WAIT):
+        self.locks = locks
+        self.emp_id = emp_id
+        self.ttl = ttl
+        self.wait = wait
+        self.owner = uuid.uuid4().hex
+
+    def try_acquire(self):
+        now = datetime.now(timezone.utc)
+        try:
+            self.locks.find_one_and_update(
+                {'_id': self.emp_id, 'expiresAt': {'$lt': now}}, # Free (released) or expired
+                {'$set': {'owner': self.owner, 'expiresAt': now + timedelta(seconds=self.ttl)}},
+                upsert=True)
+            return True
+        except DuplicateKeyError:
+            return False # Held by someone else
+
+    def release(self):
+        self.locks.update_one({'_id': self.emp_id, 'owner': self.owner}, {'$set': {'expiresAt': _RELEASED}})
+
+    def __enter__(self):
+        deadline = time.monotonic() + self.wait
+        delay = 0.001
+        while not self.try_acquire():
+            if time.monotonic() >= deadline:
+                raise EmployeeBusy(f"Leaves of {self.emp_id} are being updated; try again.")
+            time.sleep(delay * random.uniform(0.5, 1.5))
+            delay = min(delay * 2, 0.05)
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+        return False
+
+
+def _decide(collection, leave, new_status, check_overlaps):
+    if check_overlaps:
+        query = overlap_query(leave['empId'], leave['fromDate'], leave['toDate'])
+        query['_id'] = {'$ne': leave['_id']}
+        conflicts = [doc['_id'] for doc in collection.find(query, {'_id': 1}).limit(MAX_REPORTED_CONFLICTS)]
+        if conflicts:
+            raise ApprovalConflict("Leave overlaps with an existing approved leave.", conflicts)
+    # Only if nobody decided it in the meantime
+    updated = collection.find_one_and_update(
+        {'_id': leave['_id'], 'status': leave['status']},
+        {'$set': {'status': new_status, 'lastModified': stamp()}},
+        return_document=ReturnDocument.AFTER)
+    if updated is None:
+        raise ApprovalConflict("The leave's status was changed by another request; reload and retry.")
+    return updated
+
+
+def set_status(collection, locks, leave_id, new_status):
+    """
+    Approves or rejects one leave. Returns (leave, old_status), leave being the
+    document after the update (unchanged when it already had new_status).
+    """
+    if new_status not in DECISIONS:
+        raise ValueError(f"Status must be one of {', '.join(DECISIONS)}.")
+    leave = collection.find_one({'_id': leave_id})
+    if leave is None:
+        raise LeaveNotFound(f"No leave with id {leave_id}.")
+    old_status = leave['status']
+    if old_status == new_status:
+        return leave, old_status
+    if new_status != 'Approved':
+        return _decide(collection, leave, new_status, check_overlaps=False), old_status
+    with EmployeeLock(locks, leave['empId']):
+        # Re-read under the lock: the status may have changed while waiting
+        leave = collection.find_one({'_id': leave_id})
+        if leave is None:
+            raise LeaveNotFound(f"No leave with id {leave_id}.")
+        old_status = leave['status']
+        if old_status == new_status:
+            return leave, old_status
+        return _decide(collection, leave, new_status, check_overlaps=True), old_status
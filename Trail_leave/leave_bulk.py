@@ -0,0 +1,53 @@
+# leave_bulk.py
+# Overlap resolution for POST /api/leaves/bulk.
+#
+# One aggregation fetches the Approved leaves of every employee in the batch that
+# fall inside the batch's overall date span. Each batch item is then checked in
+# memory against those leaves (an ApprovedLeaveIndex built just for this batch), and
+# against the items before it in the same batch for that employee: two new leaves
+# for one person may not overlap each other either. The first item wins; later
+# overlapping ones are rejected.
+
+from leave_intervals import ApprovedLeaveIndex, INDEX_FIELDS
+
+MAX_BULK_ITEMS = 1000
+
+
+def approved_overlapping(collection, leaves):
+    """Approved leaves of the batch's employees that fall inside its overall date span (one aggregation)."""
+    if not leaves:
+        return []
+    pipeline = [
+        {"$match": {
+            "status": "Approved",
+            "empId": {"$in": sorted({leave["empId"] for leave in leaves})},
+            "fromDate": {"$lte": max(leave["toDate"] for leave in leaves)},
+            "toDate": {"$gte": min(leave["fromDate"] for leave in leaves)},
+        }},
+        {"$project": INDEX_FIELDS},
+    ]
+    return list(collection.aggregate(pipeline))
+
+
+def resolve_overlaps(leaves, approved):
+    """
+    For each leave (in order) returns None if it can be inserted, or a dict describing
+    the conflict: {"approved": [ids of existing Approved leaves]} or {"batchIndex": [positions]}.
+    """
+    index = ApprovedLeaveIndex.from_documents(approved)
+    accepted = {} # empId -> [(fromDate, toDate, position)] of earlier items in this batch
+    results = []
+    for position, leave in enumerate(leaves):
+        emp_id, from_date, to_date = leave["empId"], leave["fromDate"], leave["toDate"]
+        existing = index.conflicts(emp_id, from_date, to_date)
+        if existing:
+            results.append({"approved": [str(doc["_id"]) for doc in existing]})
+            continue
+        # Per-employee lists are short (a few leaves per person per import); a scan is enough.
+        earlier = [p for start, end, p in accepted.get(emp_id, ()) if start <= to_date and end >= from_date]
+        if earlier:
+            results.append({"batchIndex": earlier})
+            continue
+        accepted.setdefault(emp_id, []).append((from_date, to_date, position))
+        results.append(None)
+    return results
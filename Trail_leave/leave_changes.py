@@ -0,0 +1,171 @@
+# leave_changes.py
+# Delta sync for GET /api/leaves/changes.
+#
+# Every write to a leave sets its 'lastModified' from stamp(), taken right before
+# the write (submissions, status updates), never when the document is built.
+# Deleting a leave leaves a tombstone {_id, lastModified} in 'leave_tombstones',
+# kept for TOMBSTONE_RETENTION_DAYS by a TTL index.
+#
+# The change token holds the (lastModified, _id) of the last change a client has
+# seen and when it was issued, so a poll is one range scan of the (lastModified,
+# _id) index of each collection, however many leaves exist. Writes from several workers can become
+# visible slightly out of timestamp order; a poll therefore only returns changes
+# older than CHANGES_SETTLE_MS, so a write that commits late cannot land behind a
+# token a client already holds. A write that itself took longer than half that
+# window (a large bulk insert, a slow server) is stamped again by restamp_if_late(),
+# so it reappears after any token issued meanwhile. A token issued longer ago than the tombstone
+# retention is answered with 410: deletions may have been missed and the client
+# must reload.
+
+import os
+import json
+import base64
+import binascii
+from datetime import datetime, timedelta, timezone
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ASCENDING
+from pymongo.operations import IndexModel
+from leave_queries import LeaveQueryError, MAX_PAGE_SIZE, build_projection
+from leave_json import encode_leaves
+
+CHANGES_SETTLE_MS = int(os.getenv('CHANGES_SETTLE_MS', 1000))
+TOMBSTONE_RETENTION_DAYS = int(os.getenv('TOMBSTONE_RETENTION_DAYS', 30))
+DEFAULT_CHANGES_LIMIT = 500
+_LAST_ID = ObjectId('f' * 24) # Sorts after every real _id
+
+
+class ChangeTokenExpired(LeaveQueryError):
+    """The token predates the tombstone retention; answered with 410."""
+
+
+def ensure_indexes(collection, tombstones):
+    collection.create_index([('lastModified', ASCENDING), ('_id', ASCENDING)], name='leaves_last_modified')
+    tombstones.create_indexes([
+        IndexModel([('lastModified', ASCENDING), ('_id', ASCENDING)], name='tombstones_last_modified'),
+        IndexModel([('lastModified', ASCENDING)], name='tombstones_ttl',
+                   expireAfterSeconds=TOMBSTONE_RETENTION_DAYS * 86400),
+    ])
+
+
+def backfill(collection):
+    """Gives leaves stored before delta sync a lastModified (their submittedAt). Returns the count."""
+    result = collection.update_many(
+        {'lastModified': None},
+        [{'$set': {'lastModified': {'$ifNull': ['$submittedAt', '$$NOW']}}}])
+    return result.modified_count
+
+
+def stamp():
+    now = datetime.now(timezone.utc)
+    return now.replace(microsecond=now.microsecond // 1000 * 1000) # As stored (ms), so it can be matched again
+
+
+def restamp_if_late(collection, leaves, stamped_at):
+    """
+    Call after writing 'leaves' with lastModified=stamped_at. If the write took long
+    enough that a poll may already have moved past stamped_at, gives them a fresh
+    stamp (in MongoDB and in the dicts). Returns True if they were restamped.
+    """
+    if not leaves or stamp() - stamped_at < timedelta(milliseconds=CHANGES_SETTLE_MS / 2):
+        return False
+    restamped_at = stamp()
+    collection.update_many({'_id': {'$in': [leave['_id'] for leave in leaves]}, 'lastModified': stamped_at},
+                           {'$set': {'lastModified': restamped_at}})
+    for leave in leaves:
+        leave['lastModified'] = restamped_at
+    return True
+
+
+def record_deletion(tombstones, leave_id, deleted_at=None):
+    tombstones.replace_one({'_id': leave_id}, {'lastModified': deleted_at or stamp()}, upsert=True)
+
+
+# --- Change tokens ---
+def _naive_utc(value):
+    return value.astimezone(timezone.utc).replace(tzinfo=None) if value.tzinfo is not None else value
+
+
+def encode_token(last_modified, object_id, issued_at):
+    raw = json.dumps([_naive_utc(last_modified).isoformat(), str(object_id), _naive_utc(issued_at).isoformat()],
+                     separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_token(token):
+    """Returns (lastModified, _id, issuedAt) from a token made by encode_token()."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        last_modified, object_id, issued_at = json.loads(raw)
+        return datetime.fromisoformat(last_modified), ObjectId(object_id), datetime.fromisoformat(issued_at)
+    except (binascii.Error, ValueError, TypeError, InvalidId):
+        raise LeaveQueryError("Invalid 'since' token.")
+
+
+# --- Queries ---
+def _range_query(since, horizon):
+    query = {'lastModified': {'$lte': horizon}}
+    if since is not None:
+        last_modified, object_id, _ = since
+        query['lastModified']['$gte'] = last_modified
+        query['$or'] = [{'lastModified': {'$gt': last_modified}}, {'_id': {'$gt': object_id}}]
+    return query
+
+
+def _parse_limit(value):
+    if value in (None, ''):
+        return DEFAULT_CHANGES_LIMIT
+    try:
+        limit = int(value)
+    except ValueError:
+        raise LeaveQueryError("'limit' must be an integer.")
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise LeaveQueryError(f"'limit' must be between 1 and {MAX_PAGE_SIZE}.")
+    return limit
+
+
+def find_changes(collection, tombstones, args, now=None):
+    """
+    Leaves changed and deleted after the 'since' token (from the start without one).
+    Returns (changes, deleted, next_token, has_more); changes and deleted are in
+    (lastModified, _id) order and together hold at most 'limit' entries.
+    """
+    now = _naive_utc(now or stamp())
+    since = decode_token(args['since']) if args.get('since') else None
+    # Tombstones the client still needs are those of deletions after the token was issued
+    if since is not None and since[2] < now - timedelta(days=TOMBSTONE_RETENTION_DAYS):
+        raise ChangeTokenExpired("The 'since' token has expired; reload the full list.")
+    limit = _parse_limit(args.get('limit'))
+    projection = build_projection(args.get('fields'))
+    projection['lastModified'] = 1
+
+    horizon = now - timedelta(milliseconds=CHANGES_SETTLE_MS)
+    query = _range_query(since, horizon)
+    order = [('lastModified', ASCENDING), ('_id', ASCENDING)]
+    changes = list(collection.find(query, projection).sort(order).limit(limit + 1))
+    deleted = list(tombstones.find(query).sort(order).limit(limit + 1))
+
+    # Merge both streams and keep the first 'limit' entries
+    merged = sorted([(doc['lastModified'], doc['_id'], False) for doc in changes] +
+                    [(doc['lastModified'], doc['_id'], True) for doc in deleted])
+    has_more = len(merged) > limit
+    kept = merged[:limit]
+    if has_more:
+        last_modified, object_id, _ = kept[-1]
+        next_token = encode_token(last_modified, object_id, now)
+    else:
+        next_token = encode_token(horizon, _LAST_ID, now) # Caught up: everything up to the horizon was returned
+    returned = {(object_id, is_tombstone) for _, object_id, is_tombstone in kept}
+    changes = [doc for doc in changes if (doc['_id'], False) in returned]
+    deleted = [doc for doc in deleted if (doc['_id'], True) in returned]
+    return changes, deleted, next_token, has_more
+
+
+def encode_changes(changes, deleted, next_token, has_more):
+    """{"changes": [leaves], "deleted": [{"id", "lastModified"}], "next": token, "hasMore": bool} as bytes."""
+    return b''.join([
+        b'{"changes":', encode_leaves(changes).rstrip(b'\n'),
+        b',"deleted":', encode_leaves(deleted).rstrip(b'\n'),
+        b',"next":', json.dumps(next_token).encode('ascii'),
+        b',"hasMore":', b'true' if has_more else b'false', b'}\n',
+    ])
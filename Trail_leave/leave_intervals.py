@@ -0,0 +1,227 @@
+# leave_intervals.py
+# In-memory interval index over Approved leaves, used by the overlap check in
+# submit_leave() and by GET /api/leaves/conflicts.
+#
+# For each empId the Approved leaves are kept sorted by fromDate, next to a running
+# maximum of toDate. A range [start, end] overlaps one of them iff, among the leaves
+# starting on or before 'end' (found by bisection), the largest toDate is >= 'start'.
+# So the check is O(log n) and needs no MongoDB round trip.
+#
+# The index is loaded from the collection by init_db(). It is updated in place when
+# this process inserts a leave or changes a status (apply()). It is also rebuilt in
+# the background every LEAVE_INDEX_REFRESH seconds, to pick up changes made by other
+# worker processes. Consistency fallback: until the first load succeeds, MongoDB
+# answers every check. An overlap the index reports is always confirmed against
+# MongoDB before a request is refused, so a stale entry can never block a
+# valid submission.
+#
+# A "no overlap" answer is only trusted while the index is younger than
+# LEAVE_INDEX_MAX_STALE seconds (default 5). Under pre-forked workers another
+# process may have approved an overlapping leave since the last load, so an older
+# index confirms its misses with one count_documents() on leaves_overlap. Within
+# that bound a leave approved by another worker can go unseen for at most
+# LEAVE_INDEX_MAX_STALE seconds. With a single process every write goes through
+# apply(), so the bound can be raised to LEAVE_INDEX_REFRESH or beyond.
+# GET /api/leaves/conflicts always answers from the index, which may be up to
+# LEAVE_INDEX_REFRESH seconds old.
+
+import time
+import threading
+from bisect import bisect_right
+from collections import namedtuple
+from datetime import timezone
+from pymongo import ASCENDING
+from pymongo.operations import IndexModel
+
+# Backs the MongoDB fallback: equality on empId/status, range on fromDate, toDate checked in the index.
+OVERLAP_INDEX = IndexModel([('empId', ASCENDING), ('status', ASCENDING),
+                            ('fromDate', ASCENDING), ('toDate', ASCENDING)], name='leaves_overlap')
+
+# Fields kept in memory for each Approved leave (enough to list conflicts).
+INDEX_FIELDS = {'empId': 1, 'leaveType': 1, 'fromDate': 1, 'toDate': 1,
+                'fromHour': 1, 'toHour': 1, 'status': 1}
+
+# starts[i] / leaves[i] are sorted by fromDate; max_ends[i] = max(toDate of leaves[0..i]).
+_Bucket = namedtuple('_Bucket', 'starts max_ends leaves')
+
+
+def ensure_overlap_index(collection):
+    return collection.create_indexes([OVERLAP_INDEX])
+
+
+def overlap_query(emp_id, from_date, to_date):
+    """MongoDB filter for Approved leaves of emp_id overlapping [from_date, to_date]."""
+    # Date ranges overlap: (StartA <= EndB) and (EndA >= StartB)
+    return {"empId": emp_id, "status": "Approved",
+            "fromDate": {"$lte": to_date}, "toDate": {"$gte": from_date}}
+
+
+def _naive_utc(value):
+    """PyMongo returns naive UTC datetimes; bring request values to the same form before comparing."""
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _entry(doc):
+    entry = {field: doc.get(field) for field in INDEX_FIELDS}
+    entry['_id'] = doc['_id']
+    entry['fromDate'] = _naive_utc(doc['fromDate'])
+    entry['toDate'] = _naive_utc(doc['toDate'])
+    return entry
+
+
+def _make_bucket(entries):
+    leaves = sorted(entries, key=lambda e: (e['fromDate'], e['toDate']))
+    max_ends, running = [], None
+    for leave in leaves:
+        running = leave['toDate'] if running is None else max(running, leave['toDate'])
+        max_ends.append(running)
+    return _Bucket([leave['fromDate'] for leave in leaves], max_ends, leaves)
+
+
+def _make_buckets(by_emp):
+    return {emp_id: _make_bucket(leaves.values()) for emp_id, leaves in by_emp.items() if leaves}
+
+
+def _apply(by_emp, doc):
+    """Adds, replaces or removes doc in an {empId: {_id: entry}} map according to its status."""
+    leaves = by_emp.setdefault(doc['empId'], {})
+    if doc.get('status') == 'Approved':
+        leaves[doc['_id']] = _entry(doc)
+    else:
+        leaves.pop(doc['_id'], None)
+
+
+class ApprovedLeaveIndex:
+    """Per-employee interval index over Approved leaves. Safe to share between request threads."""
+
+    def __init__(self, refresh_seconds=60, max_stale_seconds=5):
+        self.refresh_seconds = refresh_seconds
+        self.max_stale_seconds = max_stale_seconds # Age up to which a miss is trusted without MongoDB
+        self.built_at = None # time.monotonic() of the last successful load
+        self._buckets = {} # empId -> _Bucket; buckets are replaced, never mutated
+        self._lock = threading.Lock()
+        self._journal = None # Changes applied while a load is running, replayed onto its result
+        self._refreshing = False
+
+    @classmethod
+    def from_documents(cls, docs):
+        """A static index over the given documents (no refresh), for one-off checks like bulk imports."""
+        index = cls(refresh_seconds=0, max_stale_seconds=float('inf'))
+        by_emp = {}
+        for doc in docs:
+            _apply(by_emp, doc)
+        index._buckets = _make_buckets(by_emp)
+        index.built_at = time.monotonic()
+        return index
+
+    @property
+    def ready(self):
+        return self.built_at is not None
+
+    def __len__(self):
+        return sum(len(bucket.leaves) for bucket in self._buckets.values())
+
+    # --- Loading ---
+    def build(self, collection):
+        """Loads every Approved leave from the collection and swaps it in. Returns the leave count."""
+        with self._lock:
+            self._journal = []
+        by_emp = {}
+        try:
+            for doc in collection.find({"status": "Approved"}, INDEX_FIELDS):
+                _apply(by_emp, doc)
+        except Exception:
+            with self._lock:
+                self._journal = None
+            raise
+        with self._lock:
+            for doc in self._journal:
+                _apply(by_emp, doc)
+            self._journal = None
+            self._buckets = _make_buckets(by_emp)
+            self.built_at = time.monotonic()
+        return len(self)
+
+    def maybe_refresh(self, collection):
+        """Starts a background reload when the index is older than refresh_seconds."""
+        if (not self.ready or self.refresh_seconds <= 0 or self._refreshing
+                or time.monotonic() - self.built_at < self.refresh_seconds):
+            return
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._refresh, args=(collection,), daemon=True).start()
+
+    def _refresh(self, collection):
+        try:
+            self.build(collection)
+        except Exception as e:
+            print(f"⚠️ Could not refresh the approved-leave index (keeping the previous one): {e}")
+        finally:
+            self._refreshing = False
+
+    # --- Updates ---
+    def apply(self, doc):
+        """
+        Records an inserted leave or a status change. doc needs _id, empId, status,
+        fromDate and toDate; leaves that are not Approved are removed from the index.
+        """
+        with self._lock:
+            if self._journal is not None:
+                self._journal.append(doc)
+            bucket = self._buckets.get(doc['empId'])
+            by_emp = {doc['empId']: {leave['_id']: leave for leave in bucket.leaves} if bucket else {}}
+            _apply(by_emp, doc)
+            leaves = by_emp[doc['empId']]
+            if leaves:
+                self._buckets[doc['empId']] = _make_bucket(leaves.values())
+            else:
+                self._buckets.pop(doc['empId'], None)
+
+    # --- Queries ---
+    def overlaps(self, emp_id, from_date, to_date):
+        """True if an indexed Approved leave of emp_id overlaps [from_date, to_date]."""
+        bucket = self._buckets.get(emp_id)
+        if bucket is None:
+            return False
+        i = bisect_right(bucket.starts, _naive_utc(to_date))
+        return i > 0 and bucket.max_ends[i - 1] >= _naive_utc(from_date)
+
+    def conflicts(self, emp_id, from_date, to_date):
+        """Indexed Approved leaves of emp_id overlapping [from_date, to_date], by fromDate."""
+        bucket = self._buckets.get(emp_id)
+        if bucket is None:
+            return []
+        start = _naive_utc(from_date)
+        found = []
+        # Walk back from the last leave starting on or before to_date; once the running
+        # maximum of toDate drops below start, no earlier leave can overlap.
+        for i in range(bisect_right(bucket.starts, _naive_utc(to_date)) - 1, -1, -1):
+            if bucket.max_ends[i] < start:
+                break
+            if bucket.leaves[i]['toDate'] >= start:
+                found.append(bucket.leaves[i])
+        found.reverse()
+        return found
+
+    # --- With MongoDB fallback ---
+    def has_overlap(self, collection, emp_id, from_date, to_date):
+        """Overlap check for a new leave: in memory when possible, MongoDB otherwise."""
+        if self.ready:
+            self.maybe_refresh(collection)
+            if (not self.overlaps(emp_id, from_date, to_date)
+                    and time.monotonic() - self.built_at <= self.max_stale_seconds):
+                return False
+        # Confirm (or, before the first load, answer) with MongoDB; the leave the index
+        # found may have been changed by another process since the last refresh, and
+        # an old index may miss a leave another process approved.
+        return collection.count_documents(overlap_query(emp_id, from_date, to_date), limit=1) > 0
+
+    def find_conflicts(self, collection, emp_id, from_date, to_date):
+        if self.ready:
+            self.maybe_refresh(collection)
+            return self.conflicts(emp_id, from_date, to_date)
+        return list(collection.find(overlap_query(emp_id, from_date, to_date), INDEX_FIELDS).sort('fromDate', ASCENDING))
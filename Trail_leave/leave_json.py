@@ -0,0 +1,271 @@
+# leave_json.py
+# JSON encoding of leave documents for the /api/leaves responses.
+#
+# serialize_doc() is the original per-document converter: it walks every key, then
+# jsonify() encodes the result a second time. encode_leaves() produces the same JSON
+# (same keys, sorted like jsonify, same date format) directly as bytes:
+#   - python:  an encoder generated once for the leave schema (LEAVE_FIELDS); each
+#              known field is written by a specialised branch. Strings go through the
+#              C escaper from the json module. Datetimes are formatted with isoformat()
+#              instead of strftime(), and fields outside the schema are still handled.
+#   - orjson / msgspec: documents are converted to plain dicts (dates pre-formatted)
+#              and encoded by the C extension. Used automatically when installed.
+#              Non-ASCII text is written as UTF-8 rather than \u escapes.
+# LEAVE_JSON_BACKEND=python|orjson|msgspec forces a backend (default: fastest available).
+
+import os
+import json
+from json.encoder import encode_basestring_ascii
+from datetime import datetime, timezone
+from bson import ObjectId
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+# Fields written by submit_leave(), with how each is stored.
+LEAVE_FIELDS = {
+    'name': 'str', 'empId': 'str', 'email': 'str', 'leaveType': 'str',
+    'fromDate': 'datetime', 'toDate': 'datetime', 'fromHour': 'str', 'toHour': 'str',
+    'reason': 'str', 'status': 'str', 'submittedAt': 'datetime', 'lastModified': 'datetime',
+}
+
+
+# --- Reference implementation ---
+def serialize_doc(doc):
+    """Converts MongoDB document to JSON-serializable dict."""
+    if doc is None: return None
+    serialized = {}
+    for key, value in doc.items():
+        if isinstance(value, ObjectId):
+            serialized['id'] = str(value) # Use 'id' for frontend consistency
+        elif isinstance(value, datetime):
+            # Ensure timezone is UTC before formatting
+            if value.tzinfo is None:
+                 value = value.replace(tzinfo=timezone.utc)
+            else:
+                 value = value.astimezone(timezone.utc)
+            serialized[key] = value.strftime('%Y-%m-%dT%H:%M:%S.%fZ') # ISO format Z indicates UTC
+        else:
+            # Keep _id as string 'id' if it wasn't an ObjectId somehow
+            if key == '_id':
+                 serialized['id'] = str(value)
+            else:
+                 serialized[key] = value
+
+    # Ensure 'id' field exists if '_id' was present
+    if '_id' in doc and 'id' not in serialized:
+         serialized['id'] = str(doc['_id'])
+
+    # Remove original '_id' if it exists and we added 'id'
+    if '_id' in serialized:
+        del serialized['_id']
+
+    return serialized
+
+
+# --- Shared helpers ---
+def format_datetime(value):
+    """'2025-05-01T00:00:00.000000Z'; same output as serialize_doc(), without strftime()."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    if value.year < 1000: # strftime() does not zero-pad these years on every platform; match it exactly
+        return value.replace(tzinfo=timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+    return value.isoformat(timespec='microseconds') + 'Z'
+
+
+DATETIME_CACHE_SIZE = 100_000
+_datetime_cache = {} # datetime -> formatted string; fromDate/toDate repeat a lot (whole days)
+
+
+def cached_format_datetime(value):
+    text = _datetime_cache.get(value)
+    if text is None:
+        if len(_datetime_cache) >= DATETIME_CACHE_SIZE:
+            _datetime_cache.clear()
+        text = _datetime_cache[value] = format_datetime(value)
+    return text
+
+
+def _default(value):
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, datetime):
+        return format_datetime(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _encode_value(value):
+    """Any value, encoded the way jsonify() encodes serialize_doc() output."""
+    if value is None:
+        return 'null'
+    if value.__class__ is datetime:
+        return '"' + format_datetime(value) + '"'
+    if value.__class__ is ObjectId:
+        return '"' + str(value) + '"'
+    return json.dumps(value, ensure_ascii=True, sort_keys=True, separators=(',', ':'), default=_default)
+
+
+def to_plain(doc):
+    """serialize_doc() equivalent used by the orjson/msgspec backends."""
+    plain = {}
+    for key, value in doc.items():
+        if key == '_id':
+            plain['id'] = str(value)
+        elif value.__class__ is datetime:
+            plain[key] = cached_format_datetime(value)
+        elif value.__class__ is ObjectId:
+            plain[key] = str(value)
+        else:
+            plain[key] = value
+    return plain
+
+
+# --- Generated pure-Python encoder ---
+def _compile_encoder(fields):
+    """
+    Builds encode(doc) -> str for documents shaped like 'fields' (plus _id -> "id").
+    Keys are emitted in sorted order, like jsonify(); documents with fields outside
+    the schema take the generic path for those keys.
+    """
+    keys = sorted(list(fields) + ['id'])
+    lines = ['def encode(doc):', '    get = doc.get', '    out = []', '    seen = 0']
+    for key in keys:
+        source = '_id' if key == 'id' else key
+        prefix = encode_basestring_ascii(key) + ':'
+        lines.append(f'    v = get({source!r}, _MISSING)')
+        lines.append('    if v is not _MISSING:')
+        lines.append('        seen += 1')
+        if key == 'id':
+            lines.append(f'        out.append({prefix!r} + \'"\' + str(v) + \'"\' if v.__class__ is ObjectId else {prefix!r} + _esc(str(v)))')
+        elif fields[key] == 'datetime':
+            lines.append('        if v.__class__ is datetime:')
+            lines.append('            t = _dates_get(v)')
+            lines.append(f'            out.append({prefix + chr(34)!r} + (t if t is not None else _date(v)) + \'"\')')
+            lines.append('        else:')
+            lines.append(f'            out.append({prefix!r} + _value(v))')
+        else:
+            lines.append(f'        out.append({prefix!r} + (_esc(v) if v.__class__ is str else \'null\' if v is None else _value(v)))')
+    lines.append('    if seen != len(doc):')
+    lines.append('        return _generic(doc)')
+    lines.append("    return '{' + ','.join(out) + '}'")
+    namespace = {'_MISSING': object(), 'ObjectId': ObjectId, 'datetime': datetime, '_esc': encode_basestring_ascii,
+                 '_dates_get': _datetime_cache.get, '_date': cached_format_datetime,
+                 '_value': _encode_value, '_generic': _encode_generic}
+    exec('\n'.join(lines), namespace)
+    return namespace['encode']
+
+
+def _encode_generic(doc):
+    """Documents with fields outside the schema (rare): convert, then encode key by key."""
+    plain = to_plain(doc)
+    return '{' + ','.join(encode_basestring_ascii(k) + ':' + _encode_value(plain[k]) for k in sorted(plain)) + '}'
+
+
+encode_leave = _compile_encoder(LEAVE_FIELDS)
+
+
+# --- Backends ---
+def _encode_python(docs):
+    return ('[' + ','.join(map(encode_leave, docs)) + ']\n').encode('ascii')
+
+
+def _encode_orjson(docs):
+    return orjson.dumps([to_plain(doc) for doc in docs], option=orjson.OPT_SORT_KEYS | orjson.OPT_APPEND_NEWLINE)
+
+
+def _encode_msgspec(docs):
+    return _msgspec_encoder.encode([to_plain(doc) for doc in docs]) + b'\n'
+
+
+def _encode_python_lines(docs):
+    return ''.join([encode_leave(doc) + '\n' for doc in docs]).encode('ascii')
+
+
+def _encode_orjson_lines(docs):
+    option = orjson.OPT_SORT_KEYS | orjson.OPT_APPEND_NEWLINE
+    return b''.join([orjson.dumps(to_plain(doc), option=option) for doc in docs])
+
+
+def _encode_msgspec_lines(docs):
+    return _msgspec_encoder.encode_lines([to_plain(doc) for doc in docs])
+
+
+_msgspec_encoder = msgspec.json.Encoder(order='sorted') if msgspec is not None else None
+
+BACKENDS = {'python': _encode_python}
+LINE_BACKENDS = {'python': _encode_python_lines}
+if orjson is not None:
+    BACKENDS['orjson'] = _encode_orjson
+    LINE_BACKENDS['orjson'] = _encode_orjson_lines
+if msgspec is not None:
+    BACKENDS['msgspec'] = _encode_msgspec
+    LINE_BACKENDS['msgspec'] = _encode_msgspec_lines
+
+
+def _pick_backend(name):
+    if name in BACKENDS:
+        return name
+    if name not in ('', 'auto'):
+        print(f"⚠️ LEAVE_JSON_BACKEND '{name}' is not available, choosing automatically")
+    return 'orjson' if 'orjson' in BACKENDS else 'msgspec' if 'msgspec' in BACKENDS else 'python'
+
+
+BACKEND = _pick_backend(os.getenv('LEAVE_JSON_BACKEND', 'auto').lower())
+
+
+def encode_leaves(docs, backend=None):
+    """Encodes an iterable of leave documents as a JSON array (bytes, newline-terminated like jsonify())."""
+    return BACKENDS[backend or BACKEND](docs if isinstance(docs, list) else list(docs))
+
+
+def encode_leaves_ndjson(docs, backend=None):
+    """Encodes leave documents as newline-delimited JSON, one document per line (bytes)."""
+    return LINE_BACKENDS[backend or BACKEND](docs if isinstance(docs, list) else list(docs))
+
+
+# --- Streaming ---
+def iter_json(cursor, batch_size, fmt='json', on_close=None, backend=None):
+    """
+    Yields a JSON array (fmt='json') or NDJSON (fmt='ndjson') from a cursor, one chunk
+    per batch_size documents, so memory stays bounded by one batch whatever the result
+    size. The cursor is closed when the generator finishes or is closed early (the WSGI
+    server closes the response iterable when the client disconnects); on_close(sent,
+    completed) is then called with the number of documents sent.
+    """
+    sent, completed = 0, False
+    try:
+        if fmt == 'json':
+            yield b'['
+        batch = []
+        for doc in cursor:
+            batch.append(doc)
+            if len(batch) >= batch_size:
+                chunk = _encode_chunk(batch, fmt, sent, backend)
+                sent += len(batch)
+                batch = []
+                yield chunk
+        if batch:
+            chunk = _encode_chunk(batch, fmt, sent, backend)
+            sent += len(batch)
+            yield chunk
+        if fmt == 'json':
+            yield b']\n'
+        completed = True
+    finally:
+        cursor.close() # Kills the server-side cursor if the stream stopped early
+        if on_close is not None:
+            on_close(sent, completed)
+
+
+def _encode_chunk(batch, fmt, sent, backend):
+    if fmt == 'ndjson':
+        return encode_leaves_ndjson(batch, backend)
+    chunk = encode_leaves(batch, backend)[1:-2] # Strip '[' and ']\n'; the stream writes those once
+    return b',' + chunk if sent else chunk
@@ -0,0 +1,206 @@
+# leave_queries.py
+# Query building for GET /api/leaves: filters, projection, keyset pagination
+# and the indexes that back them.
+#
+# Pages are keyset-paginated on (submittedAt, _id). The cursor is an opaque token
+# holding the last row's sort key and direction, so every page is an index range
+# scan of 'limit' entries, however deep. Each equality filter leads one of the
+# compound indexes in LEAVE_INDEXES followed by the sort key; the from/to date
+# range is checked against the fetched rows of that range scan.
+
+import json
+import base64
+import binascii
+from datetime import datetime, timezone
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ASCENDING, DESCENDING
+from pymongo.operations import IndexModel
+
+MAX_PAGE_SIZE = 500
+STREAM_FORMATS = ('json', 'ndjson')
+
+# name -> leading equality keys; each index ends with (submittedAt, _id).
+LEAVE_INDEXES = {
+    'leaves_submitted': [],
+    'leaves_emp_submitted': [('empId', ASCENDING)],
+    'leaves_status_submitted': [('status', ASCENDING)],
+    'leaves_type_submitted': [('leaveType', ASCENDING)],
+    'leaves_emp_status_submitted': [('empId', ASCENDING), ('status', ASCENDING)],
+}
+
+# Fields returned by the listing (everything submit_leave() stores).
+LIST_FIELDS = ('name', 'empId', 'email', 'leaveType', 'fromDate', 'toDate',
+               'fromHour', 'toHour', 'reason', 'status', 'submittedAt')
+
+EQUALITY_FILTERS = ('empId', 'status', 'leaveType')
+LEAVE_STATUSES = ('Pending', 'Approved', 'Rejected')
+
+
+class LeaveQueryError(ValueError):
+    """Invalid listing parameters; answered with 400."""
+
+
+def ensure_indexes(collection):
+    """Creates the listing indexes (no-op for ones that already exist). Returns their names."""
+    models = [IndexModel(keys + [('submittedAt', DESCENDING), ('_id', DESCENDING)], name=name)
+              for name, keys in LEAVE_INDEXES.items()]
+    return collection.create_indexes(models)
+
+
+# --- Cursor encoding ---
+def encode_cursor(document, direction):
+    """Opaque token for the page after 'document' in the given sort direction."""
+    submitted_at = document['submittedAt']
+    if submitted_at.tzinfo is not None:
+        submitted_at = submitted_at.astimezone(timezone.utc).replace(tzinfo=None)
+    raw = json.dumps([submitted_at.isoformat(), str(document['_id']), direction], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    """Returns (submittedAt, _id, direction) from a token made by encode_cursor()."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        submitted_at, object_id, direction = json.loads(raw)
+        if direction not in (ASCENDING, DESCENDING):
+            raise ValueError(direction)
+        return datetime.fromisoformat(submitted_at), ObjectId(object_id), direction
+    except (binascii.Error, ValueError, TypeError, InvalidId):
+        raise LeaveQueryError("Invalid 'cursor'.")
+
+
+# --- Query building ---
+def _parse_date(name, value):
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+    except ValueError:
+        raise LeaveQueryError(f"'{name}' must be a date in YYYY-MM-DD format.")
+
+
+def build_filter(args):
+    """
+    Translates query parameters into a MongoDB filter.
+    empId, status and leaveType match exactly; status also accepts a comma-separated list.
+    from/to select leaves overlapping that date range (inclusive).
+    """
+    query = {}
+    for name in EQUALITY_FILTERS:
+        value = (args.get(name) or '').strip()
+        if not value:
+            continue
+        if name == 'status':
+            statuses = [s.strip() for s in value.split(',') if s.strip()]
+            unknown = [s for s in statuses if s not in LEAVE_STATUSES]
+            if unknown:
+                raise LeaveQueryError(f"Unknown status: {', '.join(unknown)}.")
+            query['status'] = statuses[0] if len(statuses) == 1 else {'$in': statuses}
+        else:
+            query[name] = value
+
+    range_from = _parse_date('from', args['from']) if args.get('from') else None
+    range_to = _parse_date('to', args['to']) if args.get('to') else None
+    if range_from and range_to and range_to < range_from:
+        raise LeaveQueryError("'to' cannot be before 'from'.")
+    # Overlap: leave.fromDate <= range_to and leave.toDate >= range_from
+    if range_to:
+        query['fromDate'] = {'$lte': range_to}
+    if range_from:
+        query['toDate'] = {'$gte': range_from}
+    return query
+
+
+def build_projection(fields_param):
+    """Projection for a comma-separated 'fields' parameter; defaults to LIST_FIELDS."""
+    if not fields_param:
+        fields = LIST_FIELDS
+    else:
+        fields = [f.strip() for f in fields_param.split(',') if f.strip()]
+        unknown = sorted(set(fields) - set(LIST_FIELDS))
+        if unknown:
+            raise LeaveQueryError(f"Unknown field(s): {', '.join(unknown)}.")
+    projection = {field: 1 for field in fields}
+    projection['submittedAt'] = 1 # Needed for the next cursor
+    return projection
+
+
+def parse_page_size(value):
+    """Returns the page size, or None when no 'limit' was given (unpaginated)."""
+    if value is None or value == '':
+        return None
+    try:
+        limit = int(value)
+    except ValueError:
+        raise LeaveQueryError("'limit' must be an integer.")
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise LeaveQueryError(f"'limit' must be between 1 and {MAX_PAGE_SIZE}.")
+    return limit
+
+
+def parse_order(value):
+    if value in (None, '', 'desc'):
+        return DESCENDING
+    if value == 'asc':
+        return ASCENDING
+    raise LeaveQueryError("'order' must be 'asc' or 'desc'.")
+
+
+def after_cursor(query, submitted_at, object_id, direction):
+    """Adds the keyset bound for rows strictly after the cursor position."""
+    bounded = dict(query)
+    op, strict = ('$lte', '$lt') if direction == DESCENDING else ('$gte', '$gt')
+    # The plain bound gives the planner tight index bounds; the $or breaks ties on _id.
+    bounded['submittedAt'] = {op: submitted_at}
+    bounded['$or'] = [
+        {'submittedAt': {strict: submitted_at}},
+        {'submittedAt': submitted_at, '_id': {strict: object_id}},
+    ]
+    return bounded
+
+
+def plan_listing(args):
+    """
+    Parses the request arguments once.
+    Returns (query, projection, sort, limit); limit is None for an unpaginated listing.
+    """
+    limit = parse_page_size(args.get('limit'))
+    direction = parse_order(args.get('order'))
+    query = build_filter(args)
+    if args.get('cursor'):
+        submitted_at, object_id, direction = decode_cursor(args['cursor'])
+        if limit is None:
+            raise LeaveQueryError("'cursor' requires 'limit'.")
+        query = after_cursor(query, submitted_at, object_id, direction)
+    sort = [('submittedAt', direction), ('_id', direction)]
+    return query, build_projection(args.get('fields')), sort, limit
+
+
+def find_page(collection, args):
+    """
+    Runs one listing page. Returns (documents, next_cursor); next_cursor is None
+    on the last page and for unpaginated listings.
+    """
+    query, projection, sort, limit = plan_listing(args)
+    cursor = collection.find(query, projection).sort(sort)
+    if limit is None:
+        return list(cursor), None
+    # Fetch one extra row to learn whether another page exists without a count.
+    documents = list(cursor.limit(limit + 1))
+    next_cursor = None
+    if len(documents) > limit:
+        documents = documents[:limit]
+        next_cursor = encode_cursor(documents[-1], sort[0][1])
+    return documents, next_cursor
+
+
+def open_stream(collection, args, batch_size):
+    """
+    Cursor for a streamed listing (?stream=json|ndjson). Streams are never paginated;
+    the cursor fetches batch_size documents per round trip and must be closed by the caller.
+    """
+    if args.get('stream') not in STREAM_FORMATS:
+        raise LeaveQueryError("'stream' must be 'json' or 'ndjson'.")
+    if args.get('limit') or args.get('cursor'):
+        raise LeaveQueryError("'stream' cannot be combined with 'limit' or 'cursor'.")
+    query, projection, sort, _ = plan_listing(args)
+    return collection.find(query, projection, batch_size=batch_size).sort(sort)
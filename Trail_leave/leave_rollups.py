@@ -0,0 +1,156 @@
+# leave_rollups.py
+# Pre-aggregated leave statistics for GET /api/leaves/stats.
+#
+# The 'leave_rollups' collection holds one document per (month, leaveType, status)
+# with the number of leaves starting in that month and the leave days falling in
+# it. A leave spanning a month boundary adds its days to each month it covers. The
+# documents are kept current with $inc upserts: on submission (submit_leave(), bulk
+# submissions), on deletion and on status changes (record_status_change(): minus one
+# on the old status, plus one on the new). A stats query reads only the rollup documents for
+# the months asked for, so its cost does not depend on how many leaves exist.
+#
+# rebuild() recomputes every rollup from 'applications' in one streamed pass and
+# rewrites only the ones that drifted, e.g. because a rollup update failed after a
+# leave was saved. Run it nightly: flask --app app rebuild-rollups
+
+from datetime import date, timedelta
+from pymongo import ASCENDING, UpdateOne, ReplaceOne, DeleteOne
+from leave_queries import LeaveQueryError
+
+ROLLUP_DIMENSIONS = ('month', 'leaveType', 'status')
+ROLLUP_FIELDS = {'fromDate': 1, 'toDate': 1, 'leaveType': 1, 'status': 1, '_id': 0}
+COUNTERS = ('leaves', 'days')
+
+
+def ensure_indexes(rollups):
+    return rollups.create_index([('month', ASCENDING)], name='rollups_month')
+
+
+def _key(month, leave_type, status):
+    return f"{month}|{leave_type}|{status}"
+
+
+def contributions(leave):
+    """{month: (leaves, days)} for one leave; days are calendar days, inclusive, split by month."""
+    start, end = leave['fromDate'].date(), leave['toDate'].date()
+    result = {}
+    first = True
+    while start <= end:
+        next_month = (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+        span_end = min(end, next_month - timedelta(days=1))
+        result[start.strftime('%Y-%m')] = (1 if first else 0, (span_end - start).days + 1)
+        start, first = next_month, False
+    return result
+
+
+def rollup_updates(leave, sign=1):
+    """$inc upserts adding (sign=1) or removing (sign=-1) one leave's contribution."""
+    updates = []
+    for month, (leaves, days) in contributions(leave).items():
+        updates.append(UpdateOne(
+            {'_id': _key(month, leave['leaveType'], leave['status'])},
+            {'$inc': {'leaves': sign * leaves, 'days': sign * days},
+             '$setOnInsert': {'month': month, 'leaveType': leave['leaveType'], 'status': leave['status']}},
+            upsert=True))
+    return updates
+
+
+def record_leaves(rollups, leaves):
+    """Adds newly inserted leaves to the rollups (one bulk write)."""
+    updates = [update for leave in leaves for update in rollup_updates(leave)]
+    if updates:
+        rollups.bulk_write(updates, ordered=False)
+
+
+def record_status_change(rollups, leave, old_status):
+    """Moves a leave's contribution from old_status to leave['status']."""
+    if old_status == leave['status']:
+        return
+    rollups.bulk_write(rollup_updates(dict(leave, status=old_status), sign=-1) + rollup_updates(leave),
+                       ordered=False)
+
+
+def record_deletion(rollups, leave):
+    """Removes a deleted leave's contribution."""
+    rollups.bulk_write(rollup_updates(leave, sign=-1), ordered=False)
+
+
+# --- Nightly rebuild / reconcile ---
+def compute_rollups(collection, batch_size=10_000):
+    """Recomputes every rollup from the applications collection in one streamed pass."""
+    totals = {}
+    for leave in collection.find({}, ROLLUP_FIELDS, batch_size=batch_size):
+        if not (leave.get('fromDate') and leave.get('toDate') and leave.get('leaveType') and leave.get('status')):
+            continue # Not a complete leave application
+        for month, (leaves, days) in contributions(leave).items():
+            key = _key(month, leave['leaveType'], leave['status'])
+            entry = totals.setdefault(key, {'_id': key, 'month': month, 'leaveType': leave['leaveType'],
+                                            'status': leave['status'], 'leaves': 0, 'days': 0})
+            entry['leaves'] += leaves
+            entry['days'] += days
+    return totals
+
+
+def rebuild(collection, rollups, dry_run=False):
+    """
+    Reconciles the rollups with the applications collection. Returns a report with
+    the number of rollups and the keys that were wrong ('changed') or should not
+    exist ('removed'). With dry_run nothing is written.
+    """
+    expected = compute_rollups(collection)
+    current = {doc['_id']: doc for doc in rollups.find({})}
+    changed = [key for key, doc in expected.items()
+               if key not in current or any(current[key].get(c) != doc[c] for c in COUNTERS)]
+    stale = [key for key in current if key not in expected]
+    # Rollups whose counters went back to zero after status changes are cleaned up, not reported
+    removed = [key for key in stale if any(current[key].get(c) for c in COUNTERS)]
+    if not dry_run and (changed or stale):
+        writes = [ReplaceOne({'_id': key}, expected[key], upsert=True) for key in changed]
+        writes += [DeleteOne({'_id': key}) for key in stale]
+        rollups.bulk_write(writes, ordered=False)
+    return {'rollups': len(expected), 'changed': changed, 'removed': removed}
+
+
+# --- Stats queries ---
+def _parse_month(name, value):
+    try:
+        return date.fromisoformat(value + '-01').strftime('%Y-%m')
+    except ValueError:
+        raise LeaveQueryError(f"'{name}' must be a month in YYYY-MM format.")
+
+
+def query_stats(rollups, args):
+    """
+    Answers a stats query from the rollups. Parameters (all optional):
+      from, to   YYYY-MM, inclusive month range
+      leaveType, status   restrict to one value (status also accepts a comma-separated list)
+      groupBy    comma-separated subset of month,leaveType,status (default month,leaveType)
+    Returns [{<group fields>, leaves, days}] sorted by the group fields.
+    """
+    group_by = [g.strip() for g in (args.get('groupBy') or 'month,leaveType').split(',') if g.strip()]
+    unknown = [g for g in group_by if g not in ROLLUP_DIMENSIONS]
+    if unknown:
+        raise LeaveQueryError(f"Unknown groupBy field(s): {', '.join(unknown)}.")
+
+    query = {}
+    month_range = {}
+    if args.get('from'):
+        month_range['$gte'] = _parse_month('from', args['from'])
+    if args.get('to'):
+        month_range['$lte'] = _parse_month('to', args['to'])
+    if month_range:
+        query['month'] = month_range
+    if args.get('leaveType'):
+        query['leaveType'] = args['leaveType']
+    if args.get('status'):
+        statuses = [s.strip() for s in args['status'].split(',') if s.strip()]
+        query['status'] = {'$in': statuses}
+
+    groups = {}
+    for doc in rollups.find(query, {'_id': 0}):
+        key = tuple(doc[g] for g in group_by)
+        entry = groups.setdefault(key, dict(zip(group_by, key), leaves=0, days=0))
+        entry['leaves'] += doc.get('leaves', 0)
+        entry['days'] += doc.get('days', 0)
+    # Drop groups emptied by status changes (their counters went back to zero)
+    return [groups[key] for key in sorted(groups) if groups[key]['leaves'] or groups[key]['days']]
@@ -0,0 +1,120 @@
+# leave_validation.py
+# Server-side validation of one leave application, shared by POST /api/leaves and
+# POST /api/leaves/bulk. Mirrors the checks in templates/index.html.
+
+import re
+from functools import lru_cache
+from datetime import datetime, timezone
+
+REQUIRED_FIELDS = ['name', 'empId', 'email', 'leaveType', 'fromDate', 'toDate', 'reason']
+EMP_ID_PATTERN = re.compile(r"^[A-Z]{3}0[0-9]{3}$") # Matches original JS pattern
+EMAIL_PATTERN = re.compile(r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$") # Matches original JS pattern
+
+
+@lru_cache(maxsize=4096)
+def parse_day(value):
+    """'YYYY-MM-DD' -> UTC midnight. Cached: bulk imports repeat the same few dates."""
+    return datetime.strptime(value, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+
+
+@lru_cache(maxsize=1024)
+def parse_hour(value):
+    return datetime.strptime(value, '%H:%M').time()
+
+
+def validate_leave(data, submitted_at=None):
+    """
+    Validates one application (a dict parsed from JSON).
+    Returns (new_leave, errors): the document to insert, or a {field: message} dict.
+    """
+    if not isinstance(data, dict):
+        return None, {"leave": "Each leave must be a JSON object."}
+    errors = {}
+
+    for field in REQUIRED_FIELDS:
+        value = data.get(field, '')
+        if not isinstance(value, str):
+            errors[field] = "Must be a string."
+        # Use .get() with default empty string to avoid KeyError if field missing entirely
+        elif not value.strip():
+            # Create user-friendly field names
+            field_name = field.replace('Type', ' type').replace('Date', ' date')
+            field_name = field_name[0].upper() + field_name[1:]
+            errors[field] = f"{field_name} is required."
+
+    # Specific format/length validations (should mirror frontend logic)
+    if 'name' not in errors and not (3 <= len(data.get('name', '')) <= 50):
+         errors['name'] = "Name must be 3-50 characters."
+    if 'empId' not in errors and not EMP_ID_PATTERN.match(data.get('empId', '')):
+        errors['empId'] = "Employee ID format: 3 Caps, '0', 3 digits (e.g., ABC0123)."
+    if 'email' not in errors and not EMAIL_PATTERN.match(data.get('email', '')):
+        errors['email'] = "Invalid email format."
+    # Reason length (matches original JS min/maxlength)
+    if 'reason' not in errors and not (5 <= len(data.get('reason', '')) <= 100): # Max 100 from original textarea
+         errors['reason'] = "Reason must be 5-100 characters."
+
+    # Date logic validation
+    from_dt, to_dt = None, None # Initialize
+    try:
+        from_date_str = data.get('fromDate')
+        to_date_str = data.get('toDate')
+        if 'fromDate' not in errors and from_date_str:
+             from_dt = parse_day(from_date_str)
+        if 'toDate' not in errors and to_date_str:
+             to_dt = parse_day(to_date_str)
+
+        if from_dt and to_dt and to_dt < from_dt:
+             errors['toDate'] = "To Date cannot be before From Date."
+
+        # Optional: Validate against being too far in past/future (mirroring JS)
+        # today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+        # six_months_later = (datetime.now(timezone.utc) + timedelta(days=180)).replace(hour=23, minute=59, second=59)
+        # if from_dt and (from_dt < today or from_dt > six_months_later):
+        #     errors['fromDate'] = "From Date must be today or within the next 6 months."
+
+    except (ValueError, TypeError) as date_err:
+        print(f"Date parsing error: {date_err}")
+        if 'fromDate' not in errors and not from_dt: errors['fromDate'] = "Invalid From Date."
+        if 'toDate' not in errors and not to_dt: errors['toDate'] = "Invalid To Date."
+
+    # Hour validation (only if dates are valid and the same)
+    from_h, to_h = data.get('fromHour'), data.get('toHour')
+    if from_dt and to_dt and from_dt == to_dt:
+        if from_h and to_h: # Only validate if both are provided for a single day
+            try:
+                t1 = parse_hour(from_h)
+                t2 = parse_hour(to_h)
+                if t1 >= t2:
+                     errors['fromHour'] = errors.get('fromHour',"From Hour must be before To Hour.") # Keep existing error if any
+                # Check min duration (30 mins)
+                dt1 = datetime.combine(datetime.min.date(), t1)
+                dt2 = datetime.combine(datetime.min.date(), t2)
+                if (dt2 - dt1).total_seconds() < 30 * 60:
+                     errors['toHour'] = errors.get('toHour',"Minimum duration is 30 minutes.")
+            except (ValueError, TypeError):
+                 # Don't overwrite existing 'fromHour' error if 'toHour' is invalid format
+                 if 'fromHour' not in errors: errors['fromHour'] = "Invalid time format."
+                 if 'toHour' not in errors: errors['toHour'] = "Invalid time format."
+    else:
+        # Ensure hours are nullified if dates are different
+        from_h, to_h = None, None
+
+    if errors:
+        return None, errors
+
+    # --- Prepare data for MongoDB ---
+    new_leave = {
+        "name": data["name"].strip(),
+        "empId": data["empId"].strip(),
+        "email": data["email"].strip().lower(),
+        "leaveType": data["leaveType"],
+        "fromDate": from_dt, # Use validated UTC datetime
+        "toDate": to_dt,     # Use validated UTC datetime
+        "fromHour": from_h, # Will be None if dates differ or not provided
+        "toHour": to_h,
+        "reason": data["reason"].strip(),
+        "status": "Pending",
+        "submittedAt": submitted_at or datetime.now(timezone.utc)
+    }
+    # 'lastModified' is stamped by the caller right before the write (see leave_changes.py)
+    return new_leave, None
@@ -1,67 +1,272 @@
+# query.py
+# Reporting export for the leave applications collection.
+#
+# Filters are turned into a MongoDB query and the selected fields into a projection,
+# so only matching documents and columns leave the server. The cursor is read in
+# batches of --batch-size documents. Each batch becomes one chunk of typed columns
+# (strings, UTC timestamps) and is written to the output before the next one is
+# read, so memory stays bounded by one batch and export time grows linearly with
+# the number of rows.
+#
+# Output format follows the file extension (or --format):
+#   .csv               standard library csv, ISO 8601 timestamps
+#   .parquet           Parquet via pyarrow (pip install pyarrow)
+#   .arrow / .feather  Arrow IPC file via pyarrow
+# Without --output the first rows and the total count are printed.
+#
+# Usage:
+#   python query.py --leave-type Earned --starts-after 2025-01-01
+#   python query.py --status Approved --from 2025-01-01 --to 2025-03-31 -o q1.parquet
+#   python query.py --fields empId,leaveType,fromDate,toDate -o leaves.csv
+
 import os
-import pandas as pd
+import sys
+import csv
+import time
+import argparse
+from datetime import datetime, timezone
 from pymongo import MongoClient
 from pymongo.errors import ConnectionFailure
 from dotenv import load_dotenv
-from rich import print
+from leave_queries import LeaveQueryError, build_filter
+
+try:
+    from rich import print
+except ImportError:
+    pass # Plain print() works too
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
 # 1. Load Configuration
 load_dotenv()
 MONGO_URI = os.getenv("MONGO_URI")
 DATABASE_NAME = os.getenv("DATABASE_NAME", "leave_management")
 COLLECTION_NAME = "applications" # Your collection name
+DEFAULT_BATCH_SIZE = 10_000
 
-if not MONGO_URI:
-    print("❌ ERROR: MONGO_URI not set in .env file.")
-    exit(1)
+# Column name -> type, in output order. 'id' is the document's _id.
+COLUMNS = {
+    'id': 'string', 'name': 'string', 'empId': 'string', 'email': 'string',
+    'leaveType': 'string', 'fromDate': 'timestamp', 'toDate': 'timestamp',
+    'fromHour': 'string', 'toHour': 'string', 'reason': 'string',
+    'status': 'string', 'submittedAt': 'timestamp',
+}
+FORMATS = {'.csv': 'csv', '.parquet': 'parquet', '.arrow': 'arrow', '.feather': 'arrow'}
 
-client = None # Initialize client outside try block
 
-try:
-    # 2. Connect to MongoDB
-    print(f"⏳ Connecting to MongoDB (DB: {DATABASE_NAME}, Collection: {COLLECTION_NAME})...")
-    client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000)
-    db = client[DATABASE_NAME]
-    collection = db[COLLECTION_NAME]
-    # Simple check if collection seems accessible (optional)
-    collection.find_one(limit=1)
-    print("✅ Connection successful.")
-
-    # 3. Read Data into a List
-    print("⏳ Reading data...")
-    cursor = collection.find({}) # Find all documents
-    data_list = list(cursor)    # Convert cursor to list of dictionaries
-
-    if not data_list:
-        print("ℹ️ No documents found in the collection.")
-    else:
-        # 4. Create Pandas DataFrame
-        print(f"✅ Found {len(data_list)} documents. Creating DataFrame...")
-        df = pd.DataFrame(data_list)
-
-        # 5. Display DataFrame Info and Head
-        print("\n--- DataFrame Info ---")
-        df.info()
-
-        print("\n--- DataFrame Head (First 5 Rows) ---")
-        # Configure pandas display options for better console output
-        pd.set_option('display.max_columns', None) # Show all columns
-        pd.set_option('display.width', 1000)       # Adjust width
-        print(df.head())
-
-        # print((df[df["leaveType"]== "Earned") & (df['fromDate']=="2025-04-24")])
-        print(df[(df["leaveType"] == "Earned") & (df["fromDate"] > "2025-01-01")])
-
-
-
-        # You can now work with the DataFrame 'df'
-
-except ConnectionFailure as ce:
-    print(f"❌ MongoDB Connection Failure: {ce}")
-except Exception as e:
-    print(f"❌ An error occurred: {e}")
-
-finally:
-    # 6. Close Connection (Important!)
-    if client:
-        client.close()
-        print("\n🔌 MongoDB connection closed.")
\ No newline at end of file
+# --- Query building (pushed down to MongoDB) ---
+def parse_day(value):
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+    except ValueError:
+        raise LeaveQueryError(f"'{value}' is not a date in YYYY-MM-DD format.")
+
+
+def build_query(options):
+    """Same filters as GET /api/leaves (leave_queries.build_filter), plus --starts-after."""
+    query = build_filter({'empId': options.emp_id, 'status': options.status, 'leaveType': options.leave_type,
+                          'from': options.range_from, 'to': options.range_to})
+    if options.starts_after:
+        query.setdefault('fromDate', {})['$gt'] = parse_day(options.starts_after)
+    return query
+
+
+def parse_fields(value):
+    if not value:
+        return list(COLUMNS)
+    fields = [f.strip() for f in value.split(',') if f.strip()]
+    unknown = [f for f in fields if f not in COLUMNS]
+    if unknown:
+        raise LeaveQueryError(f"Unknown field(s): {', '.join(unknown)}. Available: {', '.join(COLUMNS)}")
+    return fields
+
+
+def build_projection(fields):
+    projection = {field: 1 for field in fields if field != 'id'}
+    if 'id' not in fields:
+        projection['_id'] = 0
+    return projection
+
+
+# --- Columnar chunks ---
+def _utc(value):
+    if value is None:
+        return None
+    # PyMongo returns naive datetimes that are already UTC
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def to_columns(docs, fields):
+    """One batch of documents -> {field: [values]} with typed values (str/None, aware UTC datetime/None)."""
+    columns = {}
+    for field in fields:
+        if field == 'id':
+            columns[field] = [str(doc['_id']) for doc in docs]
+        elif COLUMNS[field] == 'timestamp':
+            columns[field] = [_utc(doc.get(field)) for doc in docs]
+        else:
+            columns[field] = [None if doc.get(field) is None else str(doc[field]) for doc in docs]
+    return columns
+
+
+def read_chunks(collection, query, fields, batch_size, limit=0):
+    """Yields (row_count, columns) per batch of batch_size documents."""
+    cursor = collection.find(query, build_projection(fields), batch_size=batch_size, limit=limit)
+    try:
+        batch = []
+        for doc in cursor:
+            batch.append(doc)
+            if len(batch) == batch_size:
+                yield len(batch), to_columns(batch, fields)
+                batch = []
+        if batch:
+            yield len(batch), to_columns(batch, fields)
+    finally:
+        cursor.close()
+
+
+# --- Writers (append one chunk at a time) ---
+class CsvChunkWriter:
+    def __init__(self, path, fields):
+        self.file = open(path, 'w', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(fields)
+        self.fields = fields
+
+    def write(self, columns):
+        values = [[v.isoformat() if v is not None else None for v in columns[f]]
+                  if COLUMNS[f] == 'timestamp' else columns[f] for f in self.fields]
+        self.writer.writerows(zip(*values))
+
+    def close(self):
+        self.file.close()
+
+
+class ArrowChunkWriter:
+    """Parquet or Arrow IPC output; each chunk becomes one record batch / row group."""
+
+    def __init__(self, path, fields, fmt):
+        if pa is None:
+            raise RuntimeError(f"Writing {fmt} needs pyarrow (pip install pyarrow); use a .csv output instead.")
+        types = {'string': pa.string(), 'timestamp': pa.timestamp('us', tz='UTC')}
+        self.schema = pa.schema([(field, types[COLUMNS[field]]) for field in fields])
+        if fmt == 'parquet':
+            self.writer = pq.ParquetWriter(path, self.schema)
+        else:
+            self.writer = pa.ipc.new_file(path, self.schema)
+
+    def write(self, columns):
+        self.writer.write_batch(pa.RecordBatch.from_pydict(columns, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+def open_writer(path, fields, fmt=None):
+    fmt = fmt or FORMATS.get(os.path.splitext(path)[1].lower())
+    if fmt is None:
+        raise LeaveQueryError(f"Cannot tell the format of '{path}'; use --format csv|parquet|arrow.")
+    return CsvChunkWriter(path, fields) if fmt == 'csv' else ArrowChunkWriter(path, fields, fmt)
+
+
+def export(collection, query, fields, path, fmt=None, batch_size=DEFAULT_BATCH_SIZE, limit=0):
+    """Streams the query result into 'path'. Returns (rows, chunks)."""
+    writer = open_writer(path, fields, fmt)
+    rows = chunks = 0
+    try:
+        for count, columns in read_chunks(collection, query, fields, batch_size, limit):
+            writer.write(columns)
+            rows += count
+            chunks += 1
+    finally:
+        writer.close()
+    return rows, chunks
+
+
+def preview(collection, query, fields, head):
+    total = collection.count_documents(query)
+    print(f"✅ {total} matching documents. First {min(head, total)}:")
+    for count, columns in read_chunks(collection, query, fields, head, limit=head):
+        for row in zip(*(columns[f] for f in fields)):
+            print({f: v.isoformat() if isinstance(v, datetime) else v for f, v in zip(fields, row)})
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Export leave applications with filters pushed down to MongoDB.")
+    parser.add_argument('--emp-id')
+    parser.add_argument('--status', help="Pending, Approved, Rejected (comma-separated for several)")
+    parser.add_argument('--leave-type')
+    parser.add_argument('--from', dest='range_from', help="YYYY-MM-DD; with --to, leaves overlapping the range")
+    parser.add_argument('--to', dest='range_to', help="YYYY-MM-DD")
+    parser.add_argument('--starts-after', help="YYYY-MM-DD; only leaves whose fromDate is after this day")
+    parser.add_argument('--fields', help=f"Comma-separated columns (default: all of {', '.join(COLUMNS)})")
+    parser.add_argument('-o', '--output', help="Output file (.csv, .parquet, .arrow); omit to preview")
+    parser.add_argument('--format', choices=sorted(set(FORMATS.values())))
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help="Documents per cursor batch and chunk")
+    parser.add_argument('--limit', type=int, default=0, help="Stop after this many documents (0 = all)")
+    parser.add_argument('--head', type=int, default=5, help="Rows shown when previewing")
+    options = parser.parse_args(argv)
+    # 0 means "no limit" to MongoDB, so a zero head or batch size would read the whole collection
+    if options.head < 1:
+        parser.error("--head must be at least 1")
+    if options.batch_size < 1:
+        parser.error("--batch-size must be at least 1")
+    if options.limit < 0:
+        parser.error("--limit must be 0 (all) or more")
+    return options
+
+
+def main(argv=None):
+    options = parse_args(argv)
+    if not MONGO_URI:
+        print("❌ ERROR: MONGO_URI not set in .env file.")
+        return 1
+    try:
+        query = build_query(options)
+        fields = parse_fields(options.fields)
+    except LeaveQueryError as e:
+        print(f"❌ {e}")
+        return 2
+
+    client = None # Initialize client outside try block
+    try:
+        # 2. Connect to MongoDB
+        print(f"⏳ Connecting to MongoDB (DB: {DATABASE_NAME}, Collection: {COLLECTION_NAME})...")
+        client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000)
+        collection = client[DATABASE_NAME][COLLECTION_NAME]
+        client.admin.command('ping')
+        print("✅ Connection successful.")
+        print(f"   Query: {query}")
+
+        # 3. Preview, or export chunk by chunk
+        if not options.output:
+            preview(collection, query, fields, options.head)
+            return 0
+        began = time.perf_counter()
+        rows, chunks = export(collection, query, fields, options.output, options.format,
+                              options.batch_size, options.limit)
+        elapsed = time.perf_counter() - began
+        rate = rows / elapsed if elapsed else 0
+        print(f"✅ Wrote {rows} rows in {chunks} chunks to {options.output} ({elapsed:.2f}s, {rate:.0f} rows/s)")
+        return 0
+
+    except ConnectionFailure as ce:
+        print(f"❌ MongoDB Connection Failure: {ce}")
+    except (LeaveQueryError, RuntimeError) as e:
+        print(f"❌ {e}")
+    except Exception as e:
+        print(f"❌ An error occurred: {e}")
+    finally:
+        # 4. Close Connection (Important!)
+        if client:
+            client.close()
+            print("\n🔌 MongoDB connection closed.")
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,16 +2,21 @@ import os
 import re # Make sure re is imported
 import datetime
 import io
+import sys
 from flask import (
     Flask, render_template, request, redirect, url_for,
     flash, send_file, session
 )
 from dotenv import load_dotenv
 from pymongo import MongoClient, errors as mongoerrors
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # Shared modules at the repo root
+from applog import setup_logging, PII
 
 load_dotenv()
 
 app = Flask(__name__)
+# Queued, sampled and rate-limited logging; set LOG_LEVEL=DEBUG for the validation traces below
+logger = setup_logging('Trail_payroll')
 # IMPORTANT: Set a strong secret key in your .env file or environment variables
 app.config['SECRET_KEY'] = os.getenv('FLASK_SECRET_KEY', 'a_default_insecure_secret_key_change_me')
 
@@ -20,36 +25,44 @@ MONGO_URI = os.getenv('MONGO_URI')
 client = None
 db = None
 payslip_requests_collection = None
+_db_pid = None # Process that opened 'client'; a forked worker must open its own
+
+def init_db():
+    """Connects to MongoDB and binds the module-level client/db/collection for this process."""
+    global client, db, payslip_requests_collection, _db_pid
+    client, db, payslip_requests_collection = None, None, None
+    _db_pid = os.getpid()
+    if not MONGO_URI:
+        print("\n" + "="*50)
+        print("WARNING: MONGO_URI not set in environment variables or .env file.")
+        print("Database features will be disabled.")
+        print("Create a .env file with MONGO_URI='your_connection_string'")
+        print("="*50 + "\n")
+    else:
+        try:
+            client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000) # 5 second timeout
+            client.admin.command('ismaster') # Check connection
+            db = client.get_database() # Gets default DB from URI
+            if not db.name: # Should typically not happen if URI is valid
+                 raise mongoerrors.ConfigurationError("Database name not found in MONGO_URI or is invalid.")
+            payslip_requests_collection = db.payslip_requests # Collection name
+            print(f"Successfully connected to MongoDB! Database: '{db.name}', Collection: '{payslip_requests_collection.name}'")
+        except mongoerrors.ConfigurationError as e:
+            print(f"MongoDB Configuration Error (check your MONGO_URI format): {e}")
+            client = None
+        except mongoerrors.ConnectionFailure as e:
+            print(f"Error connecting to MongoDB (is it running? firewall?): {e}")
+            client = None
+        except Exception as e:
+            print(f"An unexpected error occurred during MongoDB initialization: {e}")
+            client = None
 
-if not MONGO_URI:
-    print("\n" + "="*50)
-    print("WARNING: MONGO_URI not set in environment variables or .env file.")
-    print("Database features will be disabled.")
-    print("Create a .env file with MONGO_URI='your_connection_string'")
-    print("="*50 + "\n")
-else:
-    try:
-        client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000) # 5 second timeout
-        client.admin.command('ismaster') # Check connection
-        db = client.get_database() # Gets default DB from URI
-        if not db.name: # Should typically not happen if URI is valid
-             raise mongoerrors.ConfigurationError("Database name not found in MONGO_URI or is invalid.")
-        payslip_requests_collection = db.payslip_requests # Collection name
-        print(f"Successfully connected to MongoDB! Database: '{db.name}', Collection: '{payslip_requests_collection.name}'")
-    except mongoerrors.ConfigurationError as e:
-        print(f"MongoDB Configuration Error (check your MONGO_URI format): {e}")
-        client = None
-    except mongoerrors.ConnectionFailure as e:
-        print(f"Error connecting to MongoDB (is it running? firewall?): {e}")
-        client = None
-    except Exception as e:
-        print(f"An unexpected error occurred during MongoDB initialization: {e}")
-        client = None
-
-# Ensure db and collection are None if client is None
-if client is None:
-    db = None
-    payslip_requests_collection = None
+    # Ensure db and collection are None if client is None
+    if client is None:
+        db = None
+        payslip_requests_collection = None
+
+init_db()
 
 
 # --- Validation Patterns ---
@@ -63,9 +76,7 @@ MONTH_PATTERN = re.compile(r"^\d{4}-\d{2}$")
 # --- Helper Functions ---
 def validate_date_logic(start_month_str, end_month_str):
     """Validates start and end month logic, ensuring correct input format."""
-    # --- Add Debug Prints ---
-    print(f"DEBUG: validate_date_logic received: start='{start_month_str}', end='{end_month_str}'")
-    # -----------------------
+    logger.debug("validate_date_logic received: start='%s', end='%s'", start_month_str, end_month_str)
 
     errors = []
     today = datetime.date.today()
@@ -86,7 +97,7 @@ def validate_date_logic(start_month_str, end_month_str):
 
         # Construct the date string *after* format validation
         constructed_date_str = f"{start_month_str}-01"
-        print(f"DEBUG: Attempting to parse start month as: '{constructed_date_str}' with format '%Y-%m-%d'") # Debug print
+        logger.debug("Attempting to parse start month as: '%s' with format '%%Y-%%m-%%d'", constructed_date_str)
         start_month_date = datetime.datetime.strptime(constructed_date_str, '%Y-%m-%d').date()
 
         # Check if date is in the future or before minimum year
@@ -109,7 +120,7 @@ def validate_date_logic(start_month_str, end_month_str):
 
             # Construct the date string *after* format validation
             constructed_date_str = f"{end_month_str}-01"
-            print(f"DEBUG: Attempting to parse end month as: '{constructed_date_str}' with format '%Y-%m-%d'") # Debug print
+            logger.debug("Attempting to parse end month as: '%s' with format '%%Y-%%m-%%d'", constructed_date_str)
             end_month_date = datetime.datetime.strptime(constructed_date_str, '%Y-%m-%d').date()
 
             # Check future date
@@ -172,7 +183,7 @@ def generate_payslip():
     errors.extend(date_errors)
 
     if errors:
-        print("Validation Errors:", errors) # Debug print
+        logger.debug("Validation Errors: %s", errors, extra=PII) # Messages echo submitted values
         for error in errors:
             flash(error, 'danger')
         # Re-render the form with errors, using session data to repopulate
@@ -183,7 +194,7 @@ def generate_payslip():
             )
 
     # --- If Validation Successful ---
-    print("Validation Successful. Clearing form data from session.") # Debug print
+    logger.debug("Validation Successful. Clearing form data from session.")
     session.pop('form_data', None) # Clear form data from session on success
 
     # Format pay period string (start_date is guaranteed to be valid here if no errors)
@@ -213,14 +224,14 @@ def generate_payslip():
         }
         try:
             result = payslip_requests_collection.insert_one(payslip_document)
-            print(f"Successfully inserted payslip request with ID: {result.inserted_id}")
+            logger.info("Successfully inserted payslip request with ID: %s", result.inserted_id)
         except Exception as e:
             db_save_error = True
-            print(f"Error inserting payslip request into MongoDB: {e}")
+            logger.error("Error inserting payslip request into MongoDB: %s", e)
             flash("Error saving request data to the database. Please try again later.", "warning")
     elif MONGO_URI: # Only warn if URI was set but connection failed
         db_save_error = True
-        print("Warning: MongoDB not connected. Payslip request data not saved.")
+        logger.warning("MongoDB not connected. Payslip request data not saved.")
         flash("Database not connected. Request data could not be saved.", "warning")
 
 
@@ -310,6 +321,14 @@ Generated: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
     )
 
 
+# --- Application Factory ---
+def create_app():
+    """Entry point for the pre-forking launcher (serve.py); reconnects if called in a forked worker."""
+    if _db_pid != os.getpid():
+        init_db()
+    return app
+
+
 # --- Run Application ---
 if __name__ == '__main__':
     app_debug = os.getenv('FLASK_DEBUG', 'False').lower() in ('true', '1', 't')
@@ -27,22 +27,29 @@ client = None
 db = None
 tasks_collection = None
 history_collection = None
+_db_pid = None # Process that opened 'client'; a forked worker must open its own
 
-try:
-    client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000) # Added timeout
-    # The ismaster command is cheap and does not require auth.
-    client.admin.command('ismaster')
-    db = client.get_database() # Get DB name from URI or specify if needed
-    tasks_collection = db.tasks
-    history_collection = db.history
-    print("Successfully connected to MongoDB!")
-except Exception as e:
-    print(f"Error connecting to MongoDB: {e}")
-    # Ensure these are None if connection failed
-    client = None
-    db = None
-    tasks_collection = None
-    history_collection = None
+def init_db():
+    """Connects to MongoDB and binds the module-level client and collections for this process."""
+    global client, db, tasks_collection, history_collection, _db_pid
+    _db_pid = os.getpid()
+    try:
+        client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000) # Added timeout
+        # The ismaster command is cheap and does not require auth.
+        client.admin.command('ismaster')
+        db = client.get_database() # Get DB name from URI or specify if needed
+        tasks_collection = db.tasks
+        history_collection = db.history
+        print("Successfully connected to MongoDB!")
+    except Exception as e:
+        print(f"Error connecting to MongoDB: {e}")
+        # Ensure these are None if connection failed
+        client = None
+        db = None
+        tasks_collection = None
+        history_collection = None
+
+init_db()
 
 
 def allowed_file(filename):
@@ -166,6 +173,13 @@ def uploaded_file(filename):
         return redirect(url_for('index')) # Or render a 404 page
 
 
+def create_app():
+    """Application factory for the pre-forking launcher (serve.py); reconnects in a forked worker."""
+    if _db_pid != os.getpid():
+        init_db()
+    return app
+
+
 if __name__ == '__main__':
     # --- THIS IS THE CORRECTED LINE ---
     if client is not None and tasks_collection is not None and tasks_collection.count_documents({}) == 0:
@@ -0,0 +1,217 @@
+# admin_queries.py
+# Read-side queries over onboarding_forms for HR reviewers.
+#
+# Listings are keyset-paginated on (submitted_at, _id), newest first: the opaque
+# cursor carries the last row's sort key, so page N costs the same as page 1
+# instead of skipping N * limit documents.
+#
+# Every single filter has an index in ADMIN_INDEXES that starts with its field and
+# ends with the sort key (equality-sort order), so a page filtered on one field is a
+# bounded index range scan with no in-memory sort. Two combinations also have their
+# own index: lastName + firstName, and degree + branch. Any other combination still
+# avoids the in-memory sort, but uses only one of its fields' indexes: the remaining
+# filters are checked on the fetched documents, so a page scans every row matching
+# that field (newest first) until it has found limit + 1 matches.
+#
+# Name and email matching is case-insensitive through a collation (English,
+# strength 2) shared by the indexes and the queries; MongoDB only uses an index
+# for string comparisons when the collations match.
+
+import json
+import base64
+import binascii
+from datetime import datetime
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ASCENDING, DESCENDING
+from pymongo.collation import Collation
+from pymongo.operations import IndexModel
+
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 200
+
+ADMIN_COLLATION = Collation(locale='en', strength=2) # Case-insensitive, accent-sensitive
+INDEX_PREFIX = 'admin_'
+SORT_KEY = [('submitted_at', DESCENDING), ('_id', DESCENDING)]
+
+# name -> leading equality keys; each index ends with the sort key.
+ADMIN_INDEXES = {
+    'admin_submitted': [],
+    'admin_email': [('personalEmail', ASCENDING)],
+    'admin_first_name': [('firstName', ASCENDING)],
+    'admin_last_name': [('lastName', ASCENDING)],
+    'admin_last_first_name': [('lastName', ASCENDING), ('firstName', ASCENDING)],
+    'admin_date_of_birth': [('dateOfBirth', ASCENDING)],
+    'admin_has_experience': [('hasExperience', ASCENDING)],
+    'admin_grad_degree': [('education.grad.degree', ASCENDING)],
+    'admin_grad_branch': [('education.grad.branch', ASCENDING)],
+    'admin_grad_degree_branch': [('education.grad.degree', ASCENDING), ('education.grad.branch', ASCENDING)],
+    'admin_grad_college': [('education.grad.college', ASCENDING)],
+}
+
+# --- Filters: query parameter -> (document field, type) ---
+STRING = 'string'
+DATE = 'date'
+BOOL = 'bool'
+FILTERS = {
+    'firstName': ('firstName', STRING),
+    'lastName': ('lastName', STRING),
+    'email': ('personalEmail', STRING),
+    'dateOfBirth': ('dateOfBirth', DATE),
+    'hasExperience': ('hasExperience', BOOL),
+    'degree': ('education.grad.degree', STRING),
+    'branch': ('education.grad.branch', STRING),
+    'college': ('education.grad.college', STRING),
+}
+
+# --- Projections: list views never load experience/insurance arrays or bank details ---
+LIST_FIELDS = ('firstName', 'lastName', 'personalEmail', 'phone', 'dateOfBirth',
+               'hasExperience', 'education', 'submitted_at')
+SELECTABLE_FIELDS = frozenset(LIST_FIELDS) | {
+    'gender', 'maritalStatus', 'nationality', 'alternatePhone',
+    'permanentCity', 'permanentState', 'permanentCountry',
+    'currentCity', 'currentState', 'currentCountry', 'signatureDate',
+    'hasInsurance', 'sameAsPermanent', 'agreeTerms', 'agreePrivacy',
+}
+
+
+class AdminQueryError(ValueError):
+    """Invalid listing parameters; answered with 400."""
+
+
+def ensure_indexes(collection, drop_stale=False):
+    """
+    Creates the compound indexes backing the admin listing (no-op for existing ones).
+    With drop_stale, also removes 'admin_*' indexes that are no longer in ADMIN_INDEXES.
+    Returns (created_or_kept, dropped) index names.
+    """
+    models = [IndexModel(keys + SORT_KEY, name=name, collation=ADMIN_COLLATION)
+              for name, keys in ADMIN_INDEXES.items()]
+    names = collection.create_indexes(models)
+    dropped = []
+    if drop_stale:
+        for name in collection.index_information():
+            if name.startswith(INDEX_PREFIX) and name not in ADMIN_INDEXES:
+                collection.drop_index(name)
+                dropped.append(name)
+    return names, dropped
+
+
+# --- Cursor encoding ---
+def encode_cursor(document):
+    """Opaque continuation token for the page after 'document'."""
+    raw = json.dumps([document['submitted_at'].isoformat(), str(document['_id'])], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    """Returns (submitted_at, _id) from a token made by encode_cursor()."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        submitted_at, object_id = json.loads(raw)
+        return datetime.fromisoformat(submitted_at), ObjectId(object_id)
+    except (binascii.Error, ValueError, TypeError, InvalidId):
+        raise AdminQueryError("Invalid 'cursor'.")
+
+
+# --- Query building ---
+def _parse_value(name, value, kind):
+    if kind == DATE:
+        try:
+            return datetime.strptime(value, '%Y-%m-%d')
+        except ValueError:
+            raise AdminQueryError(f"'{name}' must be a date in YYYY-MM-DD format.")
+    if kind == BOOL:
+        lowered = value.lower()
+        if lowered in ('1', 'true', 'yes'):
+            return True
+        if lowered in ('0', 'false', 'no'):
+            return False
+        raise AdminQueryError(f"'{name}' must be true or false.")
+    value = value.strip()
+    if not value:
+        raise AdminQueryError(f"'{name}' must not be empty.")
+    return value
+
+
+def build_filter(args):
+    """Translates query parameters into a MongoDB filter (without the cursor bound)."""
+    query = {}
+    for name, (field, kind) in FILTERS.items():
+        value = args.get(name)
+        if value is not None:
+            query[field] = _parse_value(name, value, kind)
+    return query
+
+
+def build_projection(fields_param):
+    """Projection for a comma-separated 'fields' parameter; defaults to LIST_FIELDS."""
+    if not fields_param:
+        fields = LIST_FIELDS
+    else:
+        fields = [f.strip() for f in fields_param.split(',') if f.strip()]
+        unknown = sorted(set(fields) - SELECTABLE_FIELDS)
+        if unknown:
+            raise AdminQueryError(f"Unknown or non-listable field(s): {', '.join(unknown)}.")
+    projection = {field: 1 for field in fields}
+    projection['submitted_at'] = 1 # Needed for the next cursor
+    return projection
+
+
+def parse_page_size(value):
+    if value is None:
+        return DEFAULT_PAGE_SIZE
+    try:
+        limit = int(value)
+    except ValueError:
+        raise AdminQueryError("'limit' must be an integer.")
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise AdminQueryError(f"'limit' must be between 1 and {MAX_PAGE_SIZE}.")
+    return limit
+
+
+def after_cursor(query, token):
+    """Adds the keyset bound for rows strictly after the cursor position."""
+    submitted_at, object_id = decode_cursor(token)
+    bounded = dict(query)
+    # The plain $lte gives the planner tight index bounds; the $or breaks ties on _id.
+    bounded['submitted_at'] = {'$lte': submitted_at}
+    bounded['$or'] = [
+        {'submitted_at': {'$lt': submitted_at}},
+        {'submitted_at': submitted_at, '_id': {'$lt': object_id}},
+    ]
+    return bounded
+
+
+def find_page(collection, args):
+    """
+    Runs one listing page for the request arguments.
+    Returns (documents, next_cursor); next_cursor is None on the last page.
+    """
+    limit = parse_page_size(args.get('limit'))
+    query = build_filter(args)
+    if args.get('cursor'):
+        query = after_cursor(query, args['cursor'])
+    projection = build_projection(args.get('fields'))
+
+    # Fetch one extra row to learn whether another page exists without a count.
+    documents = list(collection.find(query, projection, collation=ADMIN_COLLATION)
+                     .sort(SORT_KEY).limit(limit + 1))
+    next_cursor = None
+    if len(documents) > limit:
+        documents = documents[:limit]
+        next_cursor = encode_cursor(documents[-1])
+    return documents, next_cursor
+
+
+def to_json(value):
+    """Converts ObjectIds and datetimes in a document to JSON-friendly strings."""
+    if isinstance(value, dict):
+        return {k: to_json(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [to_json(v) for v in value]
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
@@ -1,25 +1,41 @@
 # app.py
 
 import os
-import uuid
 import re
+import atexit
+import hmac
+import threading
 from flask import (
     Flask, request, render_template, redirect, url_for, jsonify, current_app, flash
 )
 from pymongo import MongoClient
 from pymongo.errors import ConnectionFailure, ConfigurationError, OperationFailure
 from dotenv import load_dotenv
+import click
 from werkzeug.utils import secure_filename
 from werkzeug.datastructures import CombinedMultiDict # Useful for combining form and files if needed, though handled separately here
-from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-import traceback # For detailed error logging
+from bson import ObjectId
+from bson.errors import InvalidId
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # Shared modules at the repo root
+from applog import setup_logging, PII
+from upload_store import ContentAddressedStore, add_references, verify_store
+from form_schema import ONBOARDING_FORM_SCHEMA, FILE_SIGNATURES, FileSlot, compile_form_schema, split_key
+from chunked_uploads import ChunkedUploadManager, ChunkedUploadError
+from submission_queue import SubmissionQueue
+import admin_queries
+from admin_queries import AdminQueryError
 
 # --- Load Environment Variables ---
 load_dotenv()
 
 # --- Flask App Initialization ---
 app = Flask(__name__)
+# Request-path logging goes through the shared queued logger (see applog.py, LOG_* env vars);
+# startup banners below stay on stdout.
+logger = setup_logging('amp_onboarding')
 
 # --- Configuration Loading ---
 # Load configuration from environment variables
@@ -27,6 +43,15 @@ app.config['SECRET_KEY'] = os.getenv('FLASK_SECRET_KEY')
 app.config['UPLOAD_FOLDER'] = os.getenv('FLASK_UPLOAD_FOLDER', 'uploads') # Default to 'uploads'
 app.config['MAX_CONTENT_LENGTH'] = int(os.getenv('FLASK_MAX_CONTENT_LENGTH', 30 * 1024 * 1024)) # Default 30MB
 app.config['MONGODB_URI'] = os.getenv('MONGODB_URI')
+app.config['MAX_FILE_SIZE'] = int(os.getenv('FLASK_MAX_FILE_SIZE', 10 * 1024 * 1024)) # Per-file cap, default 10MB
+app.config['UPLOAD_WORKERS'] = int(os.getenv('FLASK_UPLOAD_WORKERS', 8)) # Threads writing uploads to disk
+# Asynchronous submissions: journal locally, answer 202, write to MongoDB in batches
+app.config['ASYNC_SUBMIT'] = os.getenv('ONBOARDING_ASYNC_SUBMIT', '0').lower() in ['1', 'true', 'yes']
+app.config['SUBMISSION_JOURNAL_PATH'] = os.getenv('SUBMISSION_JOURNAL_PATH', 'submissions_journal.db')
+app.config['SUBMISSION_BATCH_SIZE'] = int(os.getenv('SUBMISSION_BATCH_SIZE', 100))
+app.config['SUBMISSION_FLUSH_INTERVAL'] = float(os.getenv('SUBMISSION_FLUSH_INTERVAL', 1.0)) # Seconds
+# Bearer token for the HR admin API under /admin; the API is disabled while unset
+app.config['ADMIN_API_TOKEN'] = os.getenv('ADMIN_API_TOKEN')
 
 # --- Validate Essential Configuration ---
 # Ensure critical settings are present, exit if not.
@@ -45,10 +70,9 @@ if not app.config['MONGODB_URI']:
     exit(1)
 
 
-# --- Allowed file extensions (adjust as needed) ---
-ALLOWED_EXTENSIONS_DOCS = {'pdf', 'docx'}
-ALLOWED_EXTENSIONS_IMAGES = {'png', 'jpg', 'jpeg', 'pdf'} # PDF often needed for image-like docs
-ALLOWED_EXTENSIONS_SIGNED = {'png', 'jpg', 'jpeg', 'pdf'}
+# --- Form Schema ---
+# Compiled once at startup; see form_schema.py for fields, types and allowed extensions.
+form_parser = compile_form_schema(ONBOARDING_FORM_SCHEMA)
 
 # --- Define upload subdirectories ---
 UPLOAD_SUBFOLDERS = {
@@ -66,6 +90,11 @@ try:
     os.makedirs(base_upload_folder, exist_ok=True)
     for subfolder in UPLOAD_SUBFOLDERS.values():
         os.makedirs(os.path.join(base_upload_folder, subfolder), exist_ok=True)
+    # Content-addressed blob store; new uploads are deduplicated by SHA-256.
+    # The per-category subfolders above only hold files from before the store existed.
+    upload_store = ContentAddressedStore(base_upload_folder)
+    # Resumable uploads land in the same store once finalized.
+    chunked_uploads = ChunkedUploadManager(upload_store, app.config['MAX_FILE_SIZE'])
     print(f"Upload directories checked/created under '{os.path.abspath(base_upload_folder)}'.")
 except OSError as e:
     print("\n" + "="*60)
@@ -76,49 +105,183 @@ except OSError as e:
 
 
 # --- Database Setup Context ---
-# Uses Flask's application context for better connection management.
-def get_db():
+# One pooled MongoClient per worker process, kept alive for the life of the process.
+# A background monitor pings the server periodically instead of on every request,
+# and rebuilds the client if the server stays unreachable.
+app.config['MONGODB_MAX_POOL_SIZE'] = int(os.getenv('MONGODB_MAX_POOL_SIZE', 50))
+app.config['MONGODB_MIN_POOL_SIZE'] = int(os.getenv('MONGODB_MIN_POOL_SIZE', 0))
+app.config['MONGODB_HEALTH_INTERVAL'] = float(os.getenv('MONGODB_HEALTH_INTERVAL', 10)) # Seconds between pings
+
+
+class MongoConnectionManager:
     """
-    Connects to the specific database using application context.
-    Handles initial connection and checks validity.
-    Raises RuntimeError if connection fails.
+    Process-wide MongoDB connection manager.
+    Holds a single pooled client per process (re-created after fork) and runs a
+    daemon thread that checks server health so request handlers never ping.
     """
-    # Check if client is already stored in the app context extension storage
-    if 'mongodb_client' not in app.extensions:
-        mongo_uri = current_app.config['MONGODB_URI']
-        masked_uri = re.sub(r':([^/]+)@', r':<password>@', mongo_uri) # Mask password for logging
-        print(f"Attempting to connect to MongoDB at: {masked_uri}")
+
+    def __init__(self, uri, max_pool_size=50, min_pool_size=0, health_interval=10.0):
+        self.uri = uri
+        self.max_pool_size = max_pool_size
+        self.min_pool_size = min_pool_size
+        self.health_interval = health_interval
+        self._lock = threading.Lock()
+        self._client = None
+        self._db_name = None
+        self._pid = None
+        self._healthy = False
+        self._last_error = None
+        self._monitor = None
+        self._stop_event = threading.Event()
+
+    def _connect(self):
+        """Creates a new client and verifies connectivity. Caller must hold the lock."""
+        masked_uri = re.sub(r':([^/]+)@', r':<password>@', self.uri) # Mask password for logging
+        print(f"Attempting to connect to MongoDB at: {masked_uri} (pool {self.min_pool_size}-{self.max_pool_size})")
+        client = MongoClient(
+            self.uri,
+            serverSelectionTimeoutMS=5000,
+            maxPoolSize=self.max_pool_size,
+            minPoolSize=self.min_pool_size,
+            retryWrites=True,
+            retryReads=True,
+        )
         try:
-            # Set a reasonable timeout for server selection
-            client = MongoClient(mongo_uri, serverSelectionTimeoutMS=5000)
             # The ismaster command is cheap and does not require auth. Verifies connectivity.
             client.admin.command('ismaster')
-            print("MongoDB connection successful!")
-            app.extensions['mongodb_client'] = client
-            # Determine the database name to use
-            db_name_from_uri = client.get_database().name # Get default db name from URI if present
-            # Use 'employee_db' if URI doesn't specify one or specifies 'test'
-            app.extensions['mongodb_db_name'] = db_name_from_uri if db_name_from_uri and db_name_from_uri != 'test' else 'employee_db'
-            print(f"Using database: '{app.extensions['mongodb_db_name']}'")
-        except (ConnectionFailure, ConfigurationError) as e:
-            print(f"FATAL ERROR: Could not connect to MongoDB: {e}")
-            traceback.print_exc()
-            # Reraise as RuntimeError to indicate critical failure during startup/context creation
-            raise RuntimeError(f"Failed to connect to MongoDB: {e}") from e
-
-    # If client exists in context, ensure it's still alive before returning db handle
-    try:
-        client = app.extensions['mongodb_client']
-        client.admin.command('ping') # Quick check if connection is alive
-        db_name = app.extensions['mongodb_db_name']
-        return client[db_name]
-    except (ConnectionFailure, AttributeError) as e: # AttributeError if extensions were somehow cleared
-        print(f"ERROR: MongoDB connection check failed or context lost: {e}")
-        # Clear potentially stale context entries
-        app.extensions.pop('mongodb_client', None)
-        app.extensions.pop('mongodb_db_name', None)
-        # Reraise to signal the issue to the calling route
-        raise RuntimeError(f"MongoDB connection lost or unavailable: {e}") from e
+        except Exception:
+            client.close()
+            raise
+        db_name_from_uri = client.get_default_database(default=None)
+        db_name_from_uri = db_name_from_uri.name if db_name_from_uri is not None else None
+        # Use 'employee_db' if URI doesn't specify one or specifies 'test'
+        self._db_name = db_name_from_uri if db_name_from_uri and db_name_from_uri != 'test' else 'employee_db'
+        self._client = client
+        self._pid = os.getpid()
+        self._healthy = True
+        self._last_error = None
+        print(f"MongoDB connection successful! Using database: '{self._db_name}'")
+
+    def _reset(self):
+        """Drops the current client. Caller must hold the lock."""
+        if self._client is not None:
+            try:
+                self._client.close()
+            except Exception:
+                pass
+        self._client = None
+        self._healthy = False
+
+    def _ensure_monitor(self):
+        """Starts the health monitor thread for this process if it is not running."""
+        if self.health_interval <= 0:
+            return
+        if self._monitor is not None and self._monitor.is_alive():
+            return
+        self._stop_event.clear()
+        self._monitor = threading.Thread(target=self._monitor_loop, name='mongo-health-monitor', daemon=True)
+        self._monitor.start()
+
+    def _monitor_loop(self):
+        while not self._stop_event.wait(self.health_interval):
+            with self._lock:
+                client = self._client
+            try:
+                if client is None:
+                    with self._lock:
+                        if self._client is None:
+                            self._connect()
+                else:
+                    client.admin.command('ping')
+                    self._healthy = True
+            except (ConnectionFailure, ConfigurationError, OperationFailure) as e:
+                if self._healthy:
+                    logger.warning("MongoDB health check failed, will reconnect: %s", e)
+                self._last_error = e
+                with self._lock:
+                    if self._client is client:
+                        self._reset()
+            except Exception as e:
+                logger.error("Unexpected failure in MongoDB health monitor: %s", e)
+                self._last_error = e
+
+    def get_database(self):
+        """
+        Returns the database handle, connecting (or reconnecting) if needed.
+        Raises RuntimeError if the server cannot be reached.
+        """
+        client = self._client
+        if client is not None and self._pid == os.getpid() and self._healthy:
+            return client[self._db_name]
+
+        with self._lock:
+            if self._pid is not None and self._pid != os.getpid():
+                # Inherited from the parent across fork(); sockets are not shareable.
+                self._client = None
+                self._monitor = None
+                self._healthy = False
+            if self._client is None:
+                try:
+                    self._connect()
+                except (ConnectionFailure, ConfigurationError, OperationFailure) as e:
+                    self._last_error = e
+                    logger.error("Could not connect to MongoDB: %s", e)
+                    raise RuntimeError(f"Failed to connect to MongoDB: {e}") from e
+            elif not self._healthy:
+                raise RuntimeError(f"MongoDB connection unavailable: {self._last_error}")
+            self._ensure_monitor()
+            return self._client[self._db_name]
+
+    def close(self):
+        """Stops the monitor and closes the client (used on process shutdown)."""
+        self._stop_event.set()
+        with self._lock:
+            self._reset()
+            self._pid = None
+
+
+mongo_manager = MongoConnectionManager(
+    app.config['MONGODB_URI'],
+    max_pool_size=app.config['MONGODB_MAX_POOL_SIZE'],
+    min_pool_size=app.config['MONGODB_MIN_POOL_SIZE'],
+    health_interval=app.config['MONGODB_HEALTH_INTERVAL'],
+)
+app.extensions['mongo_manager'] = mongo_manager
+atexit.register(mongo_manager.close)
+
+
+def get_db():
+    """
+    Returns the onboarding database handle from the process-wide pooled client.
+    Raises RuntimeError if MongoDB is unreachable.
+    """
+    return mongo_manager.get_database()
+
+
+# --- Write-Behind Submission Queue ---
+def _record_stored_references(documents):
+    """Bumps upload reference counts for submissions written by the flusher."""
+    blob_collection = get_db().upload_blobs
+    for document in documents:
+        add_references(blob_collection, document.get('uploadManifest'))
+
+submission_queue = None
+if app.config['ASYNC_SUBMIT']:
+    submission_queue = SubmissionQueue(
+        app.config['SUBMISSION_JOURNAL_PATH'],
+        lambda: get_db().onboarding_forms,
+        batch_size=app.config['SUBMISSION_BATCH_SIZE'],
+        flush_interval=app.config['SUBMISSION_FLUSH_INTERVAL'],
+        on_stored=_record_stored_references,
+    )
+    submission_queue.start() # Drain anything left in the journal by a previous run
+    atexit.register(submission_queue.stop)
+
+    @app.before_request
+    def ensure_submission_flusher():
+        """Starts the flusher in pre-forked workers (threads don't survive fork)."""
+        submission_queue.start()
+    print(f"Asynchronous submissions enabled (journal: '{os.path.abspath(app.config['SUBMISSION_JOURNAL_PATH'])}').")
 
 
 # --- Helper Functions ---
@@ -127,182 +290,272 @@ def allowed_file(filename, allowed_extensions):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in allowed_extensions
 
-def save_file(file_storage, subfolder_key, field_name):
+# --- Upload Worker Pool ---
+# Bounded pool shared by all requests in this process; created lazily so that
+# pre-forked workers each get their own threads.
+_upload_executor = None
+_upload_executor_pid = None
+_upload_executor_lock = threading.Lock()
+
+def get_upload_executor():
+    """Returns this process's upload thread pool, creating it on first use."""
+    global _upload_executor, _upload_executor_pid
+    if _upload_executor is None or _upload_executor_pid != os.getpid():
+        with _upload_executor_lock:
+            if _upload_executor is None or _upload_executor_pid != os.getpid():
+                _upload_executor = ThreadPoolExecutor(
+                    max_workers=app.config['UPLOAD_WORKERS'], thread_name_prefix='upload-writer')
+                _upload_executor_pid = os.getpid()
+    return _upload_executor
+
+def file_size_cap(file_field, max_size):
+    """Effective byte limit for a file input: its own cap, never above the global one."""
+    return min(file_field.max_size or max_size, max_size)
+
+def signature_error(extension, header):
+    """Error message if the leading bytes don't match the extension's magic bytes, else None."""
+    signatures = FILE_SIGNATURES.get(extension)
+    if signatures and not header.startswith(signatures):
+        return f"file content does not look like a .{extension} file"
+    return None
+
+def inspect_upload(file_storage, file_field, max_size):
     """
-    Saves an uploaded FileStorage object securely.
-    Determines allowed extensions based on subfolder_key/field_name.
-    Returns the relative path upon success, None otherwise.
+    Phase 1 check of one uploaded file, done before anything is written:
+    extension, size cap (per field and global) and leading magic bytes.
+    Returns an error message, or None if the file is acceptable.
     """
-    # Determine subfolder and allowed extensions based on context
-    subfolder = UPLOAD_SUBFOLDERS.get(subfolder_key, UPLOAD_SUBFOLDERS['documents']) # Default to documents
-
-    # Determine allowed extensions based on the field name or subfolder context
-    allowed_extensions = ALLOWED_EXTENSIONS_IMAGES # Default is broader now
-    if subfolder_key == 'education':
-         allowed_extensions = ALLOWED_EXTENSIONS_IMAGES
-    elif subfolder_key == 'experience':
-        if field_name == 'certificate': allowed_extensions = ALLOWED_EXTENSIONS_IMAGES
-        elif field_name == 'salarySlips': allowed_extensions = ALLOWED_EXTENSIONS_IMAGES
-    elif subfolder_key == 'insurance':
-         allowed_extensions = ALLOWED_EXTENSIONS_IMAGES
-    elif subfolder_key == 'signed_docs': # For signedDocument (key will be 'signedDocument')
-         allowed_extensions = ALLOWED_EXTENSIONS_SIGNED
-    elif subfolder_key == 'documents': # Top level docs like idProof, resume
-        if field_name == 'idProof': allowed_extensions = ALLOWED_EXTENSIONS_IMAGES
-        elif field_name == 'resume': allowed_extensions = ALLOWED_EXTENSIONS_DOCS
-
-    # Check if the file is valid and allowed
-    if file_storage and file_storage.filename and allowed_file(file_storage.filename, allowed_extensions):
-        original_filename = secure_filename(file_storage.filename)
-        # Generate unique filename using UUID
-        unique_filename = f"{uuid.uuid4().hex}_{original_filename}"
-        upload_dir = os.path.join(current_app.config['UPLOAD_FOLDER'], subfolder)
-        file_path = os.path.join(upload_dir, unique_filename)
-        try:
-            file_storage.save(file_path)
-            # Return relative path using forward slashes
-            relative_path = os.path.join(subfolder, unique_filename).replace("\\", "/")
-            print(f"Successfully saved file: {relative_path} (Original: {original_filename}, Field: {field_name})")
-            return relative_path
-        except Exception as e:
-            print(f"ERROR saving file '{original_filename}' to '{file_path}': {e}")
-            traceback.print_exc()
-            return None # Indicate save failure
-    elif file_storage and file_storage.filename:
-        # Log disallowed file type attempt
-        print(f"File type not allowed for '{file_storage.filename}' (Field: {field_name}). Allowed: {allowed_extensions}")
-        return None # Indicate failure due to type
-    else:
-        # No file provided or empty filename
-        return None
-
-def parse_nested_form_data(form_dict, files_dict):
+    filename = file_storage.filename
+    if not allowed_file(filename, file_field.allowed_extensions):
+        return f"file type not allowed (allowed: {', '.join(sorted(file_field.allowed_extensions))})"
+
+    stream = file_storage.stream
+    stream.seek(0, os.SEEK_END)
+    size = stream.tell()
+    stream.seek(0)
+    cap = file_size_cap(file_field, max_size)
+    if size == 0:
+        return "file is empty"
+    if size > cap:
+        return f"file is larger than {cap // (1024 * 1024)}MB"
+
+    extension = filename.rsplit('.', 1)[1].lower()
+    header = stream.read(16)
+    stream.seek(0)
+    return signature_error(extension, header)
+
+def inspect_chunked_upload(session, file_field, max_size):
     """
-    Parses form data with bracket notation (e.g., experience[0][company])
-    into nested Python dictionaries and handles associated file uploads.
+    The same checks as inspect_upload() for a finalized chunked upload: size cap of
+    its field and the magic bytes of the stored blob. Returns an error message or None.
+    """
+    if not allowed_file(session['filename'], file_field.allowed_extensions):
+        return f"file type not allowed (allowed: {', '.join(sorted(file_field.allowed_extensions))})"
+    cap = file_size_cap(file_field, max_size)
+    if session['blob']['size'] > cap:
+        return f"file is larger than {cap // (1024 * 1024)}MB"
+    try:
+        with open(upload_store.absolute_path(session['blob']['sha256']), 'rb') as f:
+            header = f.read(16)
+    except FileNotFoundError:
+        return "uploaded file is no longer available; please upload it again"
+    return signature_error(session['filename'].rsplit('.', 1)[1].lower(), header)
 
-    Args:
-        form_dict (ImmutableMultiDict): request.form data.
-        files_dict (ImmutableMultiDict): request.files data.
+def validate_uploads(form_dict, files_dict):
+    """
+    Phase 1 of a submission: builds the request's file manifest (direct uploads
+    plus finalized chunked uploads) and validates it without touching the disk.
 
     Returns:
-        dict: A dictionary containing the structured form data and file paths.
+        tuple: (slots, chunked_by_key, problems) where slots are the schema-resolved
+               FileSlots to stage, chunked_by_key maps field keys to finalized
+               chunked-upload sessions, and problems lists human-readable reasons
+               the submission must be rejected (missing required or invalid files).
     """
-    parsed_data = defaultdict(lambda: defaultdict(dict)) # For dict structures like education[ssc][field]
-    parsed_lists = defaultdict(list)                     # For list structures like experience[0][field]
-    single_files = {}                                    # For top-level files like idProof
-    other_data = {}                                      # For simple top-level fields
-
-    # Regex to robustly capture section, index/key (optional), and field (optional)
-    pattern = re.compile(r"^(\w+)(?:\[(.*?)\])?(?:\[(.*?)\])?$")
-
-    # --- Process Text/Select/Radio/etc. Form Fields ---
-    for key, value in form_dict.items():
-        match = pattern.match(key)
-        if not match:
-            other_data[key] = value
-            continue
-
-        section, index_or_key, field = match.groups()
-
-        if index_or_key is None and field is None: # Simple field: 'firstName'
-             other_data[section] = value
-        elif field is None: # Dict key only: 'education[ssc]' (unlikely structure for this form)
-             parsed_data[section][index_or_key] = value
-        elif index_or_key.isdigit(): # List item: 'experience[0][company]'
-            index = int(index_or_key)
-            while len(parsed_lists[section]) <= index: parsed_lists[section].append({})
-            parsed_lists[section][index][field] = value
-        else: # Dictionary item: 'education[ssc][school]'
-            parsed_data[section][index_or_key][field] = value
-
-    # --- Process File Uploads ---
-    processed_file_keys = set()
+    max_size = current_app.config['MAX_FILE_SIZE']
+    problems = []
+    valid_slots = []
+    for slot in form_parser.plan_files(files_dict):
+        good_files = []
+        for file_storage in slot.file_list:
+            error = inspect_upload(file_storage, slot.spec, max_size)
+            if error:
+                problems.append(f"{slot.key} ('{file_storage.filename}'): {error}")
+            else:
+                good_files.append(file_storage)
+        if good_files:
+            valid_slots.append(slot._replace(file_list=good_files))
 
-    for key in files_dict:
-        if key in processed_file_keys:
+    chunked_by_key = {}
+    for upload_id in form_dict.getlist('uploadIds'):
+        try:
+            session = chunked_uploads.completed(upload_id)
+        except ChunkedUploadError as e:
+            problems.append(f"upload {upload_id}: {e}")
             continue
-
-        file_list = files_dict.getlist(key)
-        if not file_list or all(not f or not f.filename for f in file_list): # Check if FileStorage exists and has filename
+        resolved = form_parser.resolve_file_key(session['fieldName'])
+        if resolved is None:
             continue
-
-        match = pattern.match(key)
-        if not match:
-            print(f"Warning: Key '{key}' did not match expected file pattern. Skipping.")
-            processed_file_keys.add(key)
+        error = inspect_chunked_upload(session, resolved[3], max_size)
+        if error:
+            problems.append(f"{session['fieldName']} ('{session['filename']}'): {error}")
             continue
+        chunked_by_key.setdefault(session['fieldName'], []).append(session)
+
+    present = {slot.key for slot in valid_slots} | set(chunked_by_key)
+    problems.extend(find_missing_required_files(form_dict, files_dict, present))
+    return valid_slots, chunked_by_key, problems
+
+def _list_indices(section, *key_sources):
+    """Sorted item indices used by a list section (e.g. experience[2][...]) across the given keys."""
+    prefix = section + '['
+    indices = set()
+    for keys in key_sources:
+        for key in keys:
+            if key.startswith(prefix):
+                parts = split_key(key)
+                if parts and parts[1] and parts[1].isdigit():
+                    indices.add(int(parts[1]))
+    return sorted(indices)
+
+def find_missing_required_files(form_data, files_dict, present):
+    """Names of required documents whose file input is absent from 'present' (a set of field keys)."""
+    required_file_keys = ['idProof', 'resume', 'signedDocument']
+    missing_required_files = [rfk for rfk in required_file_keys if rfk not in present]
+
+    # Check nested required files based on conditional checkboxes
+    # Use form_data to check if the section *should* have been submitted
+    if 'education[ssc][school]' in form_data and 'education[ssc][certificate]' not in present:
+        missing_required_files.append('Education Certificate (SSC)')
+    if 'education[inter][college]' in form_data and 'education[inter][certificate]' not in present:
+        missing_required_files.append('Education Certificate (Inter/Diploma)')
+    if 'education[grad][college]' in form_data and 'education[grad][certificate]' not in present:
+        missing_required_files.append('Education Certificate (Graduation)')
+
+    # Check additional education based on entries present in the request (means it was added via JS)
+    for i, index in enumerate(_list_indices('additionalEducation', form_data.keys(), files_dict.keys())):
+        if f'additionalEducation[{index}][certificate]' not in present:
+            missing_required_files.append(f'Additional Education Certificate {i+1}')
+
+    # Check experience certs ONLY IF hasExperience checkbox was checked
+    if 'hasExperience' in form_data:
+        for i, index in enumerate(_list_indices('experience', form_data.keys(), files_dict.keys())):
+            if f'experience[{index}][certificate]' not in present:
+                missing_required_files.append(f'Experience Certificate {i+1}')
+
+    # Check insurance docs ONLY IF hasInsurance checkbox was checked
+    if 'hasInsurance' in form_data:
+        for i, index in enumerate(_list_indices('insurance', form_data.keys(), files_dict.keys())):
+            if f'insurance[{index}][document]' not in present:
+                missing_required_files.append(f'Insurance Document {i+1}')
+
+    return [f"Missing required file: {name}" for name in sorted(set(missing_required_files))]
+
+def stage_file(file_storage, file_field, field_name, max_size):
+    """
+    Phase 2 for one validated file: hashes it and, if the content is new, writes
+    it to a temp file in the upload store. Nothing becomes visible until
+    commit_staged_files(). Safe to call from worker threads.
+    Returns (manifest entry dict, staged handle).
+    """
+    original_filename = secure_filename(file_storage.filename)
+    staged = upload_store.stage(file_storage.stream, max_size)
+    logger.debug("Staged file: %s (Original: %s, Field: %s, %d bytes, %s)", staged['path'], original_filename,
+                 field_name, staged['size'], 'new' if staged['created'] else 'deduplicated')
+    entry = {
+        'path': staged['path'],
+        'sha256': staged['sha256'],
+        'size': staged['size'],
+        'category': UPLOAD_SUBFOLDERS.get(file_field.subfolder, UPLOAD_SUBFOLDERS['documents']),
+        'originalName': original_filename,
+        'contentType': file_storage.mimetype,
+    }
+    return entry, staged
+
+def commit_staged_files(staged_files):
+    """Makes staged files visible (atomic renames) once the submission is durably recorded."""
+    for staged in staged_files:
+        upload_store.commit(staged)
+
+def discard_staged_files(staged_files):
+    """Rolls back a submission's staged files."""
+    for staged in staged_files:
+        upload_store.discard(staged)
+    if staged_files:
+        logger.info("Rolled back %d staged file(s).", len(staged_files))
+
+def parse_nested_form_data(form_dict, file_slots, chunked_by_key):
+    """
+    Parses form data with bracket notation (e.g., experience[0][company])
+    into nested Python dictionaries and stages the associated file uploads.
+    Dates and checkboxes are converted by the compiled form schema in the same pass.
 
-        section, index_or_key, field = match.groups()
-
-        # ******** Correctly handle top-level vs nested files ********
-        is_top_level_file = (index_or_key is None and field is None)
-
-        if is_top_level_file:
-            # Handle top-level files (e.g., 'idProof', 'resume', 'signedDocument')
-            if len(file_list) > 1:
-                print(f"Warning: Multiple files received for top-level field '{key}'. Using only the first.")
-            file_storage = file_list[0]
-            if file_storage and file_storage.filename:
-                # 'section' variable holds the field name (key) here
-                field_name = section
-                # Determine subfolder based on the field name
-                subfolder_key = 'documents' # Default
-                if field_name == 'signedDocument': subfolder_key = 'signed_docs'
-                # Use save_file to determine allowed types and save
-                file_path = save_file(file_storage, subfolder_key, field_name)
-                if file_path:
-                    single_files[key] = file_path # Store using the original key
-            processed_file_keys.add(key)
-
-        # --- Process Nested Files ---
-        elif field is None: # Files must have a field name within brackets
-            print(f"Warning: File received for key '{key}' without required field specifier in brackets. Skipping.")
-            processed_file_keys.add(key)
-        else: # This is a nested file (index_or_key and field are present)
-            subfolder_key = section # Base subfolder on the section name
-            field_name = field      # Use field name for context in save_file
-            is_multiple_expected = (section == 'experience' and field == 'salarySlips')
-
-            saved_paths = []
-            for file_storage in file_list:
-                if file_storage and file_storage.filename:
-                    file_path = save_file(file_storage, subfolder_key, field_name)
-                    if file_path:
-                        saved_paths.append(file_path)
-                    else:
-                        print(f"Warning: Failed to save one of the files for field '{key}'.") # Log failure for specific file
-
-            if not saved_paths:
-                # Log if no files were saved for a field that had uploads attempted
-                if any(f and f.filename for f in file_list): # Check if there were actual files attempted
-                     print(f"Warning: No files were successfully saved for field '{key}' (check allowed types/permissions).")
-                processed_file_keys.add(key)
-                continue # Skip adding this field if no files saved
-
-            value_to_store = saved_paths if is_multiple_expected else saved_paths[0]
-
-            if index_or_key.isdigit(): # List item: 'experience[0][certificate]'
-                index = int(index_or_key)
-                storage_target = parsed_lists[section]
-                while len(storage_target) <= index: storage_target.append({})
-                storage_target[index][field] = value_to_store
-            else: # Dictionary item: 'education[ssc][certificate]'
-                storage_target = parsed_data[section][index_or_key]
-                storage_target[field] = value_to_store # Always single file for education certs
-
-            processed_file_keys.add(key)
-        # ******** END FIX ********
+    Args:
+        form_dict (ImmutableMultiDict): request.form data.
+        file_slots (list): validated FileSlots from validate_uploads().
+        chunked_by_key (dict): finalized chunked uploads by field key, from validate_uploads().
+
+    Returns:
+        tuple: (submission, staged_files). The submission dict holds the structured
+               form data and file paths plus an 'uploadManifest' list describing every
+               file; staged_files must be committed or discarded by the caller.
+    """
+    other_data, dict_sections, list_sections = form_parser.parse_fields(form_dict)
+    other_data.pop('uploadIds', None)
+
+    # --- Stage File Uploads ---
+    # Queue every write on the upload pool, then collect the results in request order.
+    max_size = current_app.config['MAX_FILE_SIZE']
+    executor = get_upload_executor()
+    pending_uploads = [
+        (slot, [executor.submit(stage_file, f, slot.spec, slot.field or slot.key, max_size) for f in slot.file_list])
+        for slot in file_slots
+    ]
+
+    staged_files = []
+    first_error = None
+    saved_by_key = {} # key -> (slot, [manifest entries]), in request order
+    for slot, futures in pending_uploads:
+        saved_entries = []
+        for future in futures:
+            try:
+                entry, staged = future.result()
+            except Exception as e:
+                first_error = first_error or e
+                continue
+            staged_files.append(staged)
+            entry['field'] = slot.key
+            saved_entries.append(entry)
+        saved_by_key[slot.key] = (slot, saved_entries)
+    if first_error is not None:
+        discard_staged_files(staged_files) # Roll back everything staged for this request
+        raise first_error
+
+    # --- Files Sent Ahead Through the Chunked Upload API (already stored) ---
+    for key, sessions in chunked_by_key.items():
+        resolved = form_parser.resolve_file_key(key)
+        if key not in saved_by_key:
+            saved_by_key[key] = (FileSlot(key, *resolved, []), [])
+        for session in sessions:
+            saved_by_key[key][1].append(dict(
+                session['blob'], category=UPLOAD_SUBFOLDERS.get(resolved[3].subfolder, UPLOAD_SUBFOLDERS['documents']),
+                originalName=session['filename'],
+                field=key, uploadId=session['uploadId']))
+
+    upload_manifest = []
+    file_values = []
+    for slot, saved_entries in saved_by_key.values():
+        if not slot.spec.multiple:
+            saved_entries = saved_entries[:1]
+        upload_manifest.extend(saved_entries)
+        saved_paths = [entry['path'] for entry in saved_entries]
+        file_values.append((slot, saved_paths if slot.spec.multiple else saved_paths[0]))
 
     # --- Combine all parsed data into the final structure ---
-    final_submission = {**other_data}
-    for section, content in parsed_data.items():
-         final_submission[section] = {k: dict(v) for k, v in content.items()}
-    for section, content_list in parsed_lists.items():
-         final_submission[section] = [item for item in content_list if item]
-    final_submission.update(single_files)
+    final_submission = form_parser.assemble(other_data, dict_sections, list_sections, file_values)
+    final_submission['uploadManifest'] = upload_manifest # One entry per stored file (path, sha256, size)
 
-    return final_submission
+    return final_submission, staged_files
 
 
 # --- Routes ---
@@ -311,9 +564,8 @@ def index():
     """Displays the onboarding form."""
     try:
         get_db()
-        print("Index route: DB connection check successful.")
     except Exception as e:
-         print(f"ERROR rendering index: Failed to get DB connection: {e}")
+         logger.error("Rendering index: Failed to get DB connection: %s", e)
          flash(f"Error connecting to the database. Please contact the administrator. ({type(e).__name__})", "danger")
     return render_template('index.html')
 
@@ -321,165 +573,303 @@ def index():
 def submit_form():
     """Handles form submission, parsing, file saving, and database insertion."""
     try:
-        db = get_db()
-        onboarding_collection = db.onboarding_forms
+        # In asynchronous mode the journal absorbs MongoDB outages, so don't require a connection here.
+        if submission_queue is None:
+            db = get_db()
+            onboarding_collection = db.onboarding_forms
     except RuntimeError as e:
-         print(f"ERROR in /submit: Failed to get DB connection: {e}")
+         logger.error("/submit: Failed to get DB connection: %s", e)
          return jsonify({"success": False, "error": "Database connection failed. Please try again later or contact support."}), 500
     except Exception as e:
-        print(f"CRITICAL ERROR in /submit during DB init: {e}")
-        traceback.print_exc()
+        logger.critical("/submit during DB init: %s", e, exc_info=True)
         return jsonify({"success": False, "error": "A critical server error occurred [DB Init]. Please contact support."}), 500
 
 
     if request.method == 'POST':
+        claimed_uploads = [] # Chunked uploads this submission uses; given back if it fails
         try:
             form_data = request.form
             file_data = request.files
 
-            # --- Parse form data and save files ---
-            parsed_submission = parse_nested_form_data(form_data, file_data)
-
-            # --- Check if required files were successfully parsed and saved ---
-            required_file_keys = ['idProof', 'resume', 'signedDocument']
-            missing_required_files = [rfk for rfk in required_file_keys if rfk not in parsed_submission]
-
-            # Check nested required files based on conditional checkboxes
-            # Use form_data to check if the section *should* have been submitted
-            # Because parsed_submission might not have the key if *no* data was entered for that section
-            if 'education[ssc][school]' in form_data: # Check if SSC section was likely submitted
-                if not parsed_submission.get('education', {}).get('ssc', {}).get('certificate'):
-                    missing_required_files.append(f'Education Certificate (SSC)')
-            if 'education[inter][college]' in form_data: # Check if Inter section was likely submitted
-                if not parsed_submission.get('education', {}).get('inter', {}).get('certificate'):
-                    missing_required_files.append(f'Education Certificate (Inter/Diploma)')
-            if 'education[grad][college]' in form_data: # Check if Grad section was likely submitted
-                if not parsed_submission.get('education', {}).get('grad', {}).get('certificate'):
-                    missing_required_files.append(f'Education Certificate (Graduation)')
-
-            # Check additional education based on presence in parsed data (means it was added via JS)
-            if parsed_submission.get('additionalEducation'):
-                for i, add_edu in enumerate(parsed_submission['additionalEducation']):
-                    if not add_edu.get('certificate'):
-                        missing_required_files.append(f'Additional Education Certificate {i+1}')
-
-            # Check experience certs ONLY IF hasExperience checkbox was checked in the *original form data*
-            if 'hasExperience' in form_data and parsed_submission.get('experience'):
-                 for i, exp in enumerate(parsed_submission['experience']):
-                     if not exp.get('certificate'):
-                          missing_required_files.append(f'Experience Certificate {i+1}')
-
-            # Check insurance docs ONLY IF hasInsurance checkbox was checked
-            if 'hasInsurance' in form_data and parsed_submission.get('insurance'):
-                 for i, ins in enumerate(parsed_submission['insurance']):
-                      if not ins.get('document'):
-                           missing_required_files.append(f'Insurance Document {i+1}')
-
-
-            if missing_required_files:
-                 error_message = f"Missing or invalid required file(s): {', '.join(sorted(list(set(missing_required_files))))}. Please check file types/uploads and try again."
-                 print(f"Submission failed due to missing/invalid files: {error_message}")
+            # --- Phase 1: validate the request's files before any bytes hit disk ---
+            file_slots, chunked_by_key, problems = validate_uploads(form_data, file_data)
+            if problems:
+                 error_message = f"Missing or invalid file(s): {'; '.join(problems)}. Please check file types/uploads and try again."
+                 logger.warning("Submission failed due to missing/invalid files: %s", error_message)
                  return jsonify({"success": False, "error": error_message}), 400 # 400 Bad Request
 
+            # --- Claim the chunked uploads: each one can back a single submission ---
+            upload_ids = list(dict.fromkeys(session['uploadId'] for sessions in chunked_by_key.values() for session in sessions))
+            try:
+                claimed_uploads = chunked_uploads.claim(upload_ids)
+            except ChunkedUploadError as e:
+                logger.warning("Submission rejected: %s", e)
+                return jsonify({"success": False, "error": str(e)}), e.status
 
-            # --- Data Cleaning / Type Conversion (Continue only if files are okay) ---
-            for key in ['sameAsPermanent', 'hasExperience', 'hasInsurance', 'agreeTerms', 'agreePrivacy']:
-                parsed_submission[key] = key in form_data
-
-            if 'experience' in parsed_submission and isinstance(parsed_submission['experience'], list):
-                for i, exp in enumerate(parsed_submission['experience']):
-                     form_key = f"experience[{i}][currentJob]"
-                     exp['currentJob'] = form_key in form_data
-
-            # Convert relevant date strings to datetime objects
-            date_keys_to_check = ['dateOfBirth', 'signatureDate']
-            # Use helper functions to get/set nested values safely
-            def get_nested_value(data, key_path):
-                keys = key_path.split('.')
-                current = data
-                for key in keys:
-                    if key.isdigit(): key = int(key)
-                    if isinstance(current, list) and isinstance(key, int) and key < len(current): current = current[key]
-                    elif isinstance(current, dict) and key in current: current = current[key]
-                    else: return None
-                return current
-
-            def set_nested_value(data, key_path, value):
-                keys = key_path.split('.')
-                current = data
-                for i, key in enumerate(keys[:-1]):
-                    if key.isdigit(): key = int(key)
-                    if isinstance(current, list) and isinstance(key, int) and key < len(current): current = current[key]
-                    elif isinstance(current, dict) and key in current: current = current[key]
-                    else: return False # Path doesn't exist
-                last_key = keys[-1]
-                if last_key.isdigit(): last_key = int(last_key)
-                if isinstance(current, dict): current[last_key] = value; return True
-                elif isinstance(current, list) and isinstance(last_key, int) and last_key < len(current): current[last_key] = value; return True
-                return False
-
-            # Add nested date keys to check list dynamically
-            for i, exp_item in enumerate(parsed_submission.get('experience', [])):
-                if get_nested_value(exp_item, 'startDate'): date_keys_to_check.append(f'experience.{i}.startDate')
-                if get_nested_value(exp_item, 'endDate'): date_keys_to_check.append(f'experience.{i}.endDate')
-            for i, ins_item in enumerate(parsed_submission.get('insurance', [])):
-                if get_nested_value(ins_item, 'expirationDate'): date_keys_to_check.append(f'insurance.{i}.expirationDate')
-            # Add additional education dates if they existed
-
-            for key_path in date_keys_to_check:
-                 date_str = get_nested_value(parsed_submission, key_path)
-                 if date_str and isinstance(date_str, str):
-                     try:
-                         date_obj = datetime.strptime(date_str, '%Y-%m-%d')
-                         if not set_nested_value(parsed_submission, key_path, date_obj):
-                              print(f"Warning: Could not set nested date value for {key_path}")
-                     except ValueError:
-                         print(f"Warning: Could not parse date string '{date_str}' for key '{key_path}'. Storing as string.")
-
+            # --- Phase 2: parse form data and stage files (invisible until committed) ---
+            parsed_submission, staged_files = parse_nested_form_data(form_data, file_slots, chunked_by_key)
 
             # Add submission timestamp
             parsed_submission['submitted_at'] = datetime.utcnow()
 
-            # --- Insert into MongoDB ---
-            print("\n--- Attempting to Insert Data into MongoDB ---")
-            # print(f"Data: {parsed_submission}") # Use with caution in prod
-            print("-------------------------------------------\n")
+            # --- Asynchronous mode: journal now, flush to MongoDB in the background ---
+            if submission_queue is not None:
+                try:
+                    ticket = submission_queue.enqueue(parsed_submission)
+                except Exception:
+                    discard_staged_files(staged_files)
+                    raise
+                commit_staged_files(staged_files)
+                logger.info("Queued submission %s with ticket %s", parsed_submission['_id'], ticket)
+                return jsonify({
+                    "success": True,
+                    "message": "Form received and queued for processing.",
+                    "ticket": ticket,
+                    "statusUrl": url_for('submission_status', ticket=ticket),
+                }), 202
 
-            insert_result = onboarding_collection.insert_one(parsed_submission)
+            # --- Insert into MongoDB ---
+            logger.debug("Attempting to insert submission into MongoDB")
+            logger.debug("Data: %s", parsed_submission, extra=PII) # Dropped unless LOG_PII=1
+
+            try:
+                insert_result = onboarding_collection.insert_one(parsed_submission)
+            except Exception:
+                discard_staged_files(staged_files) # Roll back this submission's files
+                raise
+            try:
+                commit_staged_files(staged_files)
+            except Exception:
+                # Don't keep a form whose files never became visible
+                discard_staged_files(staged_files)
+                onboarding_collection.delete_one({'_id': insert_result.inserted_id})
+                logger.error("Removed submission %s: its files could not be committed.", insert_result.inserted_id)
+                raise
 
             if insert_result.inserted_id:
-                print(f"Successfully inserted document with MongoDB _id: {insert_result.inserted_id}")
+                logger.info("Successfully inserted document with MongoDB _id: %s", insert_result.inserted_id)
+                try:
+                    add_references(db.upload_blobs, parsed_submission.get('uploadManifest'))
+                except Exception as e:
+                    # The form is saved; counts are rebuilt by 'flask verify-uploads --repair'.
+                    logger.warning("Could not update upload reference counts: %s", e)
                 return jsonify({"success": True, "message": "Form submitted successfully!"}), 200
             else:
-                 print("ERROR: Database insertion command executed but reported no inserted ID.")
+                 logger.error("Database insertion command executed but reported no inserted ID.")
+                 chunked_uploads.release(claimed_uploads)
                  return jsonify({"success": False, "error": "Failed to save data to database (no ID returned)."}), 500
 
         # --- Specific Error Handling ---
         except OperationFailure as e:
-            print(f"ERROR: MongoDB Operation Failure during submission: {e.details}")
-            traceback.print_exc()
+            chunked_uploads.release(claimed_uploads)
+            logger.error("MongoDB Operation Failure during submission: %s", e.details, exc_info=True)
             error_msg = f"Database operation failed: {e.details.get('errmsg', 'Unknown database error')}"
             return jsonify({"success": False, "error": error_msg}), 500
         except Exception as e:
-            print(f"ERROR: An unexpected error occurred during form submission: {e}")
-            traceback.print_exc()
+            chunked_uploads.release(claimed_uploads)
+            logger.exception("An unexpected error occurred during form submission: %s", e)
             return jsonify({"success": False, "error": "An internal server error occurred processing your request. Please contact support."}), 500
 
     # If method is not POST
     return redirect(url_for('index'))
 
 
-# --- Teardown Context ---
-@app.teardown_appcontext
-def teardown_db(exception=None):
-    """Closes the database connection when the app context tears down."""
-    client = app.extensions.pop('mongodb_client', None)
-    app.extensions.pop('mongodb_db_name', None)
-    if client is not None:
-        client.close()
-        print("MongoDB connection closed.")
-    if exception:
-        print(f"App context teardown due to exception: {exception}")
+@app.route('/submit/status/<ticket>')
+def submission_status(ticket):
+    """Reports the state of an asynchronously queued submission."""
+    if submission_queue is None:
+        return jsonify({"success": False, "error": "Asynchronous submissions are not enabled."}), 404
+    entry = submission_queue.status(ticket)
+    if entry is None:
+        return jsonify({"success": False, "error": "Unknown ticket."}), 404
+    return jsonify({"success": True, **entry}), 200
+
+
+# --- Resumable Chunked Uploads ---
+def _chunked_upload_error(e):
+    body = {"success": False, "error": str(e)}
+    if e.offset is not None:
+        body["offset"] = e.offset
+    return jsonify(body), e.status
+
+@app.route('/uploads', methods=['POST'])
+def init_chunked_upload():
+    """Starts a resumable upload for one file input of the onboarding form."""
+    data = request.get_json(silent=True) or {}
+    field_name = data.get('fieldName') or ''
+    filename = secure_filename(data.get('filename') or '')
+    resolved = form_parser.resolve_file_key(field_name) if field_name else None
+    if resolved is None:
+        return jsonify({"success": False, "error": "Unknown or missing 'fieldName'."}), 400
+    allowed_extensions = resolved[3].allowed_extensions
+    if not filename or not allowed_file(filename, allowed_extensions):
+        return jsonify({"success": False, "error": f"File type not allowed. Allowed: {sorted(allowed_extensions)}"}), 400
+    try:
+        info = chunked_uploads.init(field_name, filename, data.get('size'), data.get('sha256'),
+                                    max_size=file_size_cap(resolved[3], app.config['MAX_FILE_SIZE']))
+    except ChunkedUploadError as e:
+        return _chunked_upload_error(e)
+    return jsonify({"success": True, **info}), 201
+
+@app.route('/uploads/<upload_id>', methods=['GET'])
+def chunked_upload_status(upload_id):
+    """Reports how many bytes have been received, so a client can resume."""
+    try:
+        return jsonify({"success": True, **chunked_uploads.status(upload_id)}), 200
+    except ChunkedUploadError as e:
+        return _chunked_upload_error(e)
+
+@app.route('/uploads/<upload_id>', methods=['PUT'])
+def put_upload_chunk(upload_id):
+    """Appends the raw request body at ?offset=N (or the Upload-Offset header)."""
+    offset = request.args.get('offset', request.headers.get('Upload-Offset'))
+    try:
+        offset = int(offset)
+    except (TypeError, ValueError):
+        return jsonify({"success": False, "error": "A numeric 'offset' is required."}), 400
+    try:
+        new_offset = chunked_uploads.write_chunk(
+            upload_id, offset, request.stream, request.headers.get('X-Chunk-SHA256'))
+    except ChunkedUploadError as e:
+        return _chunked_upload_error(e)
+    return jsonify({"success": True, "uploadId": upload_id, "offset": new_offset}), 200
+
+@app.route('/uploads/<upload_id>/finalize', methods=['POST'])
+def finalize_chunked_upload(upload_id):
+    """Checks the assembled file and stores it; the ID can then be sent to /submit."""
+    try:
+        session = chunked_uploads.finalize(upload_id)
+    except ChunkedUploadError as e:
+        return _chunked_upload_error(e)
+    return jsonify({"success": True, **chunked_uploads.describe(session), "sha256": session['blob']['sha256']}), 200
+
+
+# --- Admin Query API ---
+# Read-only listing for HR reviewers; see admin_queries.py for filters, projections and indexes.
+_admin_indexes_ready = False
+_admin_indexes_lock = threading.Lock()
+
+def _ensure_admin_indexes(collection):
+    """Creates the listing indexes once per process (create_indexes is a no-op if they exist)."""
+    global _admin_indexes_ready
+    if _admin_indexes_ready:
+        return
+    with _admin_indexes_lock:
+        if not _admin_indexes_ready:
+            try:
+                admin_queries.ensure_indexes(collection)
+            except OperationFailure as e:
+                # Listing still works, only slower; run 'flask admin-indexes' with a privileged user.
+                logger.warning("Could not create admin listing indexes: %s", e.details)
+            _admin_indexes_ready = True
+
+def _admin_auth_error():
+    """Returns an error response unless the request carries the admin bearer token."""
+    token = app.config['ADMIN_API_TOKEN']
+    if not token:
+        return jsonify({"success": False, "error": "Admin API is disabled (ADMIN_API_TOKEN is not set)."}), 503
+    supplied = request.headers.get('Authorization', '')
+    if not hmac.compare_digest(supplied.encode('utf-8'), f"Bearer {token}".encode('utf-8')):
+        return jsonify({"success": False, "error": "Unauthorized."}), 401
+    return None
+
+@app.route('/admin/submissions', methods=['GET'])
+def list_submissions():
+    """
+    Lists submissions newest first, one keyset page at a time.
+    Query parameters: limit, cursor, fields (comma-separated) and the filters
+    firstName, lastName, email, dateOfBirth, hasExperience, degree, branch, college.
+    """
+    auth_error = _admin_auth_error()
+    if auth_error:
+        return auth_error
+    try:
+        collection = get_db().onboarding_forms
+        _ensure_admin_indexes(collection)
+        documents, next_cursor = admin_queries.find_page(collection, request.args)
+    except AdminQueryError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except RuntimeError as e:
+        logger.error("/admin/submissions: Failed to get DB connection: %s", e)
+        return jsonify({"success": False, "error": "Database connection failed."}), 500
+    except OperationFailure as e:
+        logger.error("MongoDB Operation Failure listing submissions: %s", e.details)
+        return jsonify({"success": False, "error": "Database query failed."}), 500
+    return jsonify({
+        "success": True,
+        "items": admin_queries.to_json(documents),
+        "nextCursor": next_cursor,
+    }), 200
+
+@app.route('/admin/submissions/<submission_id>', methods=['GET'])
+def get_submission(submission_id):
+    """Returns one full submission, including experience and insurance entries."""
+    auth_error = _admin_auth_error()
+    if auth_error:
+        return auth_error
+    try:
+        object_id = ObjectId(submission_id)
+    except InvalidId:
+        return jsonify({"success": False, "error": "Invalid submission ID."}), 400
+    try:
+        document = get_db().onboarding_forms.find_one({'_id': object_id}, {'uploadManifest': 0})
+    except RuntimeError as e:
+        logger.error("/admin/submissions: Failed to get DB connection: %s", e)
+        return jsonify({"success": False, "error": "Database connection failed."}), 500
+    if document is None:
+        return jsonify({"success": False, "error": "Submission not found."}), 404
+    return jsonify({"success": True, "submission": admin_queries.to_json(document)}), 200
+
+
+# --- CLI Commands ---
+@app.cli.command('verify-uploads')
+@click.option('--repair', is_flag=True, help='Rewrite reference counts and delete orphaned blobs.')
+@click.option('--min-orphan-age', default=3600, show_default=True,
+              help='Seconds a blob must exist before it can be treated as orphaned.')
+def verify_uploads_command(repair, min_orphan_age):
+    """Verifies the upload store against onboarding_forms references."""
+    db = get_db()
+    report = verify_store(upload_store, db.upload_blobs, db.onboarding_forms,
+                          repair=repair, min_orphan_age=min_orphan_age,
+                          pinned=chunked_uploads.finalized_hashes())
+    print(f"Checked {report['checked']} blobs under '{os.path.abspath(upload_store.blob_dir)}'.")
+    for label in ('missing', 'corrupt', 'orphaned', 'refcount_fixed'):
+        print(f"  {label}: {len(report[label])}")
+        for sha256 in report[label]:
+            print(f"    {sha256}")
+    if repair:
+        print("Repair complete: reference counts rewritten, orphaned blobs removed.")
+    if report['missing'] or report['corrupt']:
+        raise SystemExit(1)
+
+
+@app.cli.command('purge-upload-sessions')
+@click.option('--max-age', default=86400, show_default=True, help='Remove upload sessions older than this many seconds.')
+def purge_upload_sessions_command(max_age):
+    """Deletes abandoned resumable upload sessions."""
+    removed = chunked_uploads.purge_expired(max_age)
+    print(f"Removed {removed} upload session(s) older than {max_age} seconds.")
+
+
+@app.cli.command('admin-indexes')
+@click.option('--drop-stale', is_flag=True, help="Drop 'admin_*' indexes no longer used by the admin API.")
+def admin_indexes_command(drop_stale):
+    """Creates (and optionally prunes) the indexes behind /admin/submissions."""
+    collection = get_db().onboarding_forms
+    names, dropped = admin_queries.ensure_indexes(collection, drop_stale=drop_stale)
+    print(f"Admin indexes present on '{collection.name}': {', '.join(names)}")
+    for name in dropped:
+        print(f"  dropped stale index: {name}")
+
+
+# --- Application Factory ---
+def create_app():
+    """
+    Entry point for the pre-forking launcher (serve.py).
+    MongoConnectionManager, the upload pool and the submission flusher are already
+    per-process (recreated after fork), so each worker gets its own client on first use.
+    """
+    return app
 
 
 # --- Run the App ---
@@ -0,0 +1,156 @@
+# bench_admin_queries.py
+# Benchmarks the /admin/submissions listing over a synthetic onboarding_forms
+# collection (1M documents by default): keyset pages against skip/limit pages
+# at increasing depth, and each filter with its admin index against a full
+# collection scan. Prints latency plus keys/documents examined from explain().
+#
+# Usage (needs a local mongod; seeding 1M documents takes a few minutes):
+#   MONGODB_URI=mongodb://localhost:27017/employee_db_bench python bench_admin_queries.py
+#   BENCH_DOCS=200000 BENCH_RESEED=1 python bench_admin_queries.py
+
+import os
+import time
+import random
+import statistics
+from datetime import datetime, timedelta
+from pymongo import MongoClient
+from werkzeug.datastructures import MultiDict
+import admin_queries
+from admin_queries import ADMIN_COLLATION, SORT_KEY
+
+# --- Configuration ---
+MONGODB_URI = os.getenv('MONGODB_URI', 'mongodb://localhost:27017/employee_db_bench')
+COLLECTION = os.getenv('BENCH_COLLECTION', 'onboarding_forms_bench')
+DOCS = int(os.getenv('BENCH_DOCS', 1_000_000))
+RESEED = os.getenv('BENCH_RESEED', '0').lower() in ['1', 'true', 'yes']
+ITERATIONS = int(os.getenv('BENCH_ITERATIONS', 20))
+PAGE_SIZE = 25
+PAGE_DEPTHS = [1, 100, 1000, 10000]
+INSERT_BATCH = 10_000
+
+FIRST_NAMES = ['Aarav', 'Priya', 'Rahul', 'Sneha', 'Vikram', 'Ananya', 'Kiran', 'Divya', 'Arjun', 'Meera']
+LAST_NAMES = ['Sharma', 'Reddy', 'Patel', 'Iyer', 'Nair', 'Gupta', 'Rao', 'Das', 'Khan', 'Singh']
+DEGREES = [('B.Tech', 'CSE'), ('B.Tech', 'ECE'), ('B.Sc', 'Physics'), ('MBA', 'Finance'), ('B.Com', 'Accounts')]
+COLLEGES = [f'College {i}' for i in range(200)]
+
+
+def synthetic_document(i, rng, start):
+    degree, branch = rng.choice(DEGREES)
+    has_experience = rng.random() < 0.6
+    document = {
+        'firstName': rng.choice(FIRST_NAMES), 'lastName': rng.choice(LAST_NAMES),
+        'personalEmail': f'user{i}@example.com', 'phone': f'9{i:09d}',
+        'dateOfBirth': datetime(1980, 1, 1) + timedelta(days=rng.randrange(9000)),
+        'hasExperience': has_experience, 'hasInsurance': rng.random() < 0.3,
+        'education': {
+            'ssc': {'school': 'School', 'year': '2010'},
+            'grad': {'college': rng.choice(COLLEGES), 'degree': degree, 'branch': branch, 'year': '2017'},
+        },
+        'submitted_at': start + timedelta(seconds=i * 30),
+    }
+    if has_experience:
+        document['experience'] = [{'company': f'Company {n}', 'jobTitle': 'Engineer', 'description': 'x' * 400,
+                                   'startDate': datetime(2018, 1, 1), 'endDate': datetime(2020, 1, 1)}
+                                  for n in range(rng.randint(1, 5))]
+    return document
+
+
+def seed(collection):
+    if not RESEED and collection.estimated_document_count() >= DOCS:
+        print(f"Reusing {collection.estimated_document_count()} documents in '{collection.name}'.")
+        return
+    collection.drop()
+    rng = random.Random(42)
+    start = datetime(2020, 1, 1)
+    began = time.perf_counter()
+    for offset in range(0, DOCS, INSERT_BATCH):
+        batch = [synthetic_document(i, rng, start) for i in range(offset, min(offset + INSERT_BATCH, DOCS))]
+        collection.insert_many(batch, ordered=False)
+    print(f"Seeded {DOCS} documents in {time.perf_counter() - began:.1f}s.")
+
+
+def timed(fn):
+    fn() # Warm-up
+    samples = []
+    for _ in range(ITERATIONS):
+        began = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - began) * 1000)
+    return statistics.median(samples)
+
+
+def examined(cursor):
+    stats = cursor.explain()['executionStats']
+    return stats['totalKeysExamined'], stats['totalDocsExamined']
+
+
+def report(label, ms, keys, docs):
+    print(f"{label:<44}{ms:>10.2f}ms{keys:>12}{docs:>12}")
+
+
+def bench_depth(collection):
+    print(f"\nPage depth (limit={PAGE_SIZE}, no filter)")
+    print(f"{'':<44}{'median':>12}{'keys':>12}{'docs':>12}")
+    projection = admin_queries.build_projection(None)
+    for depth in PAGE_DEPTHS:
+        skip = (depth - 1) * PAGE_SIZE
+
+        def offset_page():
+            return collection.find({}, projection, collation=ADMIN_COLLATION).sort(SORT_KEY).skip(skip).limit(PAGE_SIZE)
+
+        # Cursor for the same page, taken from the last row of the previous one.
+        args = MultiDict({'limit': str(PAGE_SIZE)})
+        if skip:
+            previous = collection.find({}, {'submitted_at': 1}).sort(SORT_KEY).skip(skip - 1).limit(1).next()
+            args['cursor'] = admin_queries.encode_cursor(previous)
+        query = admin_queries.build_filter(args)
+        if 'cursor' in args:
+            query = admin_queries.after_cursor(query, args['cursor'])
+
+        def keyset_page():
+            return collection.find(query, projection, collation=ADMIN_COLLATION).sort(SORT_KEY).limit(PAGE_SIZE + 1)
+
+        report(f"page {depth}: skip/limit", timed(lambda: list(offset_page())), *examined(offset_page()))
+        report(f"page {depth}: keyset", timed(lambda: admin_queries.find_page(collection, args)), *examined(keyset_page()))
+
+
+def bench_filters(collection):
+    print(f"\nFiltered first page (limit={PAGE_SIZE})")
+    print(f"{'':<44}{'median':>12}{'keys':>12}{'docs':>12}")
+    cases = {
+        'email': {'email': f'USER{DOCS // 2}@example.com'}, # Case-insensitive match
+        'lastName': {'lastName': 'iyer'},
+        'lastName + firstName': {'lastName': 'iyer', 'firstName': 'meera'},
+        'dateOfBirth': {'dateOfBirth': '1995-05-17'},
+        'hasExperience=false': {'hasExperience': 'false'},
+        'branch': {'branch': 'Finance'},
+        'degree + branch': {'degree': 'MBA', 'branch': 'Finance'},
+        'firstName + hasExperience': {'firstName': 'meera', 'hasExperience': 'true'}, # One index, filtered on fetch
+        'college': {'college': 'College 7'},
+    }
+    projection = admin_queries.build_projection(None)
+    for label, params in cases.items():
+        args = MultiDict({'limit': str(PAGE_SIZE), **params})
+        query = admin_queries.build_filter(args)
+
+        def indexed():
+            return collection.find(query, projection, collation=ADMIN_COLLATION).sort(SORT_KEY).limit(PAGE_SIZE + 1)
+
+        def scan():
+            return (collection.find(query, projection, collation=ADMIN_COLLATION)
+                    .sort(SORT_KEY).limit(PAGE_SIZE + 1).hint([('$natural', 1)]))
+
+        report(f"{label}: collection scan", timed(lambda: list(scan())), *examined(scan()))
+        report(f"{label}: admin index", timed(lambda: admin_queries.find_page(collection, args)), *examined(indexed()))
+
+
+if __name__ == '__main__':
+    client = MongoClient(MONGODB_URI)
+    collection = client.get_default_database(default='employee_db_bench')[COLLECTION]
+    seed(collection)
+    began = time.perf_counter()
+    admin_queries.ensure_indexes(collection)
+    print(f"Admin indexes ready in {time.perf_counter() - began:.1f}s.")
+    bench_depth(collection)
+    bench_filters(collection)
+    client.close()
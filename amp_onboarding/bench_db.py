@@ -0,0 +1,56 @@
+# bench_db.py
+# Compares per-request MongoDB latency of the old connect/ping/close-per-request
+# pattern against the pooled, long-lived client used by app.py.
+#
+# Usage (needs a local mongod):
+#   MONGODB_URI=mongodb://localhost:27017/employee_db_bench python bench_db.py
+
+import os
+import time
+import statistics
+from pymongo import MongoClient
+
+# --- Configuration ---
+MONGODB_URI = os.getenv('MONGODB_URI', 'mongodb://localhost:27017/employee_db_bench')
+ITERATIONS = int(os.getenv('BENCH_ITERATIONS', 200))
+os.environ.setdefault('MONGODB_URI', MONGODB_URI)
+os.environ.setdefault('FLASK_SECRET_KEY', 'bench-only-secret')
+
+
+def per_request_client():
+    """The previous behaviour: new client, ping, one query, close."""
+    client = MongoClient(MONGODB_URI, serverSelectionTimeoutMS=5000)
+    client.admin.command('ismaster')
+    client.admin.command('ping')
+    # Same database as the pooled path: the one named in MONGODB_URI, else employee_db (see MongoManager)
+    client.get_default_database('employee_db').onboarding_forms.find_one()
+    client.close()
+
+
+def summarize(label, samples):
+    samples_ms = sorted(s * 1000 for s in samples)
+    p95 = samples_ms[int(len(samples_ms) * 0.95) - 1]
+    print(f"{label:<28} mean={statistics.mean(samples_ms):8.3f}ms  "
+          f"p50={statistics.median(samples_ms):8.3f}ms  p95={p95:8.3f}ms")
+
+
+def run(label, fn):
+    fn() # Warm-up
+    samples = []
+    for _ in range(ITERATIONS):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    summarize(label, samples)
+
+
+if __name__ == '__main__':
+    from app import app, get_db
+
+    def pooled_client():
+        with app.app_context():
+            get_db().onboarding_forms.find_one()
+
+    print(f"Benchmarking {ITERATIONS} iterations against {MONGODB_URI}\n")
+    run("before: connect per request", per_request_client)
+    run("after: pooled client", pooled_client)
@@ -0,0 +1,115 @@
+# bench_parser.py
+# Microbenchmark for the form-field parsing stage of /submit on large
+# multi-experience submissions: the old regex + dotted-path walk against the
+# compiled schema parser from form_schema.py. No database or Flask app needed.
+#
+# Usage:
+#   python bench_parser.py
+
+import os
+import re
+import timeit
+from datetime import datetime
+from werkzeug.datastructures import ImmutableMultiDict
+from form_schema import ONBOARDING_FORM_SCHEMA, compile_form_schema
+
+# --- Configuration ---
+EXPERIENCE_COUNTS = [1, 10, 50]
+INSURANCE_ENTRIES = 5
+REPEAT = int(os.getenv('BENCH_REPEAT', 2000))
+
+
+def build_form(experience_entries):
+    fields = [
+        ('firstName', 'Bench'), ('lastName', 'User'), ('dateOfBirth', '1995-05-17'),
+        ('signatureDate', '2025-04-01'), ('personalEmail', 'bench@example.com'),
+        ('phone', '9999999999'), ('permanentStreet', '1 Main St'), ('permanentCity', 'Hyderabad'),
+        ('hasExperience', 'on'), ('hasInsurance', 'on'), ('agreeTerms', 'on'), ('agreePrivacy', 'on'),
+        ('education[ssc][school]', 'School'), ('education[ssc][year]', '2011'),
+        ('education[inter][college]', 'College'), ('education[inter][year]', '2013'),
+        ('education[grad][college]', 'University'), ('education[grad][year]', '2017'),
+    ]
+    for i in range(experience_entries):
+        fields += [
+            (f'experience[{i}][company]', f'Company {i}'), (f'experience[{i}][jobTitle]', 'Engineer'),
+            (f'experience[{i}][startDate]', '2018-01-01'), (f'experience[{i}][endDate]', '2019-01-01'),
+            (f'experience[{i}][employeeId]', f'E{i}'), (f'experience[{i}][description]', 'Work'),
+        ]
+    for i in range(INSURANCE_ENTRIES):
+        fields += [
+            (f'insurance[{i}][provider]', 'Provider'), (f'insurance[{i}][policyNumber]', f'P{i}'),
+            (f'insurance[{i}][expirationDate]', '2030-01-01'),
+        ]
+    return ImmutableMultiDict(fields)
+
+
+def legacy_parse(form_dict):
+    """Field parsing and date/bool conversion as /submit did before the compiled schema."""
+    parsed_data, parsed_lists, other_data = {}, {}, {}
+    pattern = re.compile(r"^(\w+)(?:\[(.*?)\])?(?:\[(.*?)\])?$")
+    for key, value in form_dict.items():
+        match = pattern.match(key)
+        if not match:
+            other_data[key] = value
+            continue
+        section, index_or_key, field = match.groups()
+        if index_or_key is None and field is None:
+            other_data[section] = value
+        elif index_or_key.isdigit():
+            items = parsed_lists.setdefault(section, [])
+            while len(items) <= int(index_or_key): items.append({})
+            items[int(index_or_key)][field] = value
+        else:
+            parsed_data.setdefault(section, {}).setdefault(index_or_key, {})[field] = value
+    result = {**other_data, **parsed_data}
+    for section, items in parsed_lists.items():
+        result[section] = [item for item in items if item]
+    for key in ['sameAsPermanent', 'hasExperience', 'hasInsurance', 'agreeTerms', 'agreePrivacy']:
+        result[key] = key in form_dict
+    for i, exp in enumerate(result.get('experience', [])):
+        exp['currentJob'] = f"experience[{i}][currentJob]" in form_dict
+
+    def get_nested_value(data, key_path):
+        current = data
+        for key in key_path.split('.'):
+            if key.isdigit(): key = int(key)
+            if isinstance(current, list) and isinstance(key, int) and key < len(current): current = current[key]
+            elif isinstance(current, dict) and key in current: current = current[key]
+            else: return None
+        return current
+
+    def set_nested_value(data, key_path, value):
+        keys = key_path.split('.')
+        current = data
+        for key in keys[:-1]:
+            if key.isdigit(): key = int(key)
+            current = current[key]
+        last_key = int(keys[-1]) if keys[-1].isdigit() else keys[-1]
+        current[last_key] = value
+
+    date_keys = ['dateOfBirth', 'signatureDate']
+    for i, exp in enumerate(result.get('experience', [])):
+        if get_nested_value(exp, 'startDate'): date_keys.append(f'experience.{i}.startDate')
+        if get_nested_value(exp, 'endDate'): date_keys.append(f'experience.{i}.endDate')
+    for i, ins in enumerate(result.get('insurance', [])):
+        if get_nested_value(ins, 'expirationDate'): date_keys.append(f'insurance.{i}.expirationDate')
+    for key_path in date_keys:
+        date_str = get_nested_value(result, key_path)
+        if date_str and isinstance(date_str, str):
+            set_nested_value(result, key_path, datetime.strptime(date_str, '%Y-%m-%d'))
+    return result
+
+
+if __name__ == '__main__':
+    parser = compile_form_schema(ONBOARDING_FORM_SCHEMA)
+
+    def compiled_parse(form_dict):
+        return parser.assemble(*parser.parse_fields(form_dict), [])
+
+    print(f"{'experience entries':<20}{'legacy (us)':>14}{'compiled (us)':>16}{'speedup':>10}")
+    for count in EXPERIENCE_COUNTS:
+        form = build_form(count)
+        assert legacy_parse(form) == compiled_parse(form), "parsers disagree"
+        legacy = min(timeit.repeat(lambda: legacy_parse(form), number=REPEAT, repeat=3)) / REPEAT * 1e6
+        compiled = min(timeit.repeat(lambda: compiled_parse(form), number=REPEAT, repeat=3)) / REPEAT * 1e6
+        print(f"{count:<20}{legacy:>14.1f}{compiled:>16.1f}{legacy / compiled:>9.2f}x")
@@ -0,0 +1,86 @@
+# bench_uploads.py
+# Submits full multi-file onboarding packets to /submit at high concurrency and
+# reports throughput for a serial upload pool (1 writer) against the default
+# bounded pool.
+#
+# Usage (needs a local mongod):
+#   MONGODB_URI=mongodb://localhost:27017/employee_db_bench python bench_uploads.py
+
+import io
+import os
+import time
+import tempfile
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+
+# --- Configuration ---
+os.environ.setdefault('MONGODB_URI', 'mongodb://localhost:27017/employee_db_bench')
+os.environ.setdefault('FLASK_SECRET_KEY', 'bench-only-secret')
+os.environ.setdefault('FLASK_UPLOAD_FOLDER', tempfile.mkdtemp(prefix='onboarding_bench_'))
+CONCURRENCY = int(os.getenv('BENCH_CONCURRENCY', 32))
+PACKETS = int(os.getenv('BENCH_PACKETS', 200))
+FILE_SIZE = int(os.getenv('BENCH_FILE_SIZE', 512 * 1024)) # Bytes per uploaded file
+EXPERIENCE_ENTRIES = 3
+
+PDF_BODY = b'%PDF-1.4\n' + os.urandom(FILE_SIZE - 25)
+
+
+def pdf():
+    """Unique body per file so the content-addressed store cannot deduplicate the writes."""
+    return io.BytesIO(PDF_BODY + os.urandom(16))
+
+
+def build_packet():
+    """Builds form fields plus ~17 files: id, resume, signed doc, 3 education certs,
+    and per experience entry a certificate and two salary slips."""
+    data = {
+        'firstName': 'Bench', 'lastName': 'User', 'email': 'bench@example.com',
+        'dateOfBirth': '1995-05-17', 'signatureDate': '2025-04-01', 'hasExperience': 'on',
+        'education[ssc][school]': 'School', 'education[inter][college]': 'College',
+        'education[grad][college]': 'University',
+        'idProof': (pdf(), 'id.pdf'),
+        'resume': (pdf(), 'resume.pdf'),
+        'signedDocument': (pdf(), 'signed.pdf'),
+        'education[ssc][certificate]': (pdf(), 'ssc.pdf'),
+        'education[inter][certificate]': (pdf(), 'inter.pdf'),
+        'education[grad][certificate]': (pdf(), 'grad.pdf'),
+    }
+    for i in range(EXPERIENCE_ENTRIES):
+        data[f'experience[{i}][company]'] = f'Company {i}'
+        data[f'experience[{i}][startDate]'] = '2020-01-01'
+        data[f'experience[{i}][endDate]'] = '2021-01-01'
+        data[f'experience[{i}][certificate]'] = (pdf(), f'exp{i}.pdf')
+        data[f'experience[{i}][salarySlips]'] = [
+            (pdf(), f'slip{i}a.pdf'), (pdf(), f'slip{i}b.pdf')]
+    return data
+
+
+def run(app_module, label, workers):
+    app_module.app.config['UPLOAD_WORKERS'] = workers
+    app_module._upload_executor = None # Force the pool to be rebuilt with the new size
+    client = app_module.app.test_client()
+
+    def submit(_):
+        start = time.perf_counter()
+        response = client.post('/submit', data=build_packet(), content_type='multipart/form-data')
+        return time.perf_counter() - start, response.status_code
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=CONCURRENCY) as pool:
+        results = list(pool.map(submit, range(PACKETS)))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(r[0] * 1000 for r in results)
+    errors = sum(1 for r in results if r[1] != 200)
+    print(f"{label:<24} {PACKETS / elapsed:8.1f} packets/s  "
+          f"p50={statistics.median(latencies):8.1f}ms  p95={latencies[int(len(latencies) * 0.95) - 1]:8.1f}ms  "
+          f"errors={errors}")
+
+
+if __name__ == '__main__':
+    import app as app_module
+
+    print(f"{PACKETS} packets, concurrency {CONCURRENCY}, {FILE_SIZE // 1024} KiB per file\n")
+    run(app_module, "serial writes (1)", 1)
+    run(app_module, f"upload pool ({int(os.getenv('FLASK_UPLOAD_WORKERS', 8))})",
+        int(os.getenv('FLASK_UPLOAD_WORKERS', 8)))
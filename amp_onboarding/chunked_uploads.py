@@ -0,0 +1,284 @@
+# chunked_uploads.py
+# Resumable chunked uploads for large onboarding documents.
+#
+# Protocol:
+#   POST /uploads                      init: {"fieldName", "filename", "size", "sha256"?} -> {"uploadId", "offset": 0}
+#   PUT  /uploads/<id>?offset=N        append the raw request body at byte offset N
+#   GET  /uploads/<id>                 current offset, to resume after a dropped connection
+#   POST /uploads/<id>/finalize        verify size/hash and move the file into the upload store
+# The final /submit then carries 'uploadIds' form values instead of file bodies.
+#
+# Chunks are streamed straight from the request body to <UPLOAD_FOLDER>/tmp/chunked/<id>.part.
+# The committed offset is simply the size of that file, so a chunk is only accepted
+# at exactly the current end of file and a retried chunk can never be applied twice.
+# Every step holds an flock on <id>.lock, which serialises it across threads and
+# pre-forked worker processes alike. A finalized upload can be used by one
+# submission only: /submit claims it (claim()) and gives it back if it fails.
+
+import os
+import re
+import json
+import time
+import uuid
+import hashlib
+import threading
+from contextlib import contextmanager
+try:
+    import fcntl
+except ImportError: # Windows: no pre-forked workers there, a per-process lock is enough
+    fcntl = None
+
+STATE_UPLOADING = 'uploading'
+STATE_COMPLETE = 'complete'
+
+UPLOAD_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+CHUNK_SIZE = 64 * 1024
+
+
+class ChunkedUploadError(Exception):
+    """Upload protocol violation; carries the HTTP status to answer with."""
+
+    def __init__(self, message, status=400, offset=None):
+        super().__init__(message)
+        self.status = status
+        self.offset = offset
+
+
+class ChunkedUploadManager:
+    """Tracks upload sessions as a .part file plus a small JSON sidecar each."""
+
+    def __init__(self, store, max_size):
+        self.store = store
+        self.session_dir = os.path.join(store.tmp_dir, 'chunked')
+        os.makedirs(self.session_dir, exist_ok=True)
+        self.max_size = max_size
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    # --- Session files ---
+    def _paths(self, upload_id):
+        if not UPLOAD_ID_PATTERN.match(upload_id or ''):
+            raise ChunkedUploadError("Unknown upload ID.", 404)
+        base = os.path.join(self.session_dir, upload_id)
+        return base + '.part', base + '.json'
+
+    def _lock_path(self, upload_id):
+        return os.path.join(self.session_dir, upload_id + '.lock')
+
+    @contextmanager
+    def _lock(self, upload_id):
+        """Holds the session's lock: an flock shared by all worker processes (or a thread lock without fcntl)."""
+        _, meta_path = self._paths(upload_id)
+        if not os.path.exists(meta_path):
+            raise ChunkedUploadError("Unknown upload ID.", 404)
+        if fcntl is None:
+            with self._locks_guard:
+                lock = self._locks.setdefault(upload_id, threading.Lock())
+            with lock:
+                yield
+            return
+        fd = os.open(self._lock_path(upload_id), os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd) # Releases the flock
+
+    def _forget_lock(self, upload_id):
+        with self._locks_guard:
+            self._locks.pop(upload_id, None)
+
+    def _load(self, upload_id):
+        _, meta_path = self._paths(upload_id)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise ChunkedUploadError("Unknown upload ID.", 404)
+
+    def _save(self, session):
+        _, meta_path = self._paths(session['uploadId'])
+        tmp_path = meta_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(session, f)
+        os.replace(tmp_path, meta_path)
+
+    def _offset(self, upload_id):
+        part_path, _ = self._paths(upload_id)
+        try:
+            return os.path.getsize(part_path)
+        except FileNotFoundError:
+            return 0
+
+    # --- Protocol steps ---
+    def init(self, field_name, filename, size, sha256=None, max_size=None):
+        """
+        Creates an upload session and returns its public description.
+        max_size: the field's own cap, if lower than the manager's.
+        """
+        limit = min(max_size or self.max_size, self.max_size)
+        if not isinstance(size, int) or size <= 0:
+            raise ChunkedUploadError("'size' must be a positive integer.")
+        if size > limit:
+            raise ChunkedUploadError(f"File exceeds the {limit} byte limit.", 413)
+        if sha256 is not None and not re.match(r'^[0-9a-f]{64}$', sha256):
+            raise ChunkedUploadError("'sha256' must be a lowercase hex SHA-256 digest.")
+        upload_id = uuid.uuid4().hex
+        session = {
+            'uploadId': upload_id,
+            'fieldName': field_name,
+            'filename': filename,
+            'size': size,
+            'sha256': sha256,
+            'state': STATE_UPLOADING,
+            'createdAt': time.time(),
+        }
+        part_path, _ = self._paths(upload_id)
+        open(part_path, 'wb').close()
+        self._save(session)
+        return self.describe(session)
+
+    def describe(self, session):
+        info = {k: session[k] for k in ('uploadId', 'fieldName', 'filename', 'size', 'state')}
+        info['offset'] = session['size'] if session['state'] == STATE_COMPLETE else self._offset(session['uploadId'])
+        return info
+
+    def status(self, upload_id):
+        return self.describe(self._load(upload_id))
+
+    def write_chunk(self, upload_id, offset, stream, chunk_sha256=None):
+        """
+        Appends the stream at 'offset', which must equal the bytes already received.
+        If chunk_sha256 is given, the chunk is checked and discarded on mismatch.
+        Returns the new offset.
+        """
+        with self._lock(upload_id):
+            session = self._load(upload_id)
+            if session['state'] != STATE_UPLOADING:
+                raise ChunkedUploadError("Upload is already finalized.", 409, offset=session['size'])
+            current = self._offset(upload_id)
+            if offset != current:
+                raise ChunkedUploadError(f"Offset mismatch: expected {current}.", 409, offset=current)
+
+            part_path, _ = self._paths(upload_id)
+            digest = hashlib.sha256()
+            written = 0
+            with open(part_path, 'r+b') as out:
+                out.seek(current)
+                try:
+                    while True:
+                        chunk = stream.read(CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        written += len(chunk)
+                        if current + written > session['size']:
+                            raise ChunkedUploadError("Chunk runs past the declared file size.", 413, offset=current)
+                        digest.update(chunk)
+                        out.write(chunk)
+                    if chunk_sha256 is not None and digest.hexdigest() != chunk_sha256.lower():
+                        raise ChunkedUploadError("Chunk checksum mismatch.", 422, offset=current)
+                except BaseException:
+                    # Drop the partial chunk so the client can resend it from the same offset
+                    out.truncate(current)
+                    raise
+            return current + written
+
+    def finalize(self, upload_id):
+        """
+        Verifies the assembled file and moves it into the content-addressed store.
+        Returns the session, now carrying the manifest entry under 'blob'. Idempotent.
+        """
+        with self._lock(upload_id):
+            session = self._load(upload_id)
+            if session['state'] == STATE_COMPLETE:
+                return session
+            current = self._offset(upload_id)
+            if current != session['size']:
+                raise ChunkedUploadError(
+                    f"Upload incomplete: {current} of {session['size']} bytes received.", 409, offset=current)
+            part_path, _ = self._paths(upload_id)
+            sha256 = self.store.hash_file(part_path)
+            if session.get('sha256') and session['sha256'] != sha256:
+                os.remove(part_path)
+                open(part_path, 'wb').close() # Restart from zero
+                raise ChunkedUploadError("File checksum mismatch; upload restarted.", 422, offset=0)
+            blob = self.store.put_path(part_path, sha256)
+            session['state'] = STATE_COMPLETE
+            session['blob'] = {'path': blob['path'], 'sha256': blob['sha256'], 'size': blob['size']}
+            self._save(session)
+        self._forget_lock(upload_id) # No more chunks to serialise
+        return session
+
+    def completed(self, upload_id):
+        """Returns a finalized session for use by /submit, or raises ChunkedUploadError."""
+        session = self._load(upload_id)
+        if session['state'] != STATE_COMPLETE:
+            raise ChunkedUploadError(f"Upload '{upload_id}' has not been finalized.", 409)
+        if session.get('consumedAt'):
+            raise ChunkedUploadError(f"Upload '{upload_id}' was already used by another submission.", 409)
+        return session
+
+    def claim(self, upload_ids):
+        """
+        Marks finalized uploads as used by one submission, atomically per upload.
+        Raises ChunkedUploadError (nothing claimed) if any is unfinished or already used.
+        """
+        claimed = []
+        try:
+            for upload_id in upload_ids:
+                with self._lock(upload_id):
+                    session = self.completed(upload_id)
+                    session['consumedAt'] = time.time()
+                    self._save(session)
+                claimed.append(upload_id)
+        except BaseException:
+            self.release(claimed)
+            raise
+        return claimed
+
+    def release(self, upload_ids):
+        """Gives claimed uploads back after the submission using them failed."""
+        for upload_id in upload_ids:
+            try:
+                with self._lock(upload_id):
+                    session = self._load(upload_id)
+                    session.pop('consumedAt', None)
+                    self._save(session)
+            except (ChunkedUploadError, OSError, ValueError):
+                continue # Purged meanwhile
+
+    def finalized_hashes(self):
+        """Hashes of finalized uploads whose sessions still exist (not yet purged)."""
+        hashes = set()
+        for name in os.listdir(self.session_dir):
+            if name.endswith('.json'):
+                try:
+                    session = self._load(name[:-5])
+                except (ChunkedUploadError, ValueError):
+                    continue
+                if session.get('state') == STATE_COMPLETE:
+                    hashes.add(session['blob']['sha256'])
+        return hashes
+
+    def purge_expired(self, max_age_seconds):
+        """Deletes session files older than max_age_seconds. Returns how many sessions were removed."""
+        removed = 0
+        cutoff = time.time() - max_age_seconds
+        for name in os.listdir(self.session_dir):
+            if not name.endswith('.json'):
+                continue
+            upload_id = name[:-5]
+            try:
+                session = self._load(upload_id)
+            except (ChunkedUploadError, ValueError):
+                continue
+            if session.get('createdAt', 0) >= cutoff:
+                continue
+            for path in (*self._paths(upload_id), self._lock_path(upload_id)):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            self._forget_lock(upload_id)
+            removed += 1
+        return removed
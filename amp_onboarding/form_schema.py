@@ -0,0 +1,269 @@
+# form_schema.py
+# Declarative description of the onboarding form and the parser compiled from it.
+#
+# The schema is compiled once at import time into lookup tables, so a submission
+# is parsed with dictionary dispatch and string splitting only: no regex per key,
+# no dotted-path walks, and type coercion (dates, checkboxes) in the same pass.
+
+import logging
+from datetime import datetime
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+# --- Allowed file extensions (adjust as needed) ---
+ALLOWED_EXTENSIONS_DOCS = {'pdf', 'docx'}
+ALLOWED_EXTENSIONS_IMAGES = {'png', 'jpg', 'jpeg', 'pdf'} # PDF often needed for image-like docs
+ALLOWED_EXTENSIONS_SIGNED = {'png', 'jpg', 'jpeg', 'pdf'}
+
+# --- Leading bytes each allowed extension must start with ---
+FILE_SIGNATURES = {
+    'pdf': (b'%PDF-',),
+    'png': (b'\x89PNG\r\n\x1a\n',),
+    'jpg': (b'\xff\xd8\xff',),
+    'jpeg': (b'\xff\xd8\xff',),
+    'docx': (b'PK\x03\x04',), # Office Open XML is a zip archive
+}
+
+# --- Per-field size caps (bytes); FLASK_MAX_FILE_SIZE still applies on top ---
+MB = 1024 * 1024
+
+# --- Field types ---
+STRING = 'string'
+DATE = 'date'       # 'YYYY-MM-DD' from <input type="date">, stored as datetime
+BOOL = 'bool'       # Checkbox: present means True, absent means False
+
+DATE_FORMAT = '%Y-%m-%d'
+
+FileField = namedtuple('FileField', ['subfolder', 'allowed_extensions', 'multiple', 'max_size'], defaults=(None,))
+Section = namedtuple('Section', ['kind', 'fields', 'files'])  # kind: 'dict' or 'list'
+
+EDUCATION_FIELDS = {'school': STRING, 'college': STRING, 'year': STRING, 'grade': STRING,
+                    'degree': STRING, 'branch': STRING}
+
+ONBOARDING_FORM_SCHEMA = {
+    # Simple top-level inputs. Anything not listed is kept as a string.
+    'fields': {
+        'firstName': STRING, 'lastName': STRING, 'dateOfBirth': DATE, 'gender': STRING,
+        'maritalStatus': STRING, 'nationality': STRING, 'personalEmail': STRING,
+        'phone': STRING, 'alternatePhone': STRING,
+        'permanentStreet': STRING, 'permanentCity': STRING, 'permanentState': STRING,
+        'permanentZip': STRING, 'permanentCountry': STRING,
+        'currentStreet': STRING, 'currentCity': STRING, 'currentState': STRING,
+        'currentZip': STRING, 'currentCountry': STRING,
+        'emergencyName1': STRING, 'emergencyRelationship1': STRING, 'emergencyPhone1': STRING,
+        'emergencyEmail1': STRING, 'emergencyName2': STRING, 'emergencyRelationship2': STRING,
+        'emergencyPhone2': STRING, 'emergencyEmail2': STRING,
+        'bankName': STRING, 'accountName': STRING, 'accountNumber': STRING,
+        'routingNumber': STRING, 'iban': STRING, 'bankAddress': STRING,
+        'signatureDate': DATE,
+        'sameAsPermanent': BOOL, 'hasExperience': BOOL, 'hasInsurance': BOOL,
+        'agreeTerms': BOOL, 'agreePrivacy': BOOL,
+    },
+    # Top-level file inputs.
+    'files': {
+        'idProof': FileField('documents', ALLOWED_EXTENSIONS_IMAGES, False, 5 * MB),
+        'resume': FileField('documents', ALLOWED_EXTENSIONS_DOCS, False, 5 * MB),
+        'signedDocument': FileField('signed_docs', ALLOWED_EXTENSIONS_SIGNED, False, 10 * MB),
+    },
+    # Bracketed sections: education[ssc][school] (dict) or experience[0][company] (list).
+    'sections': {
+        'education': Section('dict', EDUCATION_FIELDS, {
+            'certificate': FileField('education', ALLOWED_EXTENSIONS_IMAGES, False, 5 * MB),
+        }),
+        'additionalEducation': Section('list', EDUCATION_FIELDS, {
+            'certificate': FileField('education', ALLOWED_EXTENSIONS_IMAGES, False, 5 * MB),
+        }),
+        'experience': Section('list', {
+            'company': STRING, 'jobTitle': STRING, 'startDate': DATE, 'endDate': DATE,
+            'currentJob': BOOL, 'employeeId': STRING, 'supervisorName': STRING, 'description': STRING,
+        }, {
+            'certificate': FileField('experience', ALLOWED_EXTENSIONS_IMAGES, False, 5 * MB),
+            'salarySlips': FileField('experience', ALLOWED_EXTENSIONS_IMAGES, True, 2 * MB),
+        }),
+        'insurance': Section('list', {
+            'provider': STRING, 'policyNumber': STRING, 'coverageType': STRING, 'expirationDate': DATE,
+        }, {
+            'document': FileField('insurance', ALLOWED_EXTENSIONS_IMAGES, False, 5 * MB),
+        }),
+    },
+}
+
+# Used for file inputs the schema does not know about (same defaults as before the schema).
+DEFAULT_FILE_FIELD = FileField('documents', ALLOWED_EXTENSIONS_IMAGES, False)
+
+# A file input resolved against the schema, ready to be saved and placed.
+FileSlot = namedtuple('FileSlot', ['key', 'section', 'index_or_key', 'field', 'spec', 'file_list'])
+
+
+def split_key(key):
+    """
+    Splits 'section', 'section[a]' or 'section[a][b]' into (section, a, b).
+    Returns None for keys that do not have that shape.
+    """
+    open_at = key.find('[')
+    if open_at == -1:
+        return key, None, None
+    if open_at == 0 or key[-1] != ']':
+        return None
+    parts = key[open_at + 1:-1].split('][')
+    if len(parts) == 1:
+        return key[:open_at], parts[0], None
+    if len(parts) == 2:
+        return key[:open_at], parts[0], parts[1]
+    return None
+
+
+def _coerce_date(value, key):
+    if not value:
+        return value
+    try:
+        # Fast path for the canonical 'YYYY-MM-DD' that date inputs send; strptime is ~10x slower.
+        if len(value) == 10 and value[4] == '-' and value[7] == '-':
+            return datetime(int(value[0:4]), int(value[5:7]), int(value[8:10]))
+        return datetime.strptime(value, DATE_FORMAT)
+    except ValueError:
+        logger.warning("Could not parse date string '%s' for key '%s'. Storing as string.", value, key)
+        return value
+
+
+class CompiledFormParser:
+    """
+    Direct-dispatch parser for one form schema. Build it once at startup with
+    compile_form_schema() and reuse it for every request.
+    """
+
+    def __init__(self, schema):
+        self.top_fields = dict(schema['fields'])
+        self.top_files = dict(schema['files'])
+        self.top_bools = tuple(name for name, kind in self.top_fields.items() if kind == BOOL)
+        self.sections = {name: section for name, section in schema['sections'].items()}
+        self.section_bools = {name: tuple(f for f, kind in section.fields.items() if kind == BOOL)
+                              for name, section in self.sections.items() if section.kind == 'list'}
+
+    def parse_fields(self, form_dict):
+        """
+        Parses the non-file inputs of a submission into nested dicts/lists,
+        converting dates and checkboxes as it goes.
+        Returns (other_data, dict_sections, list_sections).
+        """
+        top_fields = self.top_fields
+        sections = self.sections
+        other_data = {}
+        dict_sections = {}
+        list_sections = {}
+
+        for key, value in form_dict.items():
+            kind = top_fields.get(key)
+            if kind is not None: # Known simple field: 'firstName'
+                if kind == DATE: value = _coerce_date(value, key)
+                elif kind == BOOL: value = True
+                other_data[key] = value
+                continue
+
+            parts = split_key(key)
+            if parts is None:
+                other_data[key] = value
+                continue
+            section, index_or_key, field = parts
+
+            if index_or_key is None: # Unknown simple field
+                other_data[section] = value
+            elif field is None: # Dict key only: 'education[ssc]' (unlikely structure for this form)
+                dict_sections.setdefault(section, {})[index_or_key] = value
+            else:
+                spec = sections.get(section)
+                if spec is not None:
+                    field_kind = spec.fields.get(field)
+                    if field_kind == DATE: value = _coerce_date(value, key)
+                    elif field_kind == BOOL: value = True
+                if index_or_key.isdigit(): # List item: 'experience[0][company]'
+                    items = list_sections.setdefault(section, [])
+                    index = int(index_or_key)
+                    while len(items) <= index: items.append({})
+                    items[index][field] = value
+                else: # Dictionary item: 'education[ssc][school]'
+                    dict_sections.setdefault(section, {}).setdefault(index_or_key, {})[field] = value
+
+        for name in self.top_bools:
+            if name not in other_data:
+                other_data[name] = False
+        return other_data, dict_sections, list_sections
+
+    def resolve_file_key(self, key):
+        """
+        Resolves a file input name against the schema.
+        Returns (section, index_or_key, field, FileField), or None (with a warning) if unusable.
+        """
+        parts = split_key(key)
+        if parts is None:
+            logger.warning("Key '%s' did not match expected file pattern. Skipping.", key)
+            return None
+        section, index_or_key, field = parts
+
+        if index_or_key is None: # Top-level file: 'idProof', 'resume', 'signedDocument'
+            return section, None, None, self.top_files.get(key, DEFAULT_FILE_FIELD)
+        if field is None: # Files must have a field name within brackets
+            logger.warning("File received for key '%s' without required field specifier in brackets. Skipping.", key)
+            return None
+        section_spec = self.sections.get(section)
+        spec = section_spec.files.get(field) if section_spec is not None else None
+        if spec is None:
+            spec = FileField(section, DEFAULT_FILE_FIELD.allowed_extensions, False)
+        return section, index_or_key, field, spec
+
+    def plan_files(self, files_dict):
+        """
+        Resolves every non-empty file input against the schema.
+        Returns a list of FileSlot entries in request order.
+        """
+        slots = []
+        for key in files_dict:
+            file_list = [f for f in files_dict.getlist(key) if f and f.filename]
+            if not file_list:
+                continue
+            resolved = self.resolve_file_key(key)
+            if resolved is None:
+                continue
+            section, index_or_key, field, spec = resolved
+            if not spec.multiple and len(file_list) > 1:
+                if index_or_key is None:
+                    logger.warning("Multiple files received for top-level field '%s'. Using only the first.", key)
+                file_list = file_list[:1]
+            slots.append(FileSlot(key, section, index_or_key, field, spec, file_list))
+        return slots
+
+    def assemble(self, other_data, dict_sections, list_sections, file_values):
+        """
+        Combines parsed fields with stored file paths into the final document.
+        file_values is a list of (FileSlot, value) pairs; value is a path or a list of paths.
+        """
+        for slot, value in file_values:
+            if slot.index_or_key is None:
+                other_data[slot.key] = value
+            elif slot.index_or_key.isdigit():
+                items = list_sections.setdefault(slot.section, [])
+                index = int(slot.index_or_key)
+                while len(items) <= index: items.append({})
+                items[index][slot.field] = value
+            else:
+                dict_sections.setdefault(slot.section, {}).setdefault(slot.index_or_key, {})[slot.field] = value
+
+        final_submission = other_data
+        for section, content in dict_sections.items():
+            final_submission[section] = content
+        for section, items in list_sections.items():
+            items = [item for item in items if item]
+            for name in self.section_bools.get(section, ()):
+                for item in items:
+                    item.setdefault(name, False)
+            final_submission[section] = items
+        return final_submission
+
+
+def compile_form_schema(schema):
+    """Validates a form schema and returns its CompiledFormParser."""
+    for name, section in schema['sections'].items():
+        if section.kind not in ('dict', 'list'):
+            raise ValueError(f"Section '{name}' has unknown kind '{section.kind}'")
+    return CompiledFormParser(schema)
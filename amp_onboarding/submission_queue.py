@@ -0,0 +1,217 @@
+# submission_queue.py
+# Write-behind queue for onboarding submissions.
+#
+# In asynchronous mode /submit appends the parsed document to a durable SQLite
+# journal and answers 202 with a ticket ID. A background flusher drains the
+# journal in submission order and writes batches to onboarding_forms with
+# insert_many, retrying with backoff while MongoDB is unavailable.
+#
+# Every journaled document gets its ObjectId at enqueue time, so a batch that is
+# retried after a partial write (or drained by two workers sharing the journal)
+# cannot create duplicates: already-stored documents come back as duplicate-key
+# errors and are marked stored.
+
+import os
+import uuid
+import logging
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+import bson
+from bson import ObjectId
+from pymongo.errors import BulkWriteError, PyMongoError
+
+STATUS_QUEUED = 'queued'
+STATUS_STORED = 'stored'
+STATUS_FAILED = 'failed'
+
+DUPLICATE_KEY_ERROR = 11000
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS submissions (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    ticket TEXT NOT NULL UNIQUE,
+    document_id TEXT NOT NULL,
+    payload BLOB NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS submissions_status_seq ON submissions (status, seq);
+"""
+
+
+class SubmissionQueue:
+    """Durable journal plus background flusher into a MongoDB collection."""
+
+    def __init__(self, journal_path, get_collection, batch_size=100, flush_interval=1.0,
+                 max_attempts=10, max_backoff=60.0, on_stored=None):
+        """
+        get_collection: callable returning the target collection (may raise while the DB is down).
+        on_stored: optional callable receiving the list of documents written in a batch.
+        """
+        self.journal_path = journal_path
+        self.get_collection = get_collection
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self.max_backoff = max_backoff
+        self.on_stored = on_stored
+        self._wakeup = threading.Event()
+        self._stop_event = threading.Event()
+        self._flusher = None
+        self._flusher_pid = None
+        self._start_lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(journal_path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        """Short-lived connection committed on success; SQLite handles are not shared across threads."""
+        conn = sqlite3.connect(self.journal_path, timeout=30)
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=FULL') # An acknowledged ticket must survive a crash
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    # --- Producer side ---
+    def enqueue(self, document):
+        """
+        Journals a document for writing and returns its ticket ID.
+        Assigns the document's _id if it has none.
+        """
+        document.setdefault('_id', ObjectId())
+        ticket = uuid.uuid4().hex
+        now = datetime.utcnow().isoformat()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO submissions (ticket, document_id, payload, status, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (ticket, str(document['_id']), bson.encode(document), STATUS_QUEUED, now, now),
+            )
+        self.start()
+        self._wakeup.set()
+        return ticket
+
+    def status(self, ticket):
+        """Returns the journal entry for a ticket as a dict, or None if unknown."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT ticket, document_id, status, attempts, error, created_at, updated_at "
+                "FROM submissions WHERE ticket = ?", (ticket,)).fetchone()
+        if row is None:
+            return None
+        keys = ('ticket', 'documentId', 'status', 'attempts', 'error', 'createdAt', 'updatedAt')
+        return dict(zip(keys, row))
+
+    def pending_count(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM submissions WHERE status = ?", (STATUS_QUEUED,)).fetchone()[0]
+
+    # --- Flusher side ---
+    def start(self):
+        """Starts the flusher thread for this process if it is not already running."""
+        if self._flusher is not None and self._flusher_pid == os.getpid() and self._flusher.is_alive():
+            return
+        with self._start_lock:
+            if self._flusher is not None and self._flusher_pid == os.getpid() and self._flusher.is_alive():
+                return
+            self._stop_event.clear()
+            self._flusher = threading.Thread(target=self._run, name='submission-flusher', daemon=True)
+            self._flusher_pid = os.getpid()
+            self._flusher.start()
+
+    def stop(self, timeout=5.0):
+        self._stop_event.set()
+        self._wakeup.set()
+        if self._flusher is not None and self._flusher_pid == os.getpid():
+            self._flusher.join(timeout)
+
+    def _run(self):
+        backoff = self.flush_interval
+        while not self._stop_event.is_set():
+            try:
+                flushed = self.flush_once()
+                backoff = self.flush_interval
+                if flushed:
+                    continue # Keep draining while there is a backlog
+            except (PyMongoError, RuntimeError) as e:
+                logger.warning("Submission flush failed, retrying in %.1fs: %s", backoff, e)
+                self._stop_event.wait(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+                continue
+            except Exception as e:
+                logger.exception("Unexpected failure in submission flusher: %s", e)
+                self._stop_event.wait(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+                continue
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+
+    def flush_once(self):
+        """
+        Writes the oldest batch of queued documents with one ordered insert_many.
+        Returns the number of journal entries resolved (stored or failed).
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT seq, payload, attempts FROM submissions WHERE status = ? ORDER BY seq LIMIT ?",
+                (STATUS_QUEUED, self.batch_size)).fetchall()
+        if not rows:
+            return 0
+
+        documents = [bson.decode(row[1]) for row in rows]
+        collection = self.get_collection()
+        stored = written = len(rows)
+        failed_index, failed_error = None, None
+        try:
+            # Ordered, so a failure leaves every later document queued and order is preserved.
+            collection.insert_many(documents, ordered=True)
+        except BulkWriteError as e:
+            stored = written = e.details.get('nInserted', 0)
+            write_errors = e.details.get('writeErrors') or []
+            if write_errors:
+                write_error = write_errors[0]
+                failed_index = write_error.get('index', stored)
+                failed_error = write_error.get('errmsg', str(e))
+                if write_error.get('code') == DUPLICATE_KEY_ERROR:
+                    # Written by an earlier attempt; count it as stored and carry on next round.
+                    stored, failed_index = failed_index + 1, None
+            else:
+                # Only a write concern error: no document was rejected. Keep what was inserted,
+                # leave the rest queued; a re-sent duplicate is recognised as stored above.
+                logger.warning("Write concern error after %d of %d journaled submissions: %s",
+                               stored, len(rows), e.details.get('writeConcernErrors'))
+
+        now = datetime.utcnow().isoformat()
+        resolved = stored
+        with self._connect() as conn:
+            conn.executemany(
+                "UPDATE submissions SET status = ?, attempts = attempts + 1, error = NULL, updated_at = ? WHERE seq = ?",
+                [(STATUS_STORED, now, row[0]) for row in rows[:stored]])
+            if failed_index is not None:
+                seq, _, attempts = rows[failed_index]
+                give_up = attempts + 1 >= self.max_attempts
+                conn.execute(
+                    "UPDATE submissions SET status = ?, attempts = attempts + 1, error = ?, updated_at = ? WHERE seq = ?",
+                    (STATUS_FAILED if give_up else STATUS_QUEUED, failed_error, now, seq))
+                if give_up:
+                    logger.error("Giving up on journaled submission %s after %d attempts: %s", seq, attempts + 1, failed_error)
+                    resolved += 1
+
+        if written and self.on_stored is not None:
+            try:
+                self.on_stored(documents[:written])
+            except Exception as e:
+                logger.warning("Post-store hook failed for %d submissions: %s", written, e)
+        return resolved
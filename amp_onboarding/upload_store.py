@@ -0,0 +1,261 @@
+# upload_store.py
+# Content-addressed storage for onboarding documents.
+#
+# Every uploaded file is keyed by the SHA-256 of its bytes and stored once under
+# <UPLOAD_FOLDER>/blobs/<first two hex chars>/<sha256>. Re-uploads of the same
+# certificate only cost a hash pass, never a second write. Reference counts live
+# in the 'upload_blobs' collection and are bumped when an onboarding_forms
+# document that lists the blob in its uploadManifest is inserted.
+#
+# The app never deletes or replaces a stored form (the only delete_one() rolls back
+# a form before its references are added), so counts only go up. If forms are
+# removed outside the app, 'flask verify-uploads --repair' rewrites every refCount
+# from the remaining forms and deletes the blobs nothing references any more.
+
+import os
+import time
+import uuid
+import hashlib
+from datetime import datetime
+from pymongo import UpdateOne
+
+BLOB_SUBFOLDER = 'blobs'
+TMP_SUBFOLDER = 'tmp'
+CHUNK_SIZE = 64 * 1024
+
+
+class FileTooLargeError(ValueError):
+    """Raised when an upload exceeds the configured per-file size cap."""
+
+
+class ContentAddressedStore:
+    """Stores file bodies by SHA-256 under a root directory, one copy per unique content."""
+
+    def __init__(self, root):
+        self.root = root
+        self.blob_dir = os.path.join(root, BLOB_SUBFOLDER)
+        self.tmp_dir = os.path.join(root, TMP_SUBFOLDER)
+        os.makedirs(self.blob_dir, exist_ok=True)
+        os.makedirs(self.tmp_dir, exist_ok=True)
+
+    def relative_path(self, sha256):
+        """Path stored in MongoDB documents, relative to the upload root, forward slashes."""
+        return f"{BLOB_SUBFOLDER}/{sha256[:2]}/{sha256}"
+
+    def absolute_path(self, sha256):
+        return os.path.join(self.blob_dir, sha256[:2], sha256)
+
+    def touch(self, sha256):
+        """
+        Marks an existing blob as just used, so verify_store() does not take it for an
+        old orphan before the form that re-uploaded it is inserted. False if missing.
+        """
+        try:
+            os.utime(self.absolute_path(sha256))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def stage(self, stream, max_size):
+        """
+        First half of a two-phase store: hashes the stream and, if the content is
+        new, writes it to a temp file under tmp/ without making it visible.
+        Returns a dict with 'sha256', 'size', 'path', 'created' (False on dedup hit)
+        and 'tmp_path' (None on dedup hit). Follow with commit() or discard().
+        Raises FileTooLargeError if the stream is larger than max_size.
+        """
+        digest = hashlib.sha256()
+        size = 0
+        stream.seek(0)
+        while True:
+            chunk = stream.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_size:
+                raise FileTooLargeError(f"file exceeds the {max_size} byte limit")
+            digest.update(chunk)
+        sha256 = digest.hexdigest()
+
+        tmp_path = None
+        if not self.touch(sha256):
+            stream.seek(0)
+            tmp_path = self._write_tmp(stream)
+        return {'sha256': sha256, 'size': size, 'path': self.relative_path(sha256),
+                'created': tmp_path is not None, 'tmp_path': tmp_path}
+
+    def commit(self, staged):
+        """Atomically renames a staged temp file into its blob location."""
+        tmp_path = staged.get('tmp_path')
+        if tmp_path is None:
+            return
+        target = self.absolute_path(staged['sha256'])
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        # A concurrent writer of identical content may win the race; either copy is correct.
+        os.replace(tmp_path, target)
+        staged['tmp_path'] = None
+
+    def discard(self, staged):
+        """Removes a staged temp file that will not be committed."""
+        tmp_path = staged.get('tmp_path')
+        if tmp_path is None:
+            return
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        staged['tmp_path'] = None
+
+    def put_path(self, path, sha256=None):
+        """
+        Moves an already-written file (e.g. an assembled chunked upload) into the
+        store. The file is removed if an identical blob already exists.
+        Returns the same dict as stage(), without 'tmp_path'.
+        """
+        if sha256 is None:
+            sha256 = self.hash_file(path)
+        size = os.path.getsize(path)
+        created = False
+        if self.touch(sha256):
+            os.remove(path)
+        else:
+            target = self.absolute_path(sha256)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(path, target)
+            created = True
+        return {'sha256': sha256, 'size': size, 'path': self.relative_path(sha256), 'created': created}
+
+    def _write_tmp(self, stream):
+        """Copies the stream to a new temp file under tmp/ and returns its path."""
+        tmp_path = os.path.join(self.tmp_dir, f"{uuid.uuid4().hex}.part")
+        try:
+            with open(tmp_path, 'wb') as out:
+                while True:
+                    chunk = stream.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    out.write(chunk)
+        except Exception:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        return tmp_path
+
+    def hash_on_disk(self, sha256):
+        """Recomputes the SHA-256 of a stored blob (None if the blob is missing)."""
+        try:
+            return self.hash_file(self.absolute_path(sha256))
+        except FileNotFoundError:
+            return None
+
+    @staticmethod
+    def hash_file(path):
+        """SHA-256 hex digest of a file on disk."""
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def age_seconds(self, sha256):
+        try:
+            return time.time() - os.path.getmtime(self.absolute_path(sha256))
+        except FileNotFoundError:
+            return 0
+
+    def iter_blobs(self):
+        """Yields the hash of every blob present on disk."""
+        for prefix in os.listdir(self.blob_dir):
+            prefix_dir = os.path.join(self.blob_dir, prefix)
+            if not os.path.isdir(prefix_dir):
+                continue
+            for name in os.listdir(prefix_dir):
+                yield name
+
+    def delete(self, sha256):
+        try:
+            os.remove(self.absolute_path(sha256))
+            return True
+        except FileNotFoundError:
+            return False
+
+
+# --- Reference Counting ---
+def manifest_hashes(manifest):
+    """Counts how many times each blob is referenced by one uploadManifest."""
+    counts = {}
+    for entry in manifest or []:
+        sha256 = entry.get('sha256')
+        if sha256:
+            counts[sha256] = counts.get(sha256, 0) + 1
+    return counts
+
+
+def add_references(blob_collection, manifest):
+    """Increments reference counts for every blob listed in an uploadManifest."""
+    sizes = {entry['sha256']: entry.get('size') for entry in manifest or [] if entry.get('sha256')}
+    now = datetime.utcnow()
+    operations = [
+        UpdateOne(
+            {'_id': sha256},
+            {'$inc': {'refCount': count},
+             '$set': {'lastReferencedAt': now},
+             '$setOnInsert': {'size': sizes.get(sha256), 'createdAt': now}},
+            upsert=True,
+        )
+        for sha256, count in manifest_hashes(manifest).items()
+    ]
+    if operations:
+        blob_collection.bulk_write(operations, ordered=False)
+    return len(operations)
+
+
+def verify_store(store, blob_collection, forms_collection, repair=False, min_orphan_age=3600, pinned=()):
+    """
+    Cross-checks blobs on disk, the upload_blobs reference counts, and the
+    references actually held by onboarding_forms documents.
+
+    Returns a report dict with lists of 'missing' (referenced but not on disk),
+    'corrupt' (content does not match its hash), 'orphaned' (on disk but
+    unreferenced) and 'refcount_fixed' hashes. With repair=True, reference counts
+    are rewritten from the forms and orphaned blobs are deleted. Blobs younger
+    than min_orphan_age seconds are never reported as orphaned, since their
+    submission may still be in flight; hashes in 'pinned' (e.g. finalized
+    chunked uploads not yet submitted) are never orphaned either.
+    """
+    pinned = set(pinned)
+    expected = {}
+    for doc in forms_collection.find({'uploadManifest.sha256': {'$exists': True}}, {'uploadManifest': 1}):
+        for sha256, count in manifest_hashes(doc.get('uploadManifest')).items():
+            expected[sha256] = expected.get(sha256, 0) + count
+
+    recorded = {doc['_id']: doc.get('refCount', 0) for doc in blob_collection.find({}, {'refCount': 1})}
+    on_disk = set(store.iter_blobs())
+
+    report = {'checked': len(on_disk), 'missing': [], 'corrupt': [], 'orphaned': [], 'refcount_fixed': []}
+    for sha256 in sorted(expected):
+        if sha256 not in on_disk:
+            report['missing'].append(sha256)
+    for sha256 in sorted(on_disk):
+        if store.hash_on_disk(sha256) != sha256:
+            report['corrupt'].append(sha256)
+        elif sha256 not in expected and sha256 not in pinned and store.age_seconds(sha256) >= min_orphan_age:
+            report['orphaned'].append(sha256)
+    for sha256 in sorted(set(expected) | set(recorded)):
+        if expected.get(sha256, 0) != recorded.get(sha256, 0):
+            report['refcount_fixed'].append(sha256)
+
+    if repair:
+        operations = [
+            UpdateOne({'_id': sha256}, {'$set': {'refCount': expected.get(sha256, 0)}}, upsert=True)
+            for sha256 in report['refcount_fixed']
+        ]
+        if operations:
+            blob_collection.bulk_write(operations, ordered=False)
+        for sha256 in report['orphaned']:
+            store.delete(sha256)
+        blob_collection.delete_many({'_id': {'$in': report['orphaned']}})
+
+    return report
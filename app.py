@@ -2,46 +2,53 @@ from flask import Flask, render_template, request, redirect, url_for
 from pymongo import MongoClient
 import os
 import pymongo
-import logging
 from bson import ObjectId  # Import ObjectId
 from dotenv import load_dotenv
+from applog import setup_logging, PII
 
 load_dotenv()
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY')
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG,
-                    format='%(asctime)s - %(levelname)s - %(message)s')
+# Configure logging (queued, sampled and rate-limited; see applog.py and LOG_* env vars)
+logger = setup_logging('job_application')
 
 # MongoDB Configuration
 MONGO_URI = os.environ.get('MONGO_URI')
 DATABASE_NAME = "job_application_db"
 
-try:
-    client = MongoClient(MONGO_URI)
-    db = client[DATABASE_NAME]
-    applications_collection = db["applications"]
-    logging.info("Connected to MongoDB successfully!")
+_db_pid = None # Process that opened the client; a forked worker must open its own
+
+def init_db():
+    """Connects to MongoDB and binds applications_collection for this process. Exits on failure."""
+    global client, db, applications_collection, _db_pid
+    _db_pid = os.getpid()
     try:
-        client.admin.command('ping')
-        logging.info("Successfully pinged MongoDB server!")
+        client = MongoClient(MONGO_URI)
+        db = client[DATABASE_NAME]
+        applications_collection = db["applications"]
+        logger.info("Connected to MongoDB successfully!")
+        try:
+            client.admin.command('ping')
+            logger.info("Successfully pinged MongoDB server!")
+        except Exception as e:
+            logger.error(f"Failed to ping MongoDB server: {e}")
+            exit()
     except Exception as e:
-        logging.error(f"Failed to ping MongoDB server: {e}")
+        logger.error(f"Error connecting to MongoDB: {e}")
         exit()
-except Exception as e:
-    logging.error(f"Error connecting to MongoDB: {e}")
-    exit()
+
+init_db()
 
 @app.route('/', methods=['GET', 'POST'])
 def job_application_form():
-    logging.debug("Received request to job_application_form")
+    logger.debug("Received request to job_application_form")
 
     if request.method == 'POST':
-        logging.debug("Received POST request")
+        logger.debug("Received POST request")
         form_data = request.form.to_dict()
-        logging.debug(f"Form data: {form_data}")
+        logger.debug("Form data: %s", form_data, extra=PII)
 
         # Server-side data validation - Add more as needed!!
         required_fields = [
@@ -63,18 +70,18 @@ def job_application_form():
         try:
             # Insert the form data into MongoDB
             result = applications_collection.insert_one(form_data)
-            logging.info("Form data saved to MongoDB")
+            logger.info("Form data saved to MongoDB")
             inserted_id = result.inserted_id
-            logging.debug(f"Inserted document ID: {inserted_id}")
+            logger.debug("Inserted document ID: %s", inserted_id)
             return redirect(url_for('success', id=str(inserted_id)))  #Pass inserted_id to success
         except pymongo.errors.ConnectionFailure as e:
-            logging.exception("MongoDB connection failure")
+            logger.exception("MongoDB connection failure")
             return render_template('form.html', error="Failed to connect to MongoDB. Please check your connection.", **form_data)
         except pymongo.errors.OperationFailure as e:
-            logging.exception("MongoDB operation failure")
+            logger.exception("MongoDB operation failure")
             return render_template('form.html', error=f"MongoDB operation failed: {e}",  **form_data)
         except Exception as e:
-            logging.exception("General error saving to MongoDB")
+            logger.exception("General error saving to MongoDB")
             return render_template('form.html', error="An unexpected error occurred while saving data.", **form_data)
 
     return render_template('form.html')
@@ -82,10 +89,10 @@ def job_application_form():
 @app.route('/success')
 def success():
     inserted_id = request.args.get('id')
-    logging.debug(f"Displaying success page for ID: {inserted_id}")
+    logger.debug("Displaying success page for ID: %s", inserted_id)
 
     if not inserted_id:
-        logging.warning("No ID provided in success route")
+        logger.warning("No ID provided in success route")
         return "Error: No ID provided", 400
 
     try:
@@ -93,14 +100,20 @@ def success():
         application = applications_collection.find_one({"_id": ObjectId(inserted_id)})
 
         if application:
-            logging.debug(f"Application data found: {application}")
+            logger.debug("Application data found: %s", application, extra=PII)
             return render_template('success.html', application=application)
         else:
-            logging.warning(f"Application not found with ID: {inserted_id}")
+            logger.warning(f"Application not found with ID: {inserted_id}")
             return "Error: Application not found", 404
     except Exception as e:
-        logging.exception("Error fetching data from MongoDB")
+        logger.exception("Error fetching data from MongoDB")
         return "Error fetching data from MongoDB", 500
 
+def create_app():
+    """Application factory for the pre-forking launcher (serve.py); reconnects in a forked worker."""
+    if _db_pid != os.getpid():
+        init_db()
+    return app
+
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
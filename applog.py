@@ -0,0 +1,264 @@
+# applog.py
+# Shared logging setup for the Flask apps in this repository.
+#
+# Request threads only filter a record and put it on a bounded in-memory queue;
+# a background QueueListener thread formats it and writes to stderr. Filtering
+# happens before the enqueue, so dropped records cost almost nothing:
+#   - PII:      records logged with extra=PII (form dumps, request payloads) are
+#               dropped unless LOG_PII=1. Keep it off in production.
+#   - Sampling: LOG_SAMPLE="werkzeug=0.1,Trail3=0.5" keeps that fraction of a
+#               logger's DEBUG/INFO records. WARNING and above are never sampled.
+#   - Rate limiting: at most LOG_RATE_LIMIT records with the same logger, level and
+#               formatted message per LOG_RATE_WINDOW seconds; a summary of what
+#               was suppressed is logged when the window rolls over. ERROR and
+#               above are never rate limited.
+# If the queue is full the record is dropped rather than blocking the request, and
+# the number of dropped records is reported by the listener.
+#
+# Environment:
+#   LOG_LEVEL   (INFO)     LOG_FORMAT (text | json)   LOG_PII (0)
+#   LOG_SAMPLE  ('')       LOG_RATE_LIMIT (20)        LOG_RATE_WINDOW (10)
+#   LOG_QUEUE_SIZE (10000)
+#
+# Usage:
+#   from applog import setup_logging, PII
+#   logger = setup_logging('Trail3')
+#   logger.info("Received submission: %s", data, extra=PII)
+
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import random
+import logging
+import threading
+import logging.handlers
+from datetime import datetime, timezone
+
+PII = {'pii': True} # Pass as extra=PII on log calls that dump user-submitted data
+
+TEXT_FORMAT = '%(asctime)s [%(levelname)s] %(name)s: %(message)s'
+
+
+def _env_flag(name, default='0'):
+    return os.getenv(name, default).lower() in ['1', 'true', 'yes']
+
+
+def _parse_sample_rates(spec):
+    """'werkzeug=0.1,Trail3=0.5' -> {'werkzeug': 0.1, 'Trail3': 0.5}"""
+    rates = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        name, _, rate = item.partition('=')
+        try:
+            rates[name.strip()] = min(max(float(rate), 0.0), 1.0)
+        except ValueError:
+            print(f"Warning: Ignoring invalid LOG_SAMPLE entry '{item}'", file=sys.stderr)
+    return rates
+
+
+# --- Filters (run on the calling thread, before the record is queued) ---
+class PiiFilter(logging.Filter):
+    """Drops records marked with extra=PII unless PII logging is enabled."""
+
+    def __init__(self, allow_pii):
+        super().__init__()
+        self.allow_pii = allow_pii
+
+    def filter(self, record):
+        return self.allow_pii or not getattr(record, 'pii', False)
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps a fraction of DEBUG/INFO records per logger name (and its children)."""
+
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = rates
+        self._cache = {}
+
+    def _rate(self, name):
+        rate = self._cache.get(name)
+        if rate is None:
+            rate, probe = 1.0, name
+            while probe:
+                if probe in self.rates:
+                    rate = self.rates[probe]
+                    break
+                probe = probe.rpartition('.')[0]
+            self._cache[name] = rate
+        return rate
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or not self.rates:
+            return True
+        rate = self._rate(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+
+class RateLimitFilter(logging.Filter):
+    """Lets through at most 'limit' identical records (logger, level, formatted message) per window; never ERROR and above."""
+
+    def __init__(self, limit, window):
+        super().__init__()
+        self.limit = limit
+        self.window = window
+        self._lock = threading.Lock()
+        self._window_start = time.monotonic()
+        self._counts = {}
+
+    def filter(self, record):
+        if self.limit <= 0 or record.levelno >= logging.ERROR:
+            return True
+        try:
+            message = record.getMessage() # Same template with other arguments is a different record
+        except Exception:
+            message = record.msg # Bad arguments; let the handler report it
+        key = (record.name, record.levelno, message)
+        now = time.monotonic()
+        with self._lock:
+            if now - self._window_start >= self.window:
+                suppressed = {k: n - self.limit for k, n in self._counts.items() if n > self.limit}
+                self._counts = {}
+                self._window_start = now
+                if suppressed:
+                    total = sum(suppressed.values())
+                    record.suppressed = f"{total} repeated record(s) suppressed in the last {self.window:g}s"
+            count = self._counts.get(key, 0) + 1
+            self._counts[key] = count
+        return count <= self.limit
+
+
+# --- Handlers and formatting ---
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops (and counts) records instead of blocking when the queue is full."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Merge args into the message now (they may be mutated after this call returns),
+        # but leave level/timestamp/JSON formatting to the listener thread.
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, msg, plus exc/suppressed when present."""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+            'pid': record.process,
+            'thread': record.threadName,
+        }
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        if getattr(record, 'suppressed', None):
+            entry['suppressed'] = record.suppressed
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record):
+        text = super().format(record)
+        if getattr(record, 'suppressed', None):
+            text += f" [{record.suppressed}]"
+        return text
+
+
+class _DropReporter(logging.Handler):
+    """Runs on the listener thread; reports records the queue had to drop."""
+
+    def __init__(self, queue_handler, target):
+        super().__init__()
+        self.queue_handler = queue_handler
+        self.target = target
+        self._reported = 0
+
+    def emit(self, record):
+        dropped = self.queue_handler.dropped
+        if dropped > self._reported:
+            notice = logging.makeLogRecord({
+                'name': 'applog', 'levelno': logging.WARNING, 'levelname': 'WARNING',
+                'msg': f"Log queue full: dropped {dropped - self._reported} record(s)",
+            })
+            self._reported = dropped
+            self.target.handle(notice)
+        self.target.handle(record)
+
+
+_listener = None
+_queue_handler = None
+_setup_lock = threading.Lock()
+
+
+def _start_listener(target):
+    global _listener
+    _listener = logging.handlers.QueueListener(_queue_handler.queue, _DropReporter(_queue_handler, target))
+    _listener.start()
+
+
+def _restart_after_fork(target):
+    _queue_handler.queue = queue.Queue(_queue_handler.queue.maxsize)
+    _queue_handler.dropped = 0
+    _start_listener(target)
+
+
+def setup_logging(app_name, level=None, stream=None):
+    """
+    Routes the root logger through the shared non-blocking queue and returns
+    logging.getLogger(app_name). Safe to call more than once; later calls only
+    return the named logger.
+    """
+    global _queue_handler
+    with _setup_lock:
+        if _queue_handler is None:
+            level = level or os.getenv('LOG_LEVEL', 'INFO').upper()
+            target = logging.StreamHandler(stream or sys.stderr)
+            target.setFormatter(JsonFormatter() if os.getenv('LOG_FORMAT', 'text').lower() == 'json'
+                                else TextFormatter(TEXT_FORMAT))
+
+            _queue_handler = NonBlockingQueueHandler(queue.Queue(int(os.getenv('LOG_QUEUE_SIZE', 10000))))
+            _queue_handler.addFilter(PiiFilter(_env_flag('LOG_PII')))
+            _queue_handler.addFilter(SamplingFilter(_parse_sample_rates(os.getenv('LOG_SAMPLE', ''))))
+            _queue_handler.addFilter(RateLimitFilter(int(os.getenv('LOG_RATE_LIMIT', 20)),
+                                                     float(os.getenv('LOG_RATE_WINDOW', 10))))
+
+            root = logging.getLogger()
+            for handler in list(root.handlers):
+                root.removeHandler(handler)
+            root.addHandler(_queue_handler)
+            root.setLevel(level)
+
+            _start_listener(target)
+            atexit.register(shutdown_logging)
+            # The listener thread does not survive fork; pre-forked workers need their own
+            # (with a fresh queue, in case the parent's listener held its lock mid-fork).
+            if hasattr(os, 'register_at_fork'):
+                os.register_at_fork(after_in_child=lambda: _restart_after_fork(target))
+    return logging.getLogger(app_name)
+
+
+def shutdown_logging():
+    """Flushes queued records and stops the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,85 @@
+# bench_logging.py
+# Request-latency overhead of logging, before and after applog.py. A small Flask
+# app logs the way the apps in this repository do on every POST (a DEBUG dump of
+# the submitted form plus a few INFO lines) and is driven through the test client.
+# Log output goes to a real file so the synchronous write cost is included.
+#
+# Modes (each runs in its own subprocess, since logging is configured per process):
+#   none          logging disabled, the floor
+#   sync-debug    logging.basicConfig(level=DEBUG), as root app.py and Trail1 did
+#   applog        setup_logging() with defaults (INFO, PII dumps dropped)
+#   applog-debug  setup_logging() at DEBUG with LOG_PII=1 (everything logged, off-thread)
+#
+# Usage:
+#   python bench_logging.py
+#   BENCH_REQUESTS=20000 python bench_logging.py
+
+import os
+import sys
+import time
+import logging
+import tempfile
+import statistics
+import subprocess
+
+# --- Configuration ---
+REQUESTS = int(os.getenv('BENCH_REQUESTS', 5000))
+MODES = ['none', 'sync-debug', 'applog', 'applog-debug']
+FORM = {f'field{i}': f'value {i} ' * 8 for i in range(40)} # Roughly the size of the onboarding forms
+
+
+def run_mode(mode, log_path):
+    """Runs REQUESTS POSTs in this process and prints 'mean p50 p99' in microseconds."""
+    if mode == 'sync-debug':
+        logging.basicConfig(level=logging.DEBUG, filename=log_path,
+                            format='%(asctime)s - %(levelname)s - %(message)s')
+    elif mode.startswith('applog'):
+        if mode == 'applog-debug':
+            os.environ['LOG_LEVEL'] = 'DEBUG'
+            os.environ['LOG_PII'] = '1'
+        os.environ['LOG_RATE_LIMIT'] = '0' # Every request logs the same lines; measure without suppression
+        from applog import setup_logging, shutdown_logging
+        setup_logging('bench', stream=open(log_path, 'a'))
+    else:
+        logging.disable(logging.CRITICAL)
+
+    from flask import Flask, request
+    from applog import PII
+    app = Flask(__name__)
+
+    @app.route('/', methods=['POST'])
+    def submit():
+        logging.debug("Received POST request")
+        form_data = request.form.to_dict()
+        logging.debug("Form data: %s", form_data, extra=PII)
+        logging.info("Form data saved to MongoDB")
+        logging.debug("Inserted document ID: %s", 'bench')
+        return 'ok'
+
+    client = app.test_client()
+    samples = []
+    for _ in range(REQUESTS):
+        began = time.perf_counter()
+        client.post('/', data=FORM)
+        samples.append((time.perf_counter() - began) * 1e6)
+    samples.sort()
+    print(f"{statistics.mean(samples):.1f} {statistics.median(samples):.1f} {samples[int(len(samples) * 0.99)]:.1f}")
+    if mode.startswith('applog'):
+        shutdown_logging()
+
+
+if __name__ == '__main__':
+    if len(sys.argv) == 3:
+        run_mode(sys.argv[1], sys.argv[2])
+        sys.exit(0)
+
+    print(f"{REQUESTS} POST requests per mode\n")
+    print(f"{'mode':<16}{'mean us':>10}{'p50 us':>10}{'p99 us':>10}{'log bytes':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in MODES:
+            log_path = os.path.join(tmp, f'{mode}.log')
+            open(log_path, 'w').close()
+            result = subprocess.run([sys.executable, __file__, mode, log_path],
+                                    capture_output=True, text=True, check=True)
+            mean, p50, p99 = result.stdout.split()
+            print(f"{mode:<16}{mean:>10}{p50:>10}{p99:>10}{os.path.getsize(log_path):>12}")
@@ -0,0 +1,113 @@
+# bench_workers.py
+# Throughput of serve.py at different worker counts. For each count it starts
+# the launcher in a subprocess, waits for the port, then drives one URL with a
+# fixed number of concurrent client threads for a fixed time and reports
+# requests/second and latency percentiles.
+#
+# Usage (Linux/macOS, needs the app's MongoDB for DB-backed URLs):
+#   python bench_workers.py Trail_leave --path /api/leaves
+#   python bench_workers.py Trail3 --path /view_requests --workers 1 2 4 8 --threads 4
+
+import os
+import sys
+import time
+import signal
+import socket
+import argparse
+import threading
+import subprocess
+import statistics
+import http.client
+
+# --- Configuration ---
+DEFAULT_WORKER_COUNTS = [1, 2, 4, 8]
+BOOT_TIMEOUT = 60 # Seconds to wait for the launcher to accept connections
+
+
+def wait_for_port(host, port, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=1):
+                return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+def drive(host, port, path, concurrency, duration):
+    """Runs 'concurrency' client threads for 'duration' seconds. Returns (latencies, errors)."""
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+
+    def client():
+        local, failed = [], 0
+        while time.monotonic() < stop_at:
+            began = time.perf_counter()
+            try:
+                conn = http.client.HTTPConnection(host, port, timeout=30)
+                conn.request('GET', path)
+                response = conn.getresponse()
+                response.read()
+                conn.close()
+                if response.status >= 500:
+                    failed += 1
+                    continue
+            except OSError:
+                failed += 1
+                continue
+            local.append(time.perf_counter() - began)
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    return latencies, errors[0]
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def bench(options, workers):
+    command = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'serve.py'),
+               options.app_dir, '--host', '127.0.0.1', '--port', str(options.port),
+               '--workers', str(workers), '--threads', str(options.threads)]
+    launcher = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        if not wait_for_port('127.0.0.1', options.port, BOOT_TIMEOUT):
+            raise RuntimeError(f"serve.py did not start listening on port {options.port}")
+        time.sleep(options.warmup) # Let every worker finish importing the app
+        latencies, errors = drive('127.0.0.1', options.port, options.path, options.concurrency, options.duration)
+    finally:
+        launcher.send_signal(signal.SIGTERM)
+        launcher.wait(timeout=60)
+
+    latencies_ms = sorted(l * 1000 for l in latencies)
+    if not latencies_ms:
+        print(f"{workers:<10}{'no successful requests':>40}{errors:>10}")
+        return
+    print(f"{workers:<10}{len(latencies_ms) / options.duration:>12.1f}"
+          f"{statistics.median(latencies_ms):>10.2f}{percentile(latencies_ms, 0.95):>10.2f}"
+          f"{percentile(latencies_ms, 0.99):>10.2f}{errors:>10}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare serve.py throughput across worker counts.")
+    parser.add_argument('app_dir')
+    parser.add_argument('--path', default='/')
+    parser.add_argument('--workers', type=int, nargs='+', default=DEFAULT_WORKER_COUNTS)
+    parser.add_argument('--threads', type=int, default=1)
+    parser.add_argument('--concurrency', type=int, default=32, help="Concurrent client threads")
+    parser.add_argument('--duration', type=float, default=10.0, help="Seconds per worker count")
+    parser.add_argument('--warmup', type=float, default=2.0)
+    parser.add_argument('--port', type=int, default=8765)
+    options = parser.parse_args()
+
+    print(f"GET {options.path} on '{options.app_dir}', {options.concurrency} clients, {options.duration:.0f}s per run\n")
+    print(f"{'workers':<10}{'req/s':>12}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>10}")
+    for count in options.workers:
+        bench(options, count)
@@ -0,0 +1,238 @@
+# event_bus.py
+# Server-sent events for the WFH dashboards (Trail2 /, Trail3 /view_requests).
+#
+# Writers call bus.publish(kind, data) after a successful write, and every open
+# GET /events stream receives it as
+#     id: <event id>
+#     event: <kind>            request.created, request.status
+#     data: <json>
+# so a dashboard keeps one connection open instead of reloading (and re-querying)
+# the whole list to notice changes. /events is not authenticated and, in mongo mode,
+# every event is also stored in MongoDB, so a new request is published as
+# request_summary(document): only the fields the dashboards render or filter on,
+# never contact details such as the email address.
+#
+# Fan-out across processes (EVENT_BUS):
+#   local (default)  in-process only: streams of a worker see what that worker
+#                    published. Enough for a single-process server.
+#   mongo            publish() appends to the capped collection 'request_events'.
+#                    Every process tails it with one tailable cursor and hands the
+#                    events to its own streams, so all workers, and Trail2 and
+#                    Trail3 (same database), see every event. Works on a standalone
+#                    mongod; change streams would need a replica set.
+#
+# Every stream has a bounded queue. A client too slow to drain it is disconnected;
+# EventSource reconnects by itself, sending Last-Event-ID, and the events it missed
+# are replayed: the last EVENT_REPLAY from memory (local), or from the capped
+# collection (mongo). Each open stream holds one server thread for as long as it is
+# open, so run the apps with serve.py --threads N, N above the streams expected per
+# worker (a worker never runs more than N requests at once); at most
+# EVENT_MAX_CLIENTS streams per process.
+#
+# Usage:
+#   bus = EventBus()
+#   bus.attach(db)                               # in init_db(); no-op unless EVENT_BUS=mongo
+#   bus.publish('request.created', request_summary(document))  # after the insert
+#   @app.route('/events')
+#   def events(): return event_stream_response(bus)
+
+import os
+import json
+import time
+import queue
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+from bson import ObjectId
+from bson.errors import InvalidId
+from flask import Response, request, jsonify
+from pymongo import CursorType
+from pymongo.errors import CollectionInvalid, PyMongoError
+
+EVENT_BUS = os.getenv('EVENT_BUS', 'local').lower() # 'local' or 'mongo'
+EVENT_COLLECTION = 'request_events'
+EVENT_COLLECTION_BYTES = int(os.getenv('EVENT_COLLECTION_BYTES', 16 * 1024 * 1024)) # Size of the capped collection
+EVENT_REPLAY = int(os.getenv('EVENT_REPLAY', 1000))       # Events kept in memory for reconnecting clients
+EVENT_QUEUE_SIZE = int(os.getenv('EVENT_QUEUE_SIZE', 256)) # Undelivered events per stream before it is dropped
+EVENT_MAX_CLIENTS = int(os.getenv('EVENT_MAX_CLIENTS', 100))
+HEARTBEAT_SECONDS = 15 # Comment lines keep proxies from closing idle streams
+RETRY_MS = 3000        # Reconnect delay suggested to EventSource
+
+_DISCONNECT = object() # Queued to a stream that fell too far behind
+
+# Request fields sent with 'request.created': the Trail2 cards plus the Trail3 filters
+REQUEST_EVENT_FIELDS = ('_id', 'reqId', 'name', 'employeeId', 'project', 'manager', 'location',
+                        'fromDate', 'toDate', 'reason', 'status', 'submittedAt')
+
+
+def _json_default(value):
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat() + ('Z' if value.tzinfo is None else '')
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def request_summary(document):
+    """The publishable part of a WFH request document (see REQUEST_EVENT_FIELDS)."""
+    return {field: document[field] for field in REQUEST_EVENT_FIELDS if field in document}
+
+
+def format_event(event):
+    event_id, kind, payload = event
+    return f"id: {event_id}\nevent: {kind}\ndata: {payload}\n\n"
+
+
+class EventBus:
+    """In-process publish/subscribe of (id, kind, json payload) events, optionally fanned out through MongoDB."""
+
+    def __init__(self, replay=EVENT_REPLAY, queue_size=EVENT_QUEUE_SIZE, max_clients=EVENT_MAX_CLIENTS):
+        self.queue_size = queue_size
+        self.max_clients = max_clients
+        self._subscribers = set()
+        self._recent = deque(maxlen=replay)
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self._collection = None # Set by attach() in mongo mode
+        self._tail_pid = None
+        self.published = self.dropped = 0
+
+    # --- Cross-process fan-out ---
+    def attach(self, db, mode=None):
+        """Switches to MongoDB fan-out when EVENT_BUS=mongo; call from init_db() in every process."""
+        if (mode or EVENT_BUS) != 'mongo' or self._tail_pid == os.getpid():
+            return
+        try:
+            try:
+                db.create_collection(EVENT_COLLECTION, capped=True, size=EVENT_COLLECTION_BYTES)
+            except CollectionInvalid:
+                pass # Created by another process
+            newest = db[EVENT_COLLECTION].find_one({}, {'_id': 1}, sort=[('$natural', -1)])
+        except PyMongoError as e:
+            logging.warning(f"Event fan-out through MongoDB unavailable, streams only see this process: {e}")
+            return
+        self._collection = db[EVENT_COLLECTION]
+        self._tail_pid = os.getpid()
+        thread = threading.Thread(target=self._tail, args=(newest['_id'] if newest else None,),
+                                  name='event-bus-tail', daemon=True)
+        thread.start()
+
+    def _tail(self, last_id):
+        """Hands every event appended to the capped collection to this process's streams."""
+        while True:
+            try:
+                query = {'_id': {'$gt': last_id}} if last_id else {}
+                cursor = self._collection.find(query, cursor_type=CursorType.TAILABLE_AWAIT)
+                while cursor.alive:
+                    for doc in cursor:
+                        last_id = doc['_id']
+                        self._deliver((str(doc['_id']), doc['kind'], doc['payload']))
+                time.sleep(0.5) # Cursor died (empty collection, or it wrapped); reopen
+            except PyMongoError as e:
+                logging.warning(f"Event bus tail interrupted, retrying: {e}")
+                time.sleep(1)
+
+    # --- Publishing ---
+    def publish(self, kind, data):
+        """Sends one event to every open stream. Never raises: events are best effort."""
+        payload = json.dumps(data, default=_json_default, separators=(',', ':'))
+        self.published += 1
+        if self._collection is not None:
+            try:
+                self._collection.insert_one({'kind': kind, 'payload': payload}) # Delivered by _tail()
+                return
+            except PyMongoError as e:
+                logging.warning(f"Could not publish {kind} through MongoDB, delivering locally only: {e}")
+        with self._lock:
+            self._next_id += 1
+            event_id = str(self._next_id)
+        self._deliver((event_id, kind, payload))
+
+    def _deliver(self, event):
+        with self._lock:
+            self._recent.append(event)
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(event)
+            except queue.Full:
+                self._disconnect(subscriber)
+
+    def _disconnect(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+            self.dropped += 1
+        while True: # Make room for the marker; the client replays what it missed on reconnect
+            try:
+                subscriber.get_nowait()
+            except queue.Empty:
+                break
+        subscriber.put_nowait(_DISCONNECT)
+
+    # --- Subscribing ---
+    def subscribe(self):
+        """A new stream's queue, or None when EVENT_MAX_CLIENTS streams are open."""
+        subscriber = queue.Queue(self.queue_size)
+        with self._lock:
+            if len(self._subscribers) >= self.max_clients:
+                return None
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def replay(self, last_event_id):
+        """Events after last_event_id, oldest first."""
+        if self._collection is not None:
+            try:
+                after = ObjectId(last_event_id)
+            except (InvalidId, TypeError):
+                return []
+            docs = self._collection.find({'_id': {'$gt': after}}).limit(self._recent.maxlen)
+            return [(str(doc['_id']), doc['kind'], doc['payload']) for doc in docs]
+        try:
+            after = int(last_event_id)
+        except (TypeError, ValueError):
+            return []
+        with self._lock:
+            return [event for event in self._recent if int(event[0]) > after]
+
+    def stream(self, subscriber, last_event_id=None, heartbeat=HEARTBEAT_SECONDS):
+        """Generator of SSE text for one subscriber; unsubscribes when the client goes away."""
+        try:
+            yield f"retry: {RETRY_MS}\n\n"
+            replayed = set()
+            if last_event_id:
+                for event in self.replay(last_event_id):
+                    replayed.add(event[0])
+                    yield format_event(event)
+            while True:
+                try:
+                    event = subscriber.get(timeout=heartbeat)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+                if event is _DISCONNECT:
+                    return
+                if event[0] not in replayed:
+                    yield format_event(event)
+        finally:
+            self.unsubscribe(subscriber)
+
+
+def event_stream_response(bus):
+    """Flask response for GET /events."""
+    subscriber = bus.subscribe() # Before replaying, so nothing published meanwhile is lost
+    if subscriber is None:
+        response = jsonify({"success": False, "message": "Too many open event streams."})
+        response.status_code = 503
+        response.headers['Retry-After'] = str(RETRY_MS // 1000)
+        return response
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('lastEventId')
+    response = Response(bus.stream(subscriber, last_event_id), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no' # Tell nginx not to buffer the stream
+    return response
@@ -0,0 +1,220 @@
+# http_cache.py
+# Conditional GET and a short-lived response cache for list endpoints backed by
+# one MongoDB collection (Trail_leave /api/leaves, Trail3 /view_requests).
+#
+# Every write to the collection calls CollectionVersion.bump(), which increments a
+# counter stored in a small 'collection_versions' collection, so all worker
+# processes see the same value. A GET then costs one lookup by _id:
+#   - ETag:          strong, derived from the version, path and query string
+#   - Last-Modified: when the version was bumped. Versions get distinct seconds
+#                    (a bump within the same second moves it one second on), so
+#                    If-Modified-Since is exact.
+#   - If the client's If-None-Match / If-Modified-Since still match, the answer is
+#     304 and the view (and its collection scan) does not run.
+#   - Otherwise a response rendered for the same version and query within the last
+#     RESPONSE_CACHE_TTL seconds is served from memory.
+# Writes that bypass the app (mongo shell, scripts) do not bump the version; call
+# bump() after them, or wait for the TTL to expire the in-process cache.
+#
+# FragmentCache keeps rendered HTML fragments (Trail2's request list) keyed by
+# (name, version): a new version misses and re-renders, and the fragments of older
+# versions age out of the LRU. Entries also expire after RESPONSE_CACHE_TTL
+# seconds, which bounds staleness in every worker when a bump() fails.
+#
+# Usage:
+#   from http_cache import CollectionVersion, ResponseCache, conditional_get
+#   leaves_version = CollectionVersion(db['collection_versions'], 'applications')
+#   @app.route('/api/leaves')
+#   @conditional_get(lambda: leaves_version, ResponseCache())
+#   def get_leaves(): ...
+
+import os
+import time
+import hashlib
+import threading
+import functools
+from collections import OrderedDict
+from datetime import datetime, timezone
+from flask import request, make_response
+from pymongo import ReturnDocument
+from pymongo.errors import PyMongoError
+
+RESPONSE_CACHE_TTL = float(os.getenv('RESPONSE_CACHE_TTL', 5)) # Seconds; 0 disables the response cache
+RESPONSE_CACHE_ENTRIES = int(os.getenv('RESPONSE_CACHE_ENTRIES', 256))
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv('RESPONSE_CACHE_MAX_BYTES', 5 * 1024 * 1024)) # Larger bodies are not cached
+FRAGMENT_CACHE_ENTRIES = int(os.getenv('FRAGMENT_CACHE_ENTRIES', 8))
+FRAGMENT_CACHE_MAX_BYTES = int(os.getenv('FRAGMENT_CACHE_MAX_BYTES', 16 * 1024 * 1024)) # Total, across entries
+
+
+class CollectionVersion:
+    """Write counter for one collection, shared by every process through MongoDB."""
+
+    def __init__(self, meta_collection, name):
+        self.meta = meta_collection
+        self.name = name
+
+    def bump(self):
+        """Call after every write to the collection. Returns (version, updated_at)."""
+        now = datetime.now(timezone.utc).replace(microsecond=0)
+        doc = self.meta.find_one_and_update(
+            {'_id': self.name},
+            [{'$set': {
+                'version': {'$add': [{'$ifNull': ['$version', 0]}, 1]},
+                # Whole seconds (HTTP dates have no fractions), strictly increasing per version
+                'updatedAt': {'$max': [now, {'$add': ['$updatedAt', 1000]}]},
+            }}],
+            upsert=True, return_document=ReturnDocument.AFTER)
+        return doc['version'], _utc(doc['updatedAt'])
+
+    def current(self):
+        """(version, updated_at); starts the counter on first use."""
+        doc = self.meta.find_one({'_id': self.name})
+        if doc is None:
+            return self.bump()
+        return doc['version'], _utc(doc['updatedAt'])
+
+
+def _utc(value):
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+class ResponseCache:
+    """Small LRU of rendered responses, valid for one collection version and at most 'ttl' seconds."""
+
+    def __init__(self, ttl=RESPONSE_CACHE_TTL, max_entries=RESPONSE_CACHE_ENTRIES, max_bytes=RESPONSE_CACHE_MAX_BYTES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict() # key -> (version, stored_at, body, status, headers)
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version or time.monotonic() - entry[1] >= self.ttl:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, version, response):
+        if self.ttl <= 0 or response.content_length is None or response.content_length > self.max_bytes:
+            return
+        entry = (version, time.monotonic(), response.get_data(), response.status_code, list(response.headers))
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class FragmentCache:
+    """LRU of rendered fragments keyed by (name, collection version), bounded in age, entries and total bytes."""
+
+    def __init__(self, ttl=RESPONSE_CACHE_TTL, max_entries=FRAGMENT_CACHE_ENTRIES, max_bytes=FRAGMENT_CACHE_MAX_BYTES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict() # (name, version) -> (stored_at, html)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, name, version):
+        with self._lock:
+            entry = self._entries.get((name, version))
+            if entry is None or time.monotonic() - entry[0] >= self.ttl:
+                self.misses += 1
+                return None
+            self._entries.move_to_end((name, version))
+            self.hits += 1
+            return entry[1]
+
+    def put(self, name, version, html):
+        size = len(html)
+        if self.ttl <= 0 or size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop((name, version), None)
+            if old is not None:
+                self._bytes -= len(old[1])
+            self._entries[(name, version)] = (time.monotonic(), html)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries), 'bytes': self._bytes}
+
+
+def make_etag(version, path, query_string):
+    digest = hashlib.sha1(path.encode('utf-8') + b'?' + query_string).hexdigest()[:16]
+    return f'{version}-{digest}'
+
+
+def _is_not_modified(etag, updated_at):
+    if request.if_none_match:
+        # If-None-Match takes precedence over If-Modified-Since (RFC 9110 13.2.2)
+        return request.if_none_match.contains(etag)
+    since = request.if_modified_since
+    return since is not None and updated_at <= since
+
+
+def _set_validators(response, etag, updated_at):
+    response.set_etag(etag)
+    response.last_modified = updated_at
+    response.headers['Cache-Control'] = 'no-cache' # Browsers may store it but must revalidate
+
+
+def conditional_get(get_version, cache=None):
+    """
+    Decorator for GET views listing one collection. get_version() returns the
+    CollectionVersion to use (or None when the database is unavailable, in which
+    case the view runs unchanged). Only 200 responses get validators or are cached.
+    Streamed responses get validators but are never cached.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            version_source = get_version()
+            if version_source is None:
+                return view(*args, **kwargs)
+            try:
+                version, updated_at = version_source.current()
+            except PyMongoError:
+                return view(*args, **kwargs) # Serve uncached rather than fail
+            etag = make_etag(version, request.path, request.query_string)
+
+            if _is_not_modified(etag, updated_at):
+                response = make_response('', 304)
+                _set_validators(response, etag, updated_at)
+                return response
+
+            key = (request.path, request.query_string)
+            if cache is not None:
+                entry = cache.get(key, version)
+                if entry is not None:
+                    _, _, body, status, headers = entry
+                    return make_response(body, status, headers)
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200:
+                _set_validators(response, etag, updated_at)
+                if cache is not None and not response.is_streamed:
+                    cache.put(key, version, response)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,294 @@
+# serve.py
+# Pre-forking production launcher for the Flask apps in this repository.
+#
+# The master process binds one listening socket and forks N workers that all
+# accept() from it. Each worker imports the app only after the fork and calls its
+# create_app() factory, so every worker opens its own MongoClient (PyMongo clients
+# must not be shared across fork). The master never imports the app.
+#
+# Usage (Linux/macOS; needs os.fork):
+#   python serve.py Trail_leave --workers 4 --port 5000
+#   python serve.py amp_onboarding --workers 4 --threads 8 --max-requests 5000
+#   python serve.py . --port 8000                  # the root job application form
+#
+# Signals to the master:
+#   HUP          graceful restart: start fresh workers (re-importing the code), then retire the old ones
+#   TERM / INT   graceful shutdown: workers finish in-flight requests and exit
+#   TTIN / TTOU  add / remove one worker
+
+import os
+import sys
+import time
+import errno
+import random
+import signal
+import socket
+import argparse
+import importlib
+import threading
+import traceback
+
+WORKER_BOOT_ERROR = 3 # Exit code of a worker whose app failed to import; the master gives up
+POLL_INTERVAL = 0.2   # Seconds between master housekeeping passes
+ACCEPT_TIMEOUT = 1.0  # Seconds a worker waits for a connection before re-checking its stop flag
+
+
+# --- Worker ---
+class RequestCounter:
+    """WSGI middleware counting started requests, for --max-requests recycling."""
+
+    def __init__(self, app):
+        self.app = app
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, environ, start_response):
+        with self._lock:
+            self.count += 1
+        return self.app(environ, start_response)
+
+
+class BoundedThreads:
+    """
+    Mixin for a socketserver.ThreadingMixIn server: at most 'threads' requests run at
+    once. The worker loop takes a slot before accepting, so a busy worker leaves new
+    connections to its idle siblings instead of starting thread after thread.
+    """
+
+    def __init__(self, *args, threads, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.slots = threading.BoundedSemaphore(threads)
+        self.dispatched = 0 # Requests handed to a thread; tells the loop whether its slot was used
+
+    def process_request(self, request, client_address):
+        super().process_request(request, client_address)
+        self.dispatched += 1
+
+    def process_request_thread(self, request, client_address):
+        try:
+            super().process_request_thread(request, client_address)
+        finally:
+            self.slots.release()
+
+
+def make_worker_server(options, app, listener):
+    """Single-threaded werkzeug server, or a threaded one capped at --threads concurrent requests."""
+    from werkzeug.serving import BaseWSGIServer, ThreadedWSGIServer
+
+    if options.threads > 1:
+        server_class = type('BoundedThreadedWSGIServer', (BoundedThreads, ThreadedWSGIServer), {})
+        return server_class(options.host, options.port, app, fd=listener.fileno(), threads=options.threads)
+    return BaseWSGIServer(options.host, options.port, app, fd=listener.fileno())
+
+
+def load_app(app_dir, module_name, factory):
+    """
+    Imports <app_dir>/<module_name>.py the way 'python app.py' would run it
+    (working directory and import path set to the app folder) and returns the WSGI app.
+    """
+    os.chdir(app_dir)
+    sys.path.insert(0, app_dir)
+    module = importlib.import_module(module_name)
+    create_app = getattr(module, factory, None)
+    if create_app is None:
+        raise RuntimeError(f"{module_name}.py in '{app_dir}' has no '{factory}()' factory")
+    return create_app()
+
+
+def run_worker(listener, options, generation):
+    """Worker main loop. Never returns; exits the process."""
+    stopping = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stopping.set())
+    signal.signal(signal.SIGINT, signal.SIG_IGN) # Ctrl+C reaches the master, which stops us with TERM
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+    signal.signal(signal.SIGTTIN, signal.SIG_IGN)
+    signal.signal(signal.SIGTTOU, signal.SIG_IGN)
+
+    try:
+        app = RequestCounter(load_app(options.app_dir, options.module, options.factory))
+        server = make_worker_server(options, app, listener)
+    except BaseException as e:
+        print(f"[worker {os.getpid()}] Failed to load the app: {e!r}", flush=True)
+        os._exit(WORKER_BOOT_ERROR)
+
+    server.timeout = ACCEPT_TIMEOUT
+    server.daemon_threads = False # So server_close() waits for in-flight threaded requests
+    slots = getattr(server, 'slots', None)
+    # Idle workers race for each connection; a non-blocking accept lets the losers go back to waiting.
+    server.socket.setblocking(False)
+
+    max_requests = options.max_requests
+    if max_requests and options.max_requests_jitter:
+        max_requests += random.randint(0, options.max_requests_jitter)
+    print(f"[worker {os.getpid()}] Ready (generation {generation}).", flush=True)
+
+    parent = os.getppid()
+    while not stopping.is_set():
+        if max_requests and app.count >= max_requests:
+            print(f"[worker {os.getpid()}] Served {app.count} requests; recycling.", flush=True)
+            break
+        if os.getppid() != parent:
+            print(f"[worker {os.getpid()}] Master went away; exiting.", flush=True)
+            break
+        if slots is not None and not slots.acquire(timeout=ACCEPT_TIMEOUT):
+            continue # All --threads busy; leave new connections to other workers
+        dispatched = getattr(server, 'dispatched', 0)
+        try:
+            server.handle_request()
+        except OSError as e:
+            if e.errno not in (errno.EAGAIN, errno.EINTR):
+                raise
+        finally:
+            if slots is not None and server.dispatched == dispatched:
+                slots.release() # Nothing accepted (or it failed before a thread started)
+    server.server_close()
+    os._exit(0)
+
+
+# --- Master ---
+class Arbiter:
+    """Keeps the requested number of workers running and handles master signals."""
+
+    def __init__(self, options):
+        self.options = options
+        self.workers = {} # pid -> (generation, started_at)
+        self.generation = 0
+        self.target = options.workers
+        self.stopping = False
+        self.pending_signals = []
+        self.stop_deadline = None
+
+    def bind(self):
+        listener = socket.socket(socket.AF_INET6 if ':' in self.options.host else socket.AF_INET, socket.SOCK_STREAM)
+        listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        listener.bind((self.options.host, self.options.port))
+        listener.listen(self.options.backlog)
+        listener.set_inheritable(True)
+        self.listener = listener
+
+    def spawn(self):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                run_worker(self.listener, self.options, self.generation)
+            except BaseException:
+                traceback.print_exc()
+            finally:
+                os._exit(1)
+        self.workers[pid] = (self.generation, time.monotonic())
+
+    def current(self):
+        return [pid for pid, (gen, _) in self.workers.items() if gen == self.generation]
+
+    def kill(self, pid, sig=signal.SIGTERM):
+        try:
+            os.kill(pid, sig)
+        except ProcessLookupError:
+            self.workers.pop(pid, None)
+
+    def reap(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            self.workers.pop(pid, None)
+            code = os.waitstatus_to_exitcode(status)
+            if code == WORKER_BOOT_ERROR and not self.stopping:
+                print(f"[master] Worker {pid} could not load the app; shutting down.", flush=True)
+                self.begin_stop()
+            elif code != 0 and not self.stopping:
+                print(f"[master] Worker {pid} exited with status {code}; replacing it.", flush=True)
+
+    def begin_stop(self):
+        self.stopping = True
+        self.stop_deadline = time.monotonic() + self.options.graceful_timeout
+        for pid in list(self.workers):
+            self.kill(pid)
+
+    def handle_signals(self):
+        while self.pending_signals:
+            signum = self.pending_signals.pop(0)
+            if signum in (signal.SIGTERM, signal.SIGINT):
+                print("[master] Shutting down gracefully...", flush=True)
+                self.begin_stop()
+            elif signum == signal.SIGHUP and not self.stopping:
+                print("[master] Graceful restart: starting a new worker generation.", flush=True)
+                old = list(self.workers)
+                self.generation += 1
+                for _ in range(self.target):
+                    self.spawn()
+                # New workers import and connect before accepting, so retire the old ones once they are up.
+                time.sleep(self.options.restart_delay)
+                for pid in old:
+                    self.kill(pid)
+            elif signum == signal.SIGTTIN:
+                self.target += 1
+            elif signum == signal.SIGTTOU and self.target > 1:
+                self.target -= 1
+
+    def run(self):
+        self.bind()
+        for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP, signal.SIGTTIN, signal.SIGTTOU):
+            signal.signal(signum, lambda s, frame: self.pending_signals.append(s))
+        print(f"[master {os.getpid()}] Listening on http://{self.options.host}:{self.options.port} "
+              f"with {self.target} worker(s) for '{self.options.app_dir}'.", flush=True)
+
+        while True:
+            self.handle_signals()
+            self.reap()
+            if self.stopping:
+                if not self.workers:
+                    break
+                if time.monotonic() > self.stop_deadline:
+                    for pid in list(self.workers):
+                        print(f"[master] Worker {pid} did not stop in time; killing it.", flush=True)
+                        self.kill(pid, signal.SIGKILL)
+            else:
+                current = self.current()
+                for _ in range(self.target - len(current)):
+                    self.spawn()
+                for pid in current[self.target:]:
+                    self.kill(pid)
+            time.sleep(POLL_INTERVAL)
+        self.listener.close()
+        print("[master] All workers stopped.", flush=True)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Pre-forking launcher for the Flask apps in this repository.")
+    parser.add_argument('app_dir', help="App folder containing app.py (e.g. Trail_leave, amp_onboarding, '.')")
+    parser.add_argument('--module', default='app', help="Module in the app folder (default: app)")
+    parser.add_argument('--factory', default='create_app', help="Application factory in that module (default: create_app)")
+    parser.add_argument('--host', default=os.getenv('HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(os.getenv('PORT', 8000)))
+    parser.add_argument('--workers', type=int, default=int(os.getenv('WEB_WORKERS', os.cpu_count() or 1)))
+    parser.add_argument('--threads', type=int, default=int(os.getenv('WEB_THREADS', 1)),
+                        help="Requests each worker handles at once, one thread each (default: 1, no threads)")
+    parser.add_argument('--max-requests', type=int, default=int(os.getenv('WEB_MAX_REQUESTS', 0)),
+                        help="Recycle a worker after this many requests (0 = never)")
+    parser.add_argument('--max-requests-jitter', type=int, default=int(os.getenv('WEB_MAX_REQUESTS_JITTER', 0)),
+                        help="Random extra requests per worker, so workers don't all recycle at once")
+    parser.add_argument('--graceful-timeout', type=float, default=30.0,
+                        help="Seconds to let workers finish in-flight requests before SIGKILL")
+    parser.add_argument('--restart-delay', type=float, default=2.0,
+                        help="Seconds new workers get to boot on HUP before old ones are retired")
+    parser.add_argument('--backlog', type=int, default=2048)
+    options = parser.parse_args(argv)
+    options.app_dir = os.path.abspath(options.app_dir)
+    if not os.path.isfile(os.path.join(options.app_dir, options.module + '.py')):
+        parser.error(f"No {options.module}.py in '{options.app_dir}'")
+    if options.workers < 1:
+        parser.error("--workers must be at least 1")
+    if options.threads < 1:
+        parser.error("--threads must be at least 1")
+    return options
+
+
+if __name__ == '__main__':
+    if not hasattr(os, 'fork'):
+        print("serve.py needs os.fork (Linux/macOS). On Windows run the app directly: python app.py")
+        sys.exit(1)
+    Arbiter(parse_args()).run()